@@ -0,0 +1,74 @@
+"""
+Flujos aleatorios independientes y reproducibles.
+
+Todos los números aleatorios de una corrida salen de una única semilla
+maestra. Cada uso (llegadas de una aproximación, giros de un movimiento,
+tráfico manual, ...) obtiene su propio generador derivado con SeedSequence a
+partir de (semilla, replicación, clave), de modo que:
+
+- la misma semilla y replicación reproducen la corrida bit a bit, también en
+  otros procesos (la derivación no depende del orden en que se piden los
+  flujos ni de hash() de Python);
+- replicaciones distintas son estadísticamente independientes;
+- dos variantes de controlador corridas con la misma semilla y replicación
+  ven exactamente las mismas llegadas (números aleatorios comunes), porque
+  el controlador no consume de los flujos de demanda.
+"""
+
+import zlib
+
+import numpy as np
+
+
+def _clave_entera(parte):
+    """Convierte una parte de la clave en un entero estable entre procesos."""
+    if isinstance(parte, (int, np.integer)):
+        return int(parte)
+    return zlib.crc32(str(parte).encode("utf-8"))
+
+
+class FlujosAleatorios:
+    def __init__(self, semilla=None, replicacion=0):
+        # Sin semilla se toma entropía del sistema, pero se guarda para poder
+        # reproducir la corrida después
+        if semilla is None:
+            semilla = np.random.SeedSequence().entropy
+        self.semilla = semilla
+        self.replicacion = replicacion
+        self._generadores = {}
+
+    def __getstate__(self):
+        # Solo viaja la semilla: los generadores se rehacen en el proceso destino
+        return {"semilla": self.semilla, "replicacion": self.replicacion}
+
+    def __setstate__(self, estado):
+        self.__init__(estado["semilla"], estado["replicacion"])
+
+    def secuencia(self, *clave):
+        """SeedSequence del flujo identificado por clave."""
+        spawn_key = (self.replicacion,) + tuple(_clave_entera(p) for p in clave)
+        return np.random.SeedSequence(self.semilla, spawn_key=spawn_key)
+
+    def flujo(self, *clave):
+        """
+        Generador del flujo identificado por clave, p. ej. ("llegadas", "Norte")
+        o ("giros", "Sur"). Pedir la misma clave devuelve el mismo generador.
+        """
+        generador = self._generadores.get(clave)
+        if generador is None:
+            generador = np.random.Generator(np.random.PCG64(self.secuencia(*clave)))
+            self._generadores[clave] = generador
+        return generador
+
+    def replica(self, replicacion):
+        """Flujos de otra replicación con la misma semilla maestra."""
+        return FlujosAleatorios(self.semilla, replicacion)
+
+    def reiniciar(self):
+        """Vuelve todos los flujos a su estado inicial."""
+        self._generadores.clear()
+
+
+def replicaciones(semilla, n):
+    """Flujos para n replicaciones independientes de una misma semilla maestra."""
+    return [FlujosAleatorios(semilla, r) for r in range(n)]
@@ -6,11 +6,39 @@ para Windows (EXE) y Linux (AppImage)
 
 import os
 import sys
+import shlex
+import argparse
+import statistics
 import subprocess
 import platform
 import shutil
+import time
 from pathlib import Path
 
+# Punto de entrada fijo de la aplicación
+ENTRADA = "circulacion.py"
+NOMBRE = "SimuladorSemaforos"
+
+# La interfaz solo usa QtCore, QtGui y QtWidgets: el resto de módulos de PyQt6
+# no se empaquetan
+MODULOS_EXCLUIDOS = [
+    "PyQt6.QtBluetooth", "PyQt6.QtDBus", "PyQt6.QtDesigner", "PyQt6.QtHelp",
+    "PyQt6.QtMultimedia", "PyQt6.QtMultimediaWidgets", "PyQt6.QtNetwork",
+    "PyQt6.QtNfc", "PyQt6.QtOpenGL", "PyQt6.QtOpenGLWidgets", "PyQt6.QtPdf",
+    "PyQt6.QtPdfWidgets", "PyQt6.QtPositioning", "PyQt6.QtPrintSupport",
+    "PyQt6.QtQml", "PyQt6.QtQuick", "PyQt6.QtQuick3D", "PyQt6.QtQuickWidgets",
+    "PyQt6.QtRemoteObjects", "PyQt6.QtSensors", "PyQt6.QtSerialPort",
+    "PyQt6.QtSpatialAudio", "PyQt6.QtSql", "PyQt6.QtSvg", "PyQt6.QtSvgWidgets",
+    "PyQt6.QtTest", "PyQt6.QtTextToSpeech", "PyQt6.QtWebChannel",
+    "PyQt6.QtWebSockets", "PyQt6.QtXml", "tkinter",
+]
+
+# Carpetas de plugins de Qt que se conservan (plataformas de ventanas y estilos)
+PLUGINS_QT = {
+    "platforms", "styles", "xcbglintegrations", "wayland-shell-integration",
+    "wayland-graphics-integration-client", "wayland-decoration-client",
+}
+
 def check_requirements():
     """Verifica que estén instalados los requisitos necesarios."""
     try:
@@ -32,8 +60,62 @@ def check_requirements():
 
     return True
 
-def build_windows_exe():
-    """Genera un archivo EXE para Windows."""
+def argumentos_pyinstaller(modo, extra=None):
+    """
+    Argumentos de PyInstaller para el punto de entrada fijo.
+    modo: "onedir" (arranque rápido, sin descomprimir en cada ejecución) u "onefile".
+    """
+    excluidos = [f"--exclude-module={modulo}" for modulo in MODULOS_EXCLUIDOS]
+    return (
+        ['pyinstaller', '--noconfirm', f'--name={NOMBRE}', '--windowed', f'--{modo}',
+         '--optimize=2'] +  # Bytecode precompilado con -OO
+        excluidos + (extra or []) + [ENTRADA]
+    )
+
+def podar_plugins_qt(carpeta):
+    """
+    Elimina de un bundle onedir los plugins y traducciones de Qt que no usa la
+    aplicación. Devuelve los bytes liberados.
+    """
+    liberados = 0
+    for plugins in Path(carpeta).rglob("Qt6/plugins"):
+        for sub in plugins.iterdir():
+            if sub.is_dir() and sub.name not in PLUGINS_QT:
+                liberados += sum(f.stat().st_size for f in sub.rglob("*") if f.is_file())
+                shutil.rmtree(sub)
+    for traducciones in Path(carpeta).rglob("Qt6/translations"):
+        liberados += sum(f.stat().st_size for f in traducciones.rglob("*") if f.is_file())
+        shutil.rmtree(traducciones)
+    print(f"✓ Plugins de Qt no usados eliminados ({liberados / 1e6:.1f} MB)")
+    return liberados
+
+def medir_arranque(comando, repeticiones=5):
+    """
+    Mide el tiempo desde lanzar el comando hasta que la ventana se muestra y
+    la aplicación sale (SEMAFOROS_SALIR_AL_INICIAR). Sin pantalla usa la
+    plataforma offscreen de Qt. Devuelve la lista de tiempos en segundos.
+    """
+    if isinstance(comando, str):
+        comando = shlex.split(comando)
+
+    env = os.environ.copy()
+    env['SEMAFOROS_SALIR_AL_INICIAR'] = '1'
+    if platform.system() == "Linux" and not env.get('DISPLAY') and not env.get('WAYLAND_DISPLAY'):
+        env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        subprocess.run(comando, env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        tiempos.append(time.perf_counter() - inicio)
+
+    print(f"✓ Arranque de {' '.join(comando)}: mediana {statistics.median(tiempos):.2f} s, "
+          f"mínimo {min(tiempos):.2f} s ({repeticiones} ejecuciones)")
+    return tiempos
+
+def build_windows_exe(modo="onedir"):
+    """Genera un ejecutable para Windows."""
     print("\n=== Generando ejecutable para Windows ===")
 
     # Asegurarse de que estamos en Windows
@@ -41,25 +123,7 @@ def build_windows_exe():
         print("Esta función debe ejecutarse en Windows.")
         return False
 
-    # Encontrar el archivo Python principal
-    python_files = [f for f in os.listdir('.') if f.endswith('.py') and f != 'build.py']
-
-    if not python_files:
-        print("✗ No se encontraron archivos Python en el directorio actual.")
-        return False
-
-    main_file = None
-
-    # Si hay varios archivos Python, buscar primero 'simulador_semaforos.py'
-    if 'simulador_semaforos.py' in python_files:
-        main_file = 'simulador_semaforos.py'
-    elif 'newtest.py' in python_files:  # Verificar el archivo detectado en el log
-        main_file = 'newtest.py'
-    else:
-        # Usar el primer archivo Python encontrado
-        main_file = python_files[0]
-
-    print(f"✓ Usando archivo principal: {main_file}")
+    print(f"✓ Usando archivo principal: {ENTRADA}")
 
     # Verificar si existe el ícono
     icon_param = []
@@ -67,20 +131,26 @@ def build_windows_exe():
         icon_param = ['--icon=icon.ico']
 
     try:
-        subprocess.run(
-            ['pyinstaller', '--name=SimuladorSemaforos', '--windowed', '--onefile'] +
-            icon_param + [main_file],
-            check=True
-        )
+        subprocess.run(argumentos_pyinstaller(modo, icon_param), check=True)
+
+        if modo == "onedir":
+            podar_plugins_qt(f"dist/{NOMBRE}")
+            ejecutable = f"dist/{NOMBRE}/{NOMBRE}.exe"
+        else:
+            ejecutable = f"dist/{NOMBRE}.exe"
 
-        print("✓ Ejecutable Windows creado: dist/SimuladorSemaforos.exe")
+        print(f"✓ Ejecutable Windows creado: {ejecutable}")
+        medir_arranque([ejecutable])
         return True
     except subprocess.SubprocessError as e:
         print(f"✗ Error al crear el ejecutable para Windows: {e}")
         return False
 
-def build_linux_appimage():
-    """Genera un AppImage para Linux."""
+def build_linux_appimage(modo="onedir"):
+    """
+    Genera un AppImage para Linux. En modo onedir el bundle se copia completo
+    al AppDir, así que al arrancar no hay que descomprimir nada en /tmp.
+    """
     print("\n=== Generando AppImage para Linux ===")
 
     # Asegurarse de que estamos en Linux
@@ -88,35 +158,11 @@ def build_linux_appimage():
         print("Esta función debe ejecutarse en Linux.")
         return False
 
-    # Encontrar el archivo Python principal
-    python_files = [f for f in os.listdir('.') if f.endswith('.py') and f != 'build.py']
-
-    if not python_files:
-        print("✗ No se encontraron archivos Python en el directorio actual.")
-        return False
-
-    main_file = None
-
-    # Si hay varios archivos Python, buscar primero 'simulador_semaforos.py'
-    if 'simulador_semaforos.py' in python_files:
-        main_file = 'simulador_semaforos.py'
-    elif 'newtest.py' in python_files:  # Verificar el archivo detectado en el log
-        main_file = 'newtest.py'
-    else:
-        # Usar el primer archivo Python encontrado
-        main_file = python_files[0]
-
-    print(f"✓ Usando archivo principal: {main_file}")
+    print(f"✓ Usando archivo principal: {ENTRADA}")
 
     try:
         # 1. Crear ejecutable con PyInstaller
-        subprocess.run([
-            'pyinstaller',
-            '--name=SimuladorSemaforos',
-            '--windowed',
-            '--onefile',
-            main_file
-        ], check=True)
+        subprocess.run(argumentos_pyinstaller(modo), check=True)
 
         # 2. Crear estructura de directorios para AppImage
         appdir = Path("SimuladorSemaforos.AppDir")
@@ -124,8 +170,19 @@ def build_linux_appimage():
         (appdir / "usr/share/applications").mkdir(parents=True, exist_ok=True)
         (appdir / "usr/share/icons/hicolor/256x256/apps").mkdir(parents=True, exist_ok=True)
 
-        # 3. Copiar ejecutable
-        shutil.copy("dist/SimuladorSemaforos", appdir / "usr/bin/")
+        # 3. Copiar ejecutable (onedir: carpeta completa en usr/lib)
+        if modo == "onedir":
+            podar_plugins_qt(f"dist/{NOMBRE}")
+            medir_arranque([f"dist/{NOMBRE}/{NOMBRE}"])
+            destino = appdir / "usr/lib" / NOMBRE
+            if destino.exists():
+                shutil.rmtree(destino)
+            shutil.copytree(f"dist/{NOMBRE}", destino, symlinks=True)
+            ruta_ejecutable = f"usr/lib/{NOMBRE}/{NOMBRE}"
+        else:
+            shutil.copy(f"dist/{NOMBRE}", appdir / "usr/bin/")
+            medir_arranque([f"dist/{NOMBRE}"])
+            ruta_ejecutable = f"usr/bin/{NOMBRE}"
 
         # 4. Crear archivo desktop
         with open(appdir / "simulador.desktop", "w") as f:
@@ -139,12 +196,12 @@ Categories=Utility;
 
         # 5. Crear script AppRun
         with open(appdir / "AppRun", "w") as f:
-            f.write("""#!/bin/bash
+            f.write(f"""#!/bin/bash
 SELF=$(readlink -f "$0")
-HERE=${SELF%/*}
-export PATH="${HERE}/usr/bin/:${PATH}"
-export LD_LIBRARY_PATH="${HERE}/usr/lib/:${LD_LIBRARY_PATH}"
-exec "${HERE}/usr/bin/SimuladorSemaforos" "$@"
+HERE=${{SELF%/*}}
+export PATH="${{HERE}}/usr/bin/:${{PATH}}"
+export LD_LIBRARY_PATH="${{HERE}}/usr/lib/:${{LD_LIBRARY_PATH}}"
+exec "${{HERE}}/{ruta_ejecutable}" "$@"
 """)
         os.chmod(appdir / "AppRun", 0o755)
 
@@ -167,7 +224,7 @@ exec "${HERE}/usr/bin/SimuladorSemaforos" "$@"
             os.chmod('./appimagetool-x86_64.AppImage', 0o755)
 
         # Verificar que la estructura del AppDir sea correcta
-        if not os.path.exists('SimuladorSemaforos.AppDir/AppRun') or not os.path.exists('SimuladorSemaforos.AppDir/usr/bin/SimuladorSemaforos'):
+        if not os.path.exists('SimuladorSemaforos.AppDir/AppRun') or not os.path.exists(appdir / ruta_ejecutable):
             print("Verificando estructura de directorios del AppDir...")
             for root, dirs, files in os.walk('SimuladorSemaforos.AppDir'):
                 print(f"Contenido de {root}:")
@@ -208,6 +265,19 @@ exec "${HERE}/usr/bin/SimuladorSemaforos" "$@"
 
 def main():
     """Función principal que maneja el proceso de construcción."""
+    parser = argparse.ArgumentParser(description="Genera ejecutables del Simulador de Semáforos")
+    parser.add_argument('--modo', choices=['onedir', 'onefile'], default='onedir',
+                        help="onedir arranca más rápido; onefile genera un único archivo")
+    parser.add_argument('--medir', metavar='COMANDO',
+                        help="solo mide el tiempo de arranque del comando indicado, "
+                             f"p. ej. \"{sys.executable} {ENTRADA}\"")
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    if args.medir:
+        medir_arranque(args.medir, args.repeticiones)
+        return
+
     print("== Script para generar ejecutables del Simulador de Semáforos ==")
 
     if not check_requirements():
@@ -216,9 +286,9 @@ def main():
 
     system = platform.system()
     if system == "Windows":
-        build_windows_exe()
+        build_windows_exe(args.modo)
     elif system == "Linux":
-        build_linux_appimage()
+        build_linux_appimage(args.modo)
     else:
         print(f"Sistema operativo no soportado: {system}")
         print("Este script solo funciona en Windows y Linux.")
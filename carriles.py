@@ -0,0 +1,269 @@
+"""
+Aproximaciones con varios carriles y bahías de giro.
+
+Por defecto cada aproximación es un único carril (CARRILES_CRUCE en
+rutas.py). Con una ConfiguracionCarriles cada aproximación tiene N carriles
+ordenados de izquierda a derecha según el sentido de circulación; cada uno
+admite ciertos movimientos y puede ser una bahía de giro de longitud
+limitada antes de la línea de parada. Aguas arriba de la bahía sus vehículos
+circulan por el carril contiguo, así que si la bahía se llena bloquean a
+los que siguen recto.
+
+Los carriles se numeran con un índice plano y su geometría (inicio de la
+bahía, carril padre, línea de parada) se guarda en arreglos de NumPy: las
+colas de todos los carriles se calculan de una vez por paso, sin bucles por
+carril.
+
+    config = configuracion_uniforme(2, bahia_izquierda=120)
+    motor.usar_carriles(config)
+"""
+
+import numpy as np
+
+from conflictos import LARGO_VEHICULO
+from llegadas import MOVIMIENTOS
+from rutas import RUTAS_CRUCE, SALIDA_HACIA, Ruta, _corte
+
+# Mitad de la calzada de cada aproximación en la escena de circulacion.py:
+# (eje, coordinada del borde izquierdo según el sentido, sentido hacia la derecha)
+MITADES = {
+    "Norte": ("x", 450, -1),
+    "Sur": ("x", 450, 1),
+    "Este": ("y", 315, 1),
+    "Oeste": ("y", 385, -1),
+}
+ANCHO_MITAD = 35
+
+# Extremos de cada aproximación (coordenada a lo largo del eje de circulación)
+# y posición de la línea de parada (borde de la caja del cruce)
+EXTREMOS = {"Norte": (0, 700), "Sur": (700, 0), "Este": (0, 900), "Oeste": (900, 0)}
+PARADA = {"Norte": 315, "Sur": 385, "Este": 415, "Oeste": 485}
+
+# Longitud (px) de la transición diagonal para entrar en una bahía
+TRANSICION = 20
+
+# Distancia mínima (px) entre vehículos consecutivos de un carril
+SEPARACION = 25
+
+
+class Carril:
+    def __init__(self, movimientos, bahia=None):
+        """
+        movimientos: subconjunto de ("izquierda", "recto", "derecha").
+        bahia: longitud (px) de la bahía antes de la línea de parada; None
+            si el carril llega hasta el borde de la escena.
+        """
+        movimientos = tuple(movimientos)
+        if not movimientos or any(m not in ("izquierda", "recto", "derecha") for m in movimientos):
+            raise ValueError(f"Movimientos de carril no válidos: {movimientos}")
+        self.movimientos = movimientos
+        self.bahia = bahia
+
+
+def _tipo_movimiento(origen, destino):
+    """'recto', 'izquierda' o 'derecha' según la geometría de un solo carril."""
+    return RUTAS_CRUCE[(origen, destino)].giro
+
+
+class ConfiguracionCarriles:
+    def __init__(self, aproximaciones):
+        """
+        aproximaciones: dict aproximación -> lista de Carril de izquierda a derecha.
+        """
+        self.aproximaciones = {a: list(c) for a, c in aproximaciones.items()}
+        for aproximacion in MOVIMIENTOS:
+            carriles = self.aproximaciones.get(aproximacion)
+            if not carriles:
+                raise ValueError(f"La aproximación {aproximacion} necesita al menos un carril")
+            if all(c.bahia is not None for c in carriles):
+                raise ValueError(f"La aproximación {aproximacion} necesita un carril completo")
+            for destino in MOVIMIENTOS[aproximacion]:
+                if not self.carriles_para(aproximacion, destino):
+                    raise ValueError(f"Ningún carril admite {aproximacion} → {destino}")
+
+        # Índice plano de cada (aproximación, carril)
+        self.claves = [(a, k) for a in MOVIMIENTOS for k in range(len(self.aproximaciones[a]))]
+        self.indice = {clave: i for i, clave in enumerate(self.claves)}
+        n = len(self.claves)
+
+        # Geometría por carril plano: línea del carril, carril padre aguas
+        # arriba de la bahía y distancia a la que empieza la bahía
+        self.lineas = {}
+        self.padre = np.arange(n)
+        self.inicio_bahia = np.zeros(n)
+        self.parada = np.zeros(n)
+        for (aproximacion, k), i in self.indice.items():
+            self.lineas[(aproximacion, k)] = self._linea(aproximacion, k)
+            self.parada[i] = self._distancia_parada(aproximacion)
+            carril = self.aproximaciones[aproximacion][k]
+            if carril.bahia is not None:
+                self.padre[i] = self.indice[(aproximacion, self._carril_padre(aproximacion, k))]
+                self.inicio_bahia[i] = self._distancia_parada(aproximacion) - carril.bahia
+
+        self.rutas = {}
+        for origen, destinos in MOVIMIENTOS.items():
+            for destino in destinos:
+                for k in self.carriles_para(origen, destino):
+                    self.rutas[(origen, destino, k)] = self._ruta(origen, destino, k)
+
+    def __len__(self):
+        """Número total de carriles"""
+        return len(self.claves)
+
+    def max_carriles(self):
+        return max(len(c) for c in self.aproximaciones.values())
+
+    def carriles_para(self, origen, destino):
+        """Índices de los carriles de origen que admiten el movimiento hacia destino."""
+        tipo = _tipo_movimiento(origen, destino)
+        return [k for k, c in enumerate(self.aproximaciones[origen]) if tipo in c.movimientos]
+
+    def asignar(self, origen, destino, colas):
+        """
+        Elige el carril para un vehículo nuevo: el de menor cola entre los
+        que admiten su movimiento. colas es el arreglo por carril plano.
+        """
+        candidatos = self.carriles_para(origen, destino)
+        return min(candidatos, key=lambda k: colas[self.indice[(origen, k)]])
+
+    def colas(self, distancias, carriles):
+        """
+        Colas de todos los carriles a la vez.
+        distancias, carriles: arreglos con la distancia recorrida y el carril
+            plano asignado de cada vehículo.
+        Devuelve (limites, colas): la distancia que cada vehículo no puede
+        rebasar (inf si no tiene a nadie delante en su carril) y el número de
+        vehículos por carril antes de la línea de parada.
+        """
+        distancias = np.asarray(distancias, dtype=float)
+        carriles = np.asarray(carriles, dtype=np.intp)
+        limites = np.full(distancias.size, np.inf)
+
+        # Antes de la bahía se circula por el carril padre; pasada la línea
+        # de parada (más un vehículo) cada ruta va por su lado
+        fisico = np.where(distancias < self.inicio_bahia[carriles], self.padre[carriles], carriles)
+        en_acceso = np.flatnonzero(distancias < self.parada[carriles] + LARGO_VEHICULO)
+        if en_acceso.size:
+            orden = en_acceso[np.lexsort((-distancias[en_acceso], fisico[en_acceso]))]
+            carril_orden = fisico[orden]
+            # Cada vehículo sigue al anterior en el orden si están en el mismo carril
+            sigue = np.flatnonzero(carril_orden[1:] == carril_orden[:-1]) + 1
+            limites[orden[sigue]] = distancias[orden[sigue - 1]] - SEPARACION
+
+            # Quien aún va por el carril padre no entra en su bahía hasta que
+            # haya sitio detrás del último vehículo de la bahía
+            ultimo = np.full(len(self), np.inf)
+            np.minimum.at(ultimo, fisico[en_acceso], distancias[en_acceso])
+            antes = en_acceso[fisico[en_acceso] != carriles[en_acceso]]
+            limites[antes] = np.minimum(limites[antes], ultimo[carriles[antes]] - SEPARACION)
+
+        esperando = distancias < self.parada[carriles]
+        colas = np.bincount(fisico[esperando], minlength=len(self))
+        return limites, colas
+
+    def marcas(self):
+        """
+        Elementos para dibujar: (divisorias, cabezas). divisorias es una lista
+        de segmentos ((x0, y0), (x1, y1)) entre carriles vecinos hasta la línea
+        de parada; cabezas, una lista de (aproximacion, k, x, y) con la
+        posición del semáforo de cada carril junto a la línea de parada.
+        """
+        divisorias = []
+        cabezas = []
+        for aproximacion, carriles in self.aproximaciones.items():
+            eje, borde, sentido = MITADES[aproximacion]
+            ancho = ANCHO_MITAD / len(carriles)
+            inicio, fin = EXTREMOS[aproximacion]
+            avance = 1 if fin > inicio else -1
+            parada = PARADA[aproximacion]
+            for k in range(len(carriles)):
+                lateral = borde + sentido * (k + 0.5) * ancho
+                a = parada - avance * 8
+                cabezas.append((aproximacion, k, *((lateral, a) if eje == "x" else (a, lateral))))
+                if k == 0:
+                    continue
+                # La divisoria con una bahía solo cubre la longitud de la bahía
+                bahias = [c.bahia for c in carriles[k - 1:k + 1] if c.bahia is not None]
+                desde = parada - avance * max(bahias) if bahias else inicio
+                lateral = borde + sentido * k * ancho
+                if eje == "x":
+                    divisorias.append(((lateral, desde), (lateral, parada)))
+                else:
+                    divisorias.append(((desde, lateral), (parada, lateral)))
+        return divisorias, cabezas
+
+    # === Geometría ===
+
+    def _linea(self, aproximacion, k):
+        """Segmento (inicio, fin) del carril k a lo largo de toda la escena."""
+        eje, borde, sentido = MITADES[aproximacion]
+        ancho = ANCHO_MITAD / len(self.aproximaciones[aproximacion])
+        lateral = borde + sentido * (k + 0.5) * ancho
+        inicio, fin = EXTREMOS[aproximacion]
+        if eje == "x":
+            return (lateral, inicio), (lateral, fin)
+        return (inicio, lateral), (fin, lateral)
+
+    def _distancia_parada(self, aproximacion):
+        inicio, _ = EXTREMOS[aproximacion]
+        return abs(PARADA[aproximacion] - inicio)
+
+    def _carril_padre(self, aproximacion, k):
+        """Carril completo más cercano por el que se circula antes de la bahía."""
+        carriles = self.aproximaciones[aproximacion]
+        completos = [j for j, c in enumerate(carriles) if c.bahia is None]
+        return min(completos, key=lambda j: abs(j - k))
+
+    def _punto(self, linea, distancia):
+        (x0, y0), (x1, y1) = linea
+        longitud = np.hypot(x1 - x0, y1 - y0)
+        t = distancia / longitud
+        return x0 + (x1 - x0) * t, y0 + (y1 - y0) * t
+
+    def _ruta(self, origen, destino, k):
+        linea = self.lineas[(origen, k)]
+        carril = self.aproximaciones[origen][k]
+        puntos = []
+        if carril.bahia is not None:
+            # Se entra por el carril padre y se cambia a la bahía con una transición
+            padre = self.lineas[(origen, self._carril_padre(origen, k))]
+            inicio = self._distancia_parada(origen) - carril.bahia
+            puntos += [padre[0], self._punto(padre, max(0.0, inicio - TRANSICION)), self._punto(linea, inicio)]
+        else:
+            puntos.append(linea[0])
+
+        tipo = _tipo_movimiento(origen, destino)
+        if tipo == "recto":
+            return Ruta(puntos + [linea[1]])
+
+        # Giro: sale por el carril completo más a la izquierda (o a la derecha)
+        # de la aproximación que circula hacia el destino
+        salida = SALIDA_HACIA[destino]
+        completos = [j for j, c in enumerate(self.aproximaciones[salida]) if c.bahia is None]
+        j = completos[0] if tipo == "izquierda" else completos[-1]
+        salida = self.lineas[(salida, j)]
+        giro = _corte(linea[0], linea[1], salida[0], salida[1])
+        return Ruta(puntos + [giro, salida[1]])
+
+
+def configuracion_uniforme(carriles=2, bahia_izquierda=None):
+    """
+    Igual número de carriles completos en todas las aproximaciones; el de la
+    izquierda admite también el giro a la izquierda y el de la derecha el giro
+    a la derecha. Con bahia_izquierda (px) se añade una bahía exclusiva para
+    el giro a la izquierda y el carril completo de la izquierda queda solo recto.
+    """
+    if carriles < 1:
+        raise ValueError("Se necesita al menos un carril por aproximación")
+
+    lista = []
+    if bahia_izquierda:
+        lista.append(Carril(("izquierda",), bahia=bahia_izquierda))
+    for k in range(carriles):
+        movimientos = ["recto"]
+        if k == 0 and not bahia_izquierda:
+            movimientos.insert(0, "izquierda")
+        if k == carriles - 1:
+            movimientos.append("derecha")
+        lista.append(Carril(movimientos))
+    return ConfiguracionCarriles({a: lista for a in MOVIMIENTOS})
@@ -1,341 +1,66 @@
+import os
 import sys
+import time
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QGraphicsView, QGraphicsScene, QVBoxLayout,
     QHBoxLayout, QPushButton, QWidget, QLabel, QGridLayout, QSlider,
-    QTabWidget, QGroupBox, QSpinBox
+    QTabWidget, QGroupBox, QSpinBox, QFileDialog, QComboBox
 )
 from PyQt6.QtCore import Qt, QTimer, QRectF, QPointF
 from PyQt6.QtGui import QBrush, QPen, QColor, QFont, QPainter, QPolygonF
 
-# Clase Vehicle mejorada con mejor gestión de la intersección
-class Vehicle:
-    def __init__(self, lane, position, destination=None):
-        self.lane = lane  # "Norte", "Sur", "Este", "Oeste"
-        self.position = position  # Position on the lane (0-100)
-        self.speed = 2  # Default speed
-        self.stopped = False
-        self.in_intersection = False
-        self.committed_to_crossing = False  # Punto de no retorno, ya decidió cruzar
-        self.destination = destination or self._get_default_destination()
-        # For traffic that turns left or right
-        self.turning = destination is not None and destination != self._get_default_destination()
-        self.turn_started = False
-        
-        # Añadimos dirección actual para controlar los giros
-        self.current_direction = lane
-        self.turn_point = None
-        if self.lane in ["Norte", "Este"]:
-            self.turn_point = 55  # Punto donde comienza el giro
-        else:  # Sur, Oeste
-            self.turn_point = 45  # Punto donde comienza el giro
-
-    def _get_default_destination(self):
-        # Default straight path destinations
-        destinations = {
-            "Norte": "Sur",
-            "Sur": "Norte",
-            "Este": "Oeste",
-            "Oeste": "Este"
-        }
-        return destinations.get(self.lane)
-
-    def is_approaching_intersection(self):
-        # Check if vehicle is approaching the intersection
-        # Ampliamos el rango para detectar mejor la aproximación
-        if self.lane in ["Norte", "Este"]:
-            return 35 <= self.position <= 48
-        else:  # Sur, Oeste
-            return 65 >= self.position >= 52
-
-    def is_in_intersection(self):
-        # Check if vehicle is in the intersection - ampliamos el rango
-        if self.lane in ["Norte", "Este"]:
-            return 48 < self.position < 65
-        else:  # Sur, Oeste
-            return 52 > self.position > 35
-
-    def has_cleared_intersection(self):
-        # Check if vehicle has cleared the intersection
-        if self.current_direction in ["Norte", "Este"]:
-            return self.position >= 65
-        else:  # Sur, Oeste
-            return self.position <= 35
-
-    def is_about_to_enter_intersection(self):
-        # Punto de no retorno: tan cerca que debe seguir aunque el semáforo cambie
-        if self.lane in ["Norte", "Este"]:
-            return 45 <= self.position <= 48
-        else:  # Sur, Oeste
-            return 55 >= self.position >= 52
-
-    def should_start_turn(self):
-        """Determina si el vehículo debe comenzar a girar"""
-        if not self.turning or self.turn_started:
-            return False
-            
-        # Define puntos de giro según dirección
-        if self.lane in ["Norte", "Este"]:
-            return self.position >= self.turn_point
-        else:  # Sur, Oeste
-            return self.position <= self.turn_point
-
-    def update_position(self, simulation_speed, traffic_lights):
-        """
-        Actualiza la posición del vehículo según su velocidad y el estado de los semáforos
-        """
-        # Si está en la intersección o ha pasado el punto de no retorno,
-        # nunca debe detenerse
-        if self.in_intersection or self.committed_to_crossing:
-            stop_at_light = False
-
-            # Asegurar velocidad constante o mayor en la intersección
-            speed_factor = max(simulation_speed / 5, 0.5)  # Mínimo 0.5 para evitar bloqueos
-        else:
-            # Determinar si el vehículo debe detenerse en un semáforo rojo
-            stop_at_light = False
+from carriles import configuracion_uniforme
+from demanda import PerfilDemanda
+from lienzo import LienzoCruce
+from modelo import SemaforoPeatonal, SemaforoVehicular, Vehicle  # Reexportados para scripts existentes
+from motor import MotorSimulacion
+from nema import ControladorNEMA
+from predictivo import ControladorPredictivo
+from redibujo import PlanificadorRedibujo
+from registro import NIVELES, RegistroEventos
+
+# Límites del registro de eventos (eventos/s por tipo) para los que se repiten en cada redibujado
+LIMITES_REGISTRO = {"semaforo_peatonal": 1, "vehiculo_generado": 20}
+
+# El predictivo decide en el hilo de la interfaz, junto al temporizador de
+# vehículos de 50 ms: presupuesto (s de reloj) y horizonte (s simulados)
+# cortos para que una decisión no congele la ventana
+PRESUPUESTO_PREDICTIVO = 0.03
+HORIZONTE_PREDICTIVO = 3.0
 
-            # Verificar si está aproximándose a la intersección
-            if self.is_approaching_intersection():
-                semaforo = traffic_lights.get(self.lane)
-                if semaforo:
-                    # Si el semáforo está en rojo o amarillo, detener
-                    if semaforo.estado != "verde":
-                        stop_at_light = True
-                    # Si está muy cerca y el semáforo está en verde, se compromete a cruzar
-                    elif self.is_about_to_enter_intersection():
-                        self.committed_to_crossing = True
-
-            speed_factor = simulation_speed / 5
-
-        # Si está entrando en la intersección, marcar como tal
-        if self.is_in_intersection():
-            self.in_intersection = True
-            self.committed_to_crossing = True
-
-        # Si ha salido de la intersección, desmarcar
-        if self.has_cleared_intersection():
-            self.in_intersection = False
-            self.committed_to_crossing = False
-
-        # Verificar si debe comenzar a girar
-        if self.should_start_turn() and not self.turn_started:
-            self.turn_started = True
-            # Cambiar a la dirección de destino después de pasar la intersección
-            self.current_direction = self.destination
-            
-        # Actualizar posición si no está detenido
-        if not stop_at_light and not self.stopped:
-            # La dirección de movimiento depende de la current_direction actual, no del lane original
-            if self.current_direction in ["Norte", "Este"]:
-                self.position += self.speed * speed_factor
-            else:  # Sur, Oeste
-                self.position -= self.speed * speed_factor
-
-        return self.position
-
-    def get_color_based_on_destination(self):
-        # Colores según destino para mejor visualización
-        if not self.turning:
-            return QColor(30, 144, 255)  # Azul para directo
-
-        # Colores para vehículos que giran
-        if self.destination in ["Norte", "Sur"]:
-            return QColor(255, 165, 0)  # Naranja para norte/sur
-        else:
-            return QColor(0, 255, 0)  # Verde para este/oeste
-            
-    def get_display_position(self):
+class SimuladorSemaforos(QMainWindow):
+    def __init__(self, semilla=None, vista=None):
         """
-        Calcula la posición de visualización del vehículo según su carril original
-        y su dirección actual (para manejar los giros)
+        vista: "escena" (QGraphicsScene) o "lienzo" (lienzo.LienzoCruce,
+            pintado directo); por defecto SEMAFOROS_VISTA o "escena".
         """
-        # Si no está girando o no ha comenzado a girar, usa la lógica normal
-        if not self.turning or not self.turn_started:
-            if self.lane == "Norte":
-                x = 430
-                y = self.position / 100 * 700
-                rotation = 270
-            elif self.lane == "Sur":
-                x = 450
-                y = 700 - (self.position / 100 * 700)
-                rotation = 90
-            elif self.lane == "Este":
-                x = self.position / 100 * 900
-                y = 330
-                rotation = 0
-            elif self.lane == "Oeste":
-                x = 900 - (self.position / 100 * 900)
-                y = 350
-                rotation = 180
-        else:
-            # Si está girando, la visualización depende de la combinación origen-destino
-            # Estos valores necesitarían ajuste fino según el diseño de la intersección
-            # Aquí doy una aproximación que necesitará refinamiento visual
-            
-            # Norte → Este (giro a derecha)
-            if self.lane == "Norte" and self.destination == "Este":
-                # Posición después de girar
-                progress = (self.position - self.turn_point) / (100 - self.turn_point)
-                x = 450 + progress * 450  # Comienza en 450, va hacia 900
-                y = 350 + progress * 50   # Ajustar esto según el diseño visual
-                rotation = 0  # Apunta al este después de girar
-                
-            # Norte → Oeste (giro a izquierda)  
-            elif self.lane == "Norte" and self.destination == "Oeste":
-                progress = (self.position - self.turn_point) / (100 - self.turn_point)
-                x = 430 - progress * 430  # Comienza en 430, va hacia 0
-                y = 350 + progress * 50   # Ajusta esto según el diseño visual
-                rotation = 180  # Apunta al oeste después de girar
-                
-            # Sur → Este (giro a izquierda)
-            elif self.lane == "Sur" and self.destination == "Este":
-                progress = (self.turn_point - self.position) / self.turn_point
-                x = 450 + progress * 450  # Comienza en 450, va hacia 900
-                y = 350 - progress * 50   # Ajusta esto según el diseño visual
-                rotation = 0  # Apunta al este después de girar
-                
-            # Sur → Oeste (giro a derecha)
-            elif self.lane == "Sur" and self.destination == "Oeste":
-                progress = (self.turn_point - self.position) / self.turn_point
-                x = 450 - progress * 450  # Comienza en 450, va hacia 0
-                y = 350 - progress * 50   # Ajusta esto según el diseño visual
-                rotation = 180  # Apunta al oeste después de girar
-                
-            # Este → Norte (giro a izquierda)
-            elif self.lane == "Este" and self.destination == "Norte":
-                progress = (self.position - self.turn_point) / (100 - self.turn_point)
-                x = 430 - progress * 50   # Ajusta esto según el diseño visual 
-                y = 330 - progress * 330  # Comienza en 330, va hacia 0
-                rotation = 270  # Apunta al norte después de girar
-                
-            # Este → Sur (giro a derecha)
-            elif self.lane == "Este" and self.destination == "Sur":
-                progress = (self.position - self.turn_point) / (100 - self.turn_point)
-                x = 450 + progress * 50   # Ajusta esto según el diseño visual
-                y = 330 + progress * 370  # Comienza en 330, va hacia 700
-                rotation = 90  # Apunta al sur después de girar
-                
-            # Oeste → Norte (giro a derecha)
-            elif self.lane == "Oeste" and self.destination == "Norte":
-                progress = (self.turn_point - self.position) / self.turn_point
-                x = 430 - progress * 50   # Ajusta esto según el diseño visual
-                y = 350 - progress * 350  # Comienza en 350, va hacia 0
-                rotation = 270  # Apunta al norte después de girar
-                
-            # Oeste → Sur (giro a izquierda)
-            elif self.lane == "Oeste" and self.destination == "Sur":
-                progress = (self.turn_point - self.position) / self.turn_point
-                x = 450 + progress * 50   # Ajusta esto según el diseño visual
-                y = 350 + progress * 350  # Comienza en 350, va hacia 700
-                rotation = 90  # Apunta al sur después de girar
-            else:
-                # Caso de respaldo (no debería ocurrir)
-                x = 450
-                y = 350
-                rotation = 0
-                
-        return x, y, rotation
-
-class SemaforoVehicular:
-    def __init__(self, direccion):
-        self.direccion = direccion
-        self.estado = "rojo"  # Inicialmente todos en rojo excepto el Sur
-        self.tokens = {"verde": 0, "amarillo": 0, "rojo": 1}
-        self.tiempo_verde = 2  # Tiempo base en verde (en ciclos)
-        self.tiempo_verde_extendido = False  # Indica si el tiempo en verde ya fue extendido
-
-    def cambiar_estado(self, nuevo_estado):
-        self.estado = nuevo_estado
-
-    def agregar_token(self, estado, cantidad=1):
-        self.tokens[estado] += cantidad
-
-    def quitar_token(self, estado, cantidad=1):
-        if self.tokens[estado] >= cantidad:
-            self.tokens[estado] -= cantidad
-            return True
-        return False
-
-    def extender_tiempo_verde(self):
-        if not self.tiempo_verde_extendido:
-            self.tiempo_verde += 1
-            self.tiempo_verde_extendido = True
-            return True
-        return False
-
-    def resetear_tiempo_verde(self):
-        self.tiempo_verde = 2
-        self.tiempo_verde_extendido = False
-
-class SemaforoPeatonal:
-    def __init__(self, carril, tipo):
-        self.carril = carril
-        self.tipo = tipo  # "directo" o "indirecto"
-        self.estado = "rojo"  # Inicialmente en rojo, se cambiará según configuración
-        self.tokens = {"blanco": 0, "rojo": 1}
-
-    def cambiar_estado(self, nuevo_estado):
-        self.estado = nuevo_estado
-
-    def agregar_token(self, estado, cantidad=1):
-        self.tokens[estado] += cantidad
-
-    def quitar_token(self, estado, cantidad=1):
-        if self.tokens[estado] >= cantidad:
-            self.tokens[estado] -= cantidad
-            return True
-        return False
-
-class SimuladorSemaforos(QMainWindow):
-    def __init__(self):
         super().__init__()
+        self.vista = vista or os.environ.get("SEMAFOROS_VISTA", "escena")
+
+        # Registro de eventos en JSON lines (SEMAFOROS_REGISTRO=archivo lo activa);
+        # un nivel no válido en SEMAFOROS_NIVEL_REGISTRO se avisa y se usa "info"
+        nivel = os.environ.get("SEMAFOROS_NIVEL_REGISTRO", "info")
+        if nivel not in NIVELES:
+            print(f"SEMAFOROS_NIVEL_REGISTRO={nivel!r} no es un nivel válido "
+                  f"({', '.join(NIVELES)}); se usa 'info'", file=sys.stderr)
+            nivel = "info"
+        self.registro = RegistroEventos(
+            os.environ.get("SEMAFOROS_REGISTRO"),
+            nivel=nivel,
+            limites=LIMITES_REGISTRO,
+        )
+
+        # Estado de la simulación (semáforos, vehículos, llegadas) sin Qt
+        self.motor = MotorSimulacion(semilla, self.registro)
 
-        # Inicializar semáforos vehiculares
-        self.semaforos_vehiculares = {
-            "Norte": SemaforoVehicular("Norte"),
-            "Sur": SemaforoVehicular("Sur"),
-            "Este": SemaforoVehicular("Este"),
-            "Oeste": SemaforoVehicular("Oeste")
-        }
-
-        # El semáforo Sur comienza en verde
-        self.semaforos_vehiculares["Sur"].estado = "verde"
-        self.semaforos_vehiculares["Sur"].tokens = {"verde": 1, "amarillo": 0, "rojo": 0}
-
-        # Inicializar semáforos peatonales
-        self.semaforos_peatonales = {}
-        for carril in ["Norte", "Sur", "Este", "Oeste"]:
-            for tipo in ["directo", "indirecto"]:
-                key = f"{carril}_{tipo}"
-                self.semaforos_peatonales[key] = SemaforoPeatonal(carril, tipo)
-
-        # Configuración inicial de semáforos peatonales
-        peatonales_blancos = ["Sur_indirecto", "Oeste_directo", "Norte_directo", "Este_directo"]
-        for key in peatonales_blancos:
-            self.semaforos_peatonales[key].estado = "blanco"
-            self.semaforos_peatonales[key].tokens = {"blanco": 1, "rojo": 0}
-
-        # Inicialización de vehículos
-        self.vehicles = []
-
-        # Contadores de tráfico para cada carril
-        self.traffic_counts = {
-            "Norte": 0,
-            "Sur": 0,
-            "Este": 0,
-            "Oeste": 0
-        }
-
-        # Historial de flujo de tráfico para análisis
-        self.traffic_history = {
-            "Norte": [],
-            "Sur": [],
-            "Este": [],
-            "Oeste": []
-        }
-
-        # Velocidad de simulación
-        self.simulation_speed = 1.0
+        # Métricas en vivo para Prometheus (SEMAFOROS_METRICAS=puerto las activa)
+        # (se importa solo entonces: asyncio alarga el arranque)
+        self.monitor = None
+        puerto = os.environ.get("SEMAFOROS_METRICAS")
+        if puerto:
+            from monitoreo import MonitorMetricas
+            self.monitor = MonitorMetricas(puerto=int(puerto)).iniciar()
+        self.motor.monitor = self.monitor
 
         # Timer para actualizar la simulación
         self.timer = QTimer(self)
@@ -351,69 +76,25 @@ class SimuladorSemaforos(QMainWindow):
         self.analysis_timer.timeout.connect(self.analyze_traffic_load)
         self.analysis_timer.start(3000)  # Analyze traffic every 3 seconds
 
-        self.current_step = 0
-        self.max_steps = 5  # Número de pasos en un ciclo completo
-
-        # Estado actual de la simulación
-        self.estado_actual = "Sur_verde"
-        self.contador = 0
-
-        # Variable para controlar priorización de dirección
-        self.prioritized_direction = None
-        self.priority_counter = 0
-
-        # Historial de estados para Petri Net
-        self.state_history = ["Sur_verde"]
+        # Los redibujados se agrupan en uno por cuadro de pantalla
+        self.redibujo = PlanificadorRedibujo(self)
 
         # Configurar la interfaz gráfica
         self.setup_ui()
 
     def update_vehicles(self):
         """
-        Actualiza la posición de todos los vehículos y maneja la eliminación de los
-        que salen de la pantalla.
+        Avanza los vehículos del motor y redibuja si hay cambios.
         """
-        vehicles_to_remove = []
-
-        # Variable para rastrear si hay vehículos en la intersección
-        vehicles_in_intersection = {}
-
-        for vehicle in self.vehicles:
-            # Actualizar posición considerando semáforos e intersección
-            old_position = vehicle.position
-            vehicle.update_position(self.simulation_speed, self.semaforos_vehiculares)
-
-            # Registrar vehículos en la intersección
-            if vehicle.in_intersection:
-                vehicles_in_intersection[vehicle.lane] = vehicles_in_intersection.get(vehicle.lane, 0) + 1
-
-                # Asegurar que el vehículo siempre avance cuando está en la intersección
-                if abs(vehicle.position - old_position) < 0.1:  # Si apenas se movió
-                    # Forzar movimiento
-                    if vehicle.current_direction in ["Norte", "Este"]:
-                        vehicle.position += 0.5  # Mover un poco hacia adelante
-                    else:  # Sur, Oeste
-                        vehicle.position -= 0.5
-
-            # Verificar si el vehículo salió de la pantalla (considerando la dirección actual)
-            if (vehicle.current_direction in ["Norte", "Este"] and vehicle.position > 100) or \
-            (vehicle.current_direction in ["Sur", "Oeste"] and vehicle.position < 0):
-                vehicles_to_remove.append(vehicle)
-
-        # Eliminar vehículos que han salido de la pantalla
-        for vehicle in vehicles_to_remove:
-            if vehicle in self.vehicles:
-                self.vehicles.remove(vehicle)
-                # Disminuir contador de tráfico
-                if vehicle.lane in self.traffic_counts:
-                    self.traffic_counts[vehicle.lane] = max(0, self.traffic_counts[vehicle.lane] - 1)
+        vehicles_removed = self.motor.update_vehicles()
 
-        # Actualizar visualización si hay cambios
-        if vehicles_to_remove or self.vehicles:
-            self.dibujar_cruce()
+        # La preempción cambia las señales fuera del temporizador de fase
+        if self.motor.preempcion is not None and self.motor.preempcion.activa:
+            self.estado_label.setText(self.motor.mensaje_estado)
 
-        # Visualizar estadísticas de intersección
-        self.intersection_stats = vehicles_in_intersection
+        # Actualizar visualización si hay cambios
+        if vehicles_removed or self.motor.vehicles:
+            self.redibujo.pedir(self.dibujar_cruce)
 
     def setup_ui(self):
         self.setWindowTitle("Simulador de Semáforos Mejorado")
@@ -437,7 +118,9 @@ class SimuladorSemaforos(QMainWindow):
         self.view.setRenderHint(QPainter.RenderHint.Antialiasing)
         self.view.setSceneRect(QRectF(0, 0, 900, 700))
 
-        sim_layout.addWidget(self.view)
+        # Con la vista de lienzo el cruce se pinta directamente y la escena no se usa
+        self.lienzo = LienzoCruce(self.motor) if self.vista == "lienzo" else None
+        sim_layout.addWidget(self.lienzo or self.view)
 
         # Controles de simulación
         control_layout = QHBoxLayout()
@@ -462,6 +145,12 @@ class SimuladorSemaforos(QMainWindow):
         self.reset_button.clicked.connect(self.reiniciar_simulacion)
         basic_layout.addWidget(self.reset_button)
 
+        # Selección del controlador de fases
+        self.controller_combo = QComboBox()
+        self.controller_combo.addItems(["Ciclo fijo", "NEMA doble anillo", "Predictivo"])
+        self.controller_combo.currentIndexChanged.connect(self.cambiar_controlador)
+        basic_layout.addWidget(self.controller_combo)
+
         control_layout.addWidget(basic_controls)
 
         # Grupo de control de velocidad
@@ -513,6 +202,11 @@ class SimuladorSemaforos(QMainWindow):
         self.add_west_btn.clicked.connect(lambda: self.add_vehicle("Oeste"))
         vehicles_layout.addWidget(self.add_west_btn, 1, 1)
 
+        # Vehículo de emergencia en una aproximación al azar (pide preempción)
+        self.add_emergency_btn = QPushButton("Agregar Emergencia")
+        self.add_emergency_btn.clicked.connect(self.add_emergency_vehicle)
+        vehicles_layout.addWidget(self.add_emergency_btn, 2, 0, 1, 2)
+
         # Control de densidad de tráfico
         density_layout = QHBoxLayout()
 
@@ -528,6 +222,47 @@ class SimuladorSemaforos(QMainWindow):
 
         vehicles_layout.addLayout(density_layout, 2, 0, 1, 2)
 
+        # Perfil de demanda por hora del día
+        profile_layout = QHBoxLayout()
+
+        self.load_profile_btn = QPushButton("Cargar Perfil de Demanda")
+        self.load_profile_btn.clicked.connect(self.cargar_perfil_demanda)
+        profile_layout.addWidget(self.load_profile_btn)
+
+        profile_layout.addWidget(QLabel("Hora inicio:"))
+        self.profile_hour_spinner = QSpinBox()
+        self.profile_hour_spinner.setMinimum(0)
+        self.profile_hour_spinner.setMaximum(23)
+        self.profile_hour_spinner.setValue(7)
+        profile_layout.addWidget(self.profile_hour_spinner)
+
+        self.profile_label = QLabel("Sin perfil")
+        profile_layout.addWidget(self.profile_label)
+
+        vehicles_layout.addLayout(profile_layout, 3, 0, 1, 2)
+
+        # Carriles por aproximación y bahía de giro a la izquierda
+        lanes_layout = QHBoxLayout()
+
+        lanes_layout.addWidget(QLabel("Carriles:"))
+        self.lanes_spinner = QSpinBox()
+        self.lanes_spinner.setMinimum(1)
+        self.lanes_spinner.setMaximum(3)
+        self.lanes_spinner.setValue(1)
+        self.lanes_spinner.valueChanged.connect(self.cambiar_carriles)
+        lanes_layout.addWidget(self.lanes_spinner)
+
+        lanes_layout.addWidget(QLabel("Bahía izquierda (px):"))
+        self.bay_spinner = QSpinBox()
+        self.bay_spinner.setMinimum(0)
+        self.bay_spinner.setMaximum(250)
+        self.bay_spinner.setSingleStep(10)
+        self.bay_spinner.setValue(0)
+        self.bay_spinner.valueChanged.connect(self.cambiar_carriles)
+        lanes_layout.addWidget(self.bay_spinner)
+
+        vehicles_layout.addLayout(lanes_layout, 4, 0, 1, 2)
+
         # Agregar a la interfaz principal
         sim_layout.addWidget(vehicles_controls)
 
@@ -567,193 +302,117 @@ class SimuladorSemaforos(QMainWindow):
         main_layout.addWidget(self.tabs)
 
         # Dibujar el cruce inicial
-        self.dibujar_cruce()
-        self.dibujar_petri_net()
-
-        # Configurar timer para auto-tráfico
-        self.traffic_timer = QTimer(self)
-        self.traffic_timer.timeout.connect(self.generate_traffic)
+        self.redibujo.pedir(self.dibujar_cruce)
+        self.redibujo.pedir(self.dibujar_petri_net)
 
     def add_vehicle(self, lane, destination=None):
         """
         Añade un vehículo en el carril especificado con un destino opcional.
         Si no se especifica destino, se asigna uno por defecto (movimiento recto).
         """
-        # Determinar posición inicial según el carril
-        if lane == "Norte":
-            self.vehicles.append(Vehicle("Norte", 0, destination))
-        elif lane == "Sur":
-            self.vehicles.append(Vehicle("Sur", 100, destination))
-        elif lane == "Este":
-            self.vehicles.append(Vehicle("Este", 0, destination))
-        elif lane == "Oeste":
-            self.vehicles.append(Vehicle("Oeste", 100, destination))
-
-        # Actualizar contadores de tráfico
-        self.traffic_counts[lane] += 1
+        self.motor.add_vehicle(lane, destination)
 
         # Actualizar visualización
-        self.dibujar_cruce()
+        self.redibujo.pedir(self.dibujar_cruce)
+
+    def add_emergency_vehicle(self):
+        """
+        Añade un vehículo de emergencia en una aproximación al azar, de un
+        flujo propio para no alterar las llegadas automáticas.
+        """
+        azar = self.motor.flujos.flujo("emergencias")
+        self.motor.add_vehicle(str(azar.choice(("Norte", "Sur", "Este", "Oeste"))), emergencia=True)
+        self.redibujo.pedir(self.dibujar_cruce)
 
     def set_auto_traffic(self, value):
         """
         Configura la generación automática de tráfico según la densidad especificada.
         """
-        if value > 0:
-            # Iniciar generación automática de tráfico
-            interval = 5000 // value  # Más densidad = intervalos más cortos
-            self.traffic_timer.start(interval)
-        else:
-            # Detener generación automática
-            self.traffic_timer.stop()
+        self.motor.set_auto_traffic(value)
+        self.profile_label.setText("Sin perfil")
 
-    def generate_traffic(self):
+    def cargar_perfil_demanda(self):
         """
-        Genera tráfico con patrones origen-destino realistas.
-        Los vehículos pueden ir recto, girar a la izquierda o a la derecha.
+        Carga un perfil de demanda diario desde un archivo JSON y lo usa para
+        las llegadas automáticas a partir de la hora de inicio seleccionada.
         """
-        import random
-
-        # Definimos todas las combinaciones origen-destino válidas
-        traffic_patterns = {
-            # Desde Norte
-            "Norte": ["Sur", "Este", "Oeste"],  # Recto, derecha, izquierda
-            # Desde Sur
-            "Sur": ["Norte", "Este", "Oeste"],  # Recto, izquierda, derecha
-            # Desde Este
-            "Este": ["Oeste", "Norte", "Sur"],  # Recto, izquierda, derecha
-            # Desde Oeste
-            "Oeste": ["Este", "Norte", "Sur"]   # Recto, derecha, izquierda
-        }
-
-        # Seleccionar un origen aleatorio
-        origin = random.choice(list(traffic_patterns.keys()))
-        
-        # Seleccionar un destino aleatorio para ese origen
-        destination = random.choice(traffic_patterns[origin])
-        
-        # Pesos diferentes para favorecer movimiento recto vs. giros
-        weights = []
-        for dest in traffic_patterns[origin]:
-            if dest == self._get_opposite_direction(origin):  # Es el destino recto
-                weights.append(0.6)  # 60% probabilidad para movimiento recto
-            else:
-                weights.append(0.2)  # 20% probabilidad para cada giro
-        
-        # Seleccionar destino basado en pesos
-        destination = random.choices(traffic_patterns[origin], weights=weights)[0]
-        
-        print(f"Generando vehículo: {origin} → {destination}")
-        
-        # Crear vehículo con posición y destino
-        self.add_vehicle(origin, destination)
-
-    def _get_opposite_direction(self, direction):
-        """Helper para obtener la dirección opuesta (para movimiento recto)"""
-        opposites = {
-            "Norte": "Sur",
-            "Sur": "Norte",
-            "Este": "Oeste",
-            "Oeste": "Este"
-        }
-        return opposites.get(direction)
+        ruta, _ = QFileDialog.getOpenFileName(self, "Cargar perfil de demanda", "perfiles", "Perfiles (*.json)")
+        if not ruta:
+            return
 
-    def change_speed(self, value):
-        self.simulation_speed = value / 5.0
-        self.speed_value_label.setText(f"{self.simulation_speed:.1f}x")
-
-    def contar_vehiculos_cercanos(self):
-        # Actualizar contadores de tráfico para cada carril
-        # Reiniciar contadores
-        prev_counts = self.traffic_counts.copy()
-        self.traffic_counts = {
-            "Norte": 0,
-            "Sur": 0,
-            "Este": 0,
-            "Oeste": 0
-        }
-
-        # Contar vehículos cerca del cruce (área de influencia)
-        for vehicle in self.vehicles:
-            is_near = False
-            if vehicle.lane == "Norte" and 30 <= vehicle.position <= 70:
-                self.traffic_counts["Norte"] += 1
-                is_near = True
-            elif vehicle.lane == "Sur" and 30 <= vehicle.position <= 70:
-                self.traffic_counts["Sur"] += 1
-                is_near = True
-            elif vehicle.lane == "Este" and 30 <= vehicle.position <= 70:
-                self.traffic_counts["Este"] += 1
-                is_near = True
-            elif vehicle.lane == "Oeste" and 30 <= vehicle.position <= 70:
-                self.traffic_counts["Oeste"] += 1
-                is_near = True
-
-        # Actualizar historial para análisis de tendencias
-        for direction in self.traffic_counts:
-            self.traffic_history[direction].append(self.traffic_counts[direction])
-            # Mantener solo los últimos 10 valores para análisis
-            if len(self.traffic_history[direction]) > 10:
-                self.traffic_history[direction].pop(0)
+        try:
+            perfil = PerfilDemanda.cargar(ruta)
+        except (OSError, ValueError, KeyError) as e:
+            self.profile_label.setText(f"Perfil no válido: {e}")
+            return
 
-    def analyze_traffic_load(self):
+        self.usar_perfil_demanda(perfil, self.profile_hour_spinner.value())
+
+    def usar_perfil_demanda(self, perfil, hora_inicio=7):
+        """
+        Activa un perfil de demanda; el reloj actual corresponde a hora_inicio.
+        """
+        # Poner la densidad fija a 0 sin disparar set_auto_traffic
+        self.density_spinner.blockSignals(True)
+        self.density_spinner.setValue(0)
+        self.density_spinner.blockSignals(False)
+
+        self.motor.usar_perfil_demanda(perfil, hora_inicio)
+        self.profile_label.setText(f"Perfil: {perfil.nombre or 'sin nombre'} desde las {hora_inicio:02d}:00")
+
+    def generate_traffic(self):
+        """
+        Genera un vehículo con un patrón origen-destino aleatorio.
+        """
+        self.motor.generate_traffic()
+        self.redibujo.pedir(self.dibujar_cruce)
+
+    def cambiar_controlador(self, indice):
         """
-        Analiza la carga de tráfico actual y ajusta el timing de los semáforos
+        Alterna entre el ciclo fijo de la red de Petri, el controlador NEMA y
+        el predictivo. El predictivo prueba sus acciones en este proceso
+        (sin fork() desde la interfaz) dentro de PRESUPUESTO_PREDICTIVO.
         """
-        # Encontrar dirección con mayor carga de tráfico
-        max_load = 0
-        busiest_direction = None
-
-        for direction, count in self.traffic_counts.items():
-            if count > max_load:
-                max_load = count
-                busiest_direction = direction
-
-        # Si hay una dirección con carga significativamente mayor
-        total_vehicles = sum(self.traffic_counts.values())
-        if total_vehicles > 0 and max_load >= 5 and max_load / total_vehicles >= 0.4:
-            self.prioritize_direction(busiest_direction)
-            return True
-
-        # Si no hay dirección con mucho tráfico, quitar priorización
-        if self.prioritized_direction:
-            self.prioritized_direction = None
-            self.priority_counter = 0
-            self.priority_label.setText("Sin priorización de tráfico")
-            # Restablecer tiempos normales
-            for direction, semaforo in self.semaforos_vehiculares.items():
-                semaforo.resetear_tiempo_verde()
-
-        return False
-
-    def prioritize_direction(self, direction):
+        controladores = {1: ControladorNEMA, 2: lambda: ControladorPredictivo(
+            horizonte=HORIZONTE_PREDICTIVO, presupuesto=PRESUPUESTO_PREDICTIVO, procesos=1)}
+        fabrica = controladores.get(indice)
+        self.motor.usar_controlador(fabrica() if fabrica else None)
+        self.estado_label.setText(self.motor.mensaje_estado)
+        self.redibujo.pedir(self.dibujar_cruce)
+        self.redibujo.pedir(self.dibujar_petri_net)
+
+    def cambiar_carriles(self):
         """
-        Ajusta la secuencia de luces para priorizar una dirección con alto tráfico
+        Aplica el número de carriles y la bahía elegidos. Un carril sin bahía
+        vuelve a la geometría original; el cambio vacía la intersección.
         """
-        # Si es una nueva dirección a priorizar o ha pasado tiempo suficiente
-        if direction != self.prioritized_direction or self.priority_counter >= 5:
-            # Actualizar dirección priorizada
-            self.prioritized_direction = direction
-            self.priority_counter = 0
-
-            # Actualizar etiqueta
-            self.priority_label.setText(f"Priorización de tráfico: {direction} ({self.traffic_counts[direction]} vehículos)")
-
-            # Extender tiempo en verde para esta dirección
-            semaforo = self.semaforos_vehiculares.get(direction)
-            if semaforo:
-                extended = semaforo.extender_tiempo_verde()
-                if extended:
-                    print(f"Extendiendo tiempo en verde para {direction} debido a alto tráfico")
+        carriles = self.lanes_spinner.value()
+        bahia = self.bay_spinner.value()
+        if carriles == 1 and bahia == 0:
+            self.motor.usar_carriles(None)
         else:
-            # Incrementar contador para esta dirección
-            self.priority_counter += 1
+            self.motor.usar_carriles(configuracion_uniforme(carriles, bahia_izquierda=bahia or None))
+        self.redibujo.pedir(self.dibujar_cruce)
+
+    def change_speed(self, value):
+        self.motor.simulation_speed = value / 5.0
+        self.speed_value_label.setText(f"{self.motor.simulation_speed:.1f}x")
+
+    def analyze_traffic_load(self):
+        """
+        Analiza la carga de tráfico en el motor y muestra la priorización resultante.
+        """
+        prioritized = self.motor.analyze_traffic_load()
+        self.priority_label.setText(self.motor.mensaje_prioridad)
+        return prioritized
 
     def dibujar_cruce(self):
-        self.scene.clear()
+        if self.lienzo is not None:
+            self.lienzo.update()
+            return
 
-        # Actualizar contadores de tráfico
-        self.contar_vehiculos_cercanos()
+        inicio = time.perf_counter()
+        self.scene.clear()
 
         # Dibujar calles más anchas
         # Horizontal
@@ -766,13 +425,22 @@ class SimuladorSemaforos(QMainWindow):
         self.scene.addLine(0, 350, 900, 350, pen)  # Horizontal
         self.scene.addLine(450, 0, 450, 700, pen)  # Vertical
 
+        # Carriles y sus semáforos cuando hay varios por aproximación
+        if self.motor.carriles is not None:
+            self.dibujar_carriles()
+
         # Dibujar caja de intersección que no debe bloquearse
         intersection_pen = QPen(QColor(255, 0, 0), 2, Qt.PenStyle.DashLine)
         self.scene.addRect(415, 315, 70, 70, intersection_pen)
 
+        # Celdas de conflicto reservadas por vehículos que cruzan
+        reserva_brush = QBrush(QColor(255, 0, 0, 60))
+        for x, y, ancho, alto in self.motor.conflictos.ocupadas():
+            self.scene.addRect(x, y, ancho, alto, QPen(Qt.PenStyle.NoPen), reserva_brush)
+
         # Añadir etiqueta de advertencia si hay vehículos en la intersección
-        if hasattr(self, 'intersection_stats') and self.intersection_stats:
-            total_in_intersection = sum(self.intersection_stats.values())
+        if self.motor.intersection_stats:
+            total_in_intersection = sum(self.motor.intersection_stats.values())
             if total_in_intersection > 0:
                 warning_text = self.scene.addText(f"¡{total_in_intersection} vehículo(s) en intersección!")
                 warning_text.setDefaultTextColor(QColor(255, 0, 0))
@@ -822,6 +490,27 @@ class SimuladorSemaforos(QMainWindow):
         # Dibujar leyenda de colores de vehículos
         self.dibujar_leyenda_vehiculos()
 
+        if self.monitor is not None:
+            self.monitor.observar_render(time.perf_counter() - inicio)
+
+    def dibujar_carriles(self):
+        """
+        Divisorias entre carriles y una cabeza de semáforo por carril con la
+        indicación de los movimientos que admite.
+        """
+        config = self.motor.carriles
+        colores = {"verde": QColor(0, 255, 0), "amarillo": QColor(255, 255, 0), "rojo": QColor(255, 0, 0)}
+        divisorias, cabezas = config.marcas()
+
+        pen = QPen(Qt.GlobalColor.white, 1)
+        for (x0, y0), (x1, y1) in divisorias:
+            self.scene.addLine(x0, y0, x1, y1, pen)
+
+        for aproximacion, k, x, y in cabezas:
+            movimientos = config.aproximaciones[aproximacion][k].movimientos
+            estado = self.motor.semaforos_vehiculares[aproximacion].estado_carril(movimientos)
+            self.scene.addEllipse(x - 3, y - 3, 6, 6, QPen(Qt.GlobalColor.black), QBrush(colores[estado]))
+
     def dibujar_leyenda_vehiculos(self):
         """
         Añade una leyenda para explicar los colores de los vehículos.
@@ -874,25 +563,25 @@ class SimuladorSemaforos(QMainWindow):
 
         # Norte - cámara y contador
         camera_norte = self.scene.addRect(430, 120, 25, 15, camera_pen, camera_brush)
-        text_norte = self.scene.addText(f"Tráfico: {self.traffic_counts['Norte']}", counter_font)
+        text_norte = self.scene.addText(f"Tráfico: {self.motor.traffic_counts['Norte']}", counter_font)
         text_norte.setPos(465, 115)
         text_norte.setDefaultTextColor(QColor(255, 255, 255))
 
         # Sur - cámara y contador
         camera_sur = self.scene.addRect(445, 565, 25, 15, camera_pen, camera_brush)
-        text_sur = self.scene.addText(f"Tráfico: {self.traffic_counts['Sur']}", counter_font)
+        text_sur = self.scene.addText(f"Tráfico: {self.motor.traffic_counts['Sur']}", counter_font)
         text_sur.setPos(480, 560)
         text_sur.setDefaultTextColor(QColor(255, 255, 255))
 
         # Este - cámara y contador
         camera_este = self.scene.addRect(565, 315, 15, 25, camera_pen, camera_brush)
-        text_este = self.scene.addText(f"Tráfico: {self.traffic_counts['Este']}", counter_font)
+        text_este = self.scene.addText(f"Tráfico: {self.motor.traffic_counts['Este']}", counter_font)
         text_este.setPos(585, 310)
         text_este.setDefaultTextColor(QColor(255, 255, 255))
 
         # Oeste - cámara y contador
         camera_oeste = self.scene.addRect(320, 345, 15, 25, camera_pen, camera_brush)
-        text_oeste = self.scene.addText(f"Tráfico: {self.traffic_counts['Oeste']}", counter_font)
+        text_oeste = self.scene.addText(f"Tráfico: {self.motor.traffic_counts['Oeste']}", counter_font)
         text_oeste.setPos(250, 340)
         text_oeste.setDefaultTextColor(QColor(255, 255, 255))
         
@@ -900,12 +589,12 @@ class SimuladorSemaforos(QMainWindow):
         """
         Dibuja todos los vehículos en la escena con colores según su destino.
         """
-        for vehicle in self.vehicles:
+        for vehicle in self.motor.vehicles:
             # Obtener posición y rotación según el estado actual del vehículo
             x, y, rotation = vehicle.get_display_position()
 
             # Obtener color según destino
-            vehicle_color = vehicle.get_color_based_on_destination()
+            vehicle_color = QColor(*vehicle.get_color_based_on_destination())
 
             # Dibujar triángulo para representar el vehículo
             polygon = QPolygonF([
@@ -936,7 +625,7 @@ class SimuladorSemaforos(QMainWindow):
                 
     def dibujar_semaforo_vehicular(self, direccion, x, y, rotacion):
         # Obtener el estado del semáforo
-        semaforo = self.semaforos_vehiculares[direccion]
+        semaforo = self.motor.semaforos_vehiculares[direccion]
 
         # Crear un contenedor para agrupar todos los componentes del semáforo
         semaforo_container = self.scene.createItemGroup([])
@@ -971,7 +660,7 @@ class SimuladorSemaforos(QMainWindow):
         font = QFont("Arial", 10, QFont.Weight.Bold)
         for idx, estado in enumerate(["rojo", "amarillo", "verde"]):
             tokens_text = f"{estado[0].upper()}: {semaforo.tokens[estado]}"
-            if estado == "verde" and self.prioritized_direction == direccion:
+            if estado == "verde" and self.motor.prioritized_direction == direccion:
                 tokens_text += f" ({semaforo.tiempo_verde}s)"
 
             text = self.scene.addText(tokens_text, font)
@@ -986,7 +675,7 @@ class SimuladorSemaforos(QMainWindow):
                 
     def dibujar_semaforo_peatonal(self, key, x, y, rotacion=0):
         # Obtener el estado del semáforo
-        semaforo = self.semaforos_peatonales[key]
+        semaforo = self.motor.semaforos_peatonales[key]
         carril, tipo = key.split('_')  # Separar en carril y tipo (directo/indirecto)
 
         # Determinar color según el estado
@@ -1024,9 +713,10 @@ class SimuladorSemaforos(QMainWindow):
         semaforo_container.setPos(x, y)
         semaforo_container.setRotation(rotacion)
         
-        # Mostrar información adicional en la consola para debugging
+        # Registrar información adicional para debugging
         estado_txt = "ACTIVO" if semaforo.estado == "blanco" else "INACTIVO"
-        print(f"Semáforo peatonal {carril}_{tipo} ({texto_id}): {estado_txt} - Posición: ({x}, {y})")
+        self.registro.evento("semaforo_peatonal", nivel="debug", semaforo=key, id=texto_id,
+                             estado=estado_txt, posicion=(x, y))
         
         # Mostrar tokens (estos se mantienen fuera del grupo rotado)
         for idx, estado in enumerate(["rojo", "blanco"]):
@@ -1048,7 +738,18 @@ class SimuladorSemaforos(QMainWindow):
     def dibujar_petri_net(self):
         self.petri_scene.clear()
 
-        # Definimos los estados y transiciones de la red de Petri
+        # Definimos los estados y transiciones de la red de Petri; un
+        # controlador externo aporta su propia red (lugares marcados = activos)
+        controlador = self.motor.controlador
+        activos = {self.motor.estado_actual}
+        if controlador is not None:
+            states, transitions = controlador.red_petri()
+            activos = controlador.estados_activos()
+            # Barrera entre los grupos de fases
+            self.petri_scene.addLine(360, 80, 360, 620, QPen(QColor(0, 0, 0), 3, Qt.PenStyle.DashLine))
+            self.dibujar_red_petri(states, transitions, activos)
+            return
+
         states = [
             {"name": "Sur_verde", "pos": (450, 100)},
             {"name": "Sur_amarillo", "pos": (250, 250)},
@@ -1070,6 +771,13 @@ class SimuladorSemaforos(QMainWindow):
             {"from": "Este_verde", "to": "Este_amarillo", "label": "tiempo"},
             {"from": "Este_amarillo", "to": "Sur_verde", "label": "tiempo"},
         ]
+        self.dibujar_red_petri(states, transitions, activos)
+
+    def dibujar_red_petri(self, states, transitions, activos):
+        """
+        Dibuja lugares, transiciones y leyenda de la red de Petri; activos son
+        los nombres de los estados marcados.
+        """
 
         # Dibujar flechas de transición
         arrow_pen = QPen(QColor(0, 0, 0), 2)
@@ -1102,12 +810,12 @@ class SimuladorSemaforos(QMainWindow):
         # Dibujar estados (nodos)
         for state in states:
             # Determinar si es el estado actual
-            is_current = state["name"] == self.estado_actual
+            is_current = state["name"] in activos
 
             # Ver si este estado está priorizado (verde extendido)
             is_prioritized = False
-            if self.prioritized_direction and "_verde" in state["name"]:
-                if state["name"].startswith(f"{self.prioritized_direction}_"):
+            if self.motor.prioritized_direction and "_verde" in state["name"]:
+                if state["name"].startswith(f"{self.motor.prioritized_direction}_"):
                     is_prioritized = True
 
             # Elegir color según si es estado actual o priorizado
@@ -1133,7 +841,7 @@ class SimuladorSemaforos(QMainWindow):
             # Mostrar tiempo extendido si aplica
             if is_prioritized:
                 direccion = state["name"].split("_")[0]
-                semaforo = self.semaforos_vehiculares.get(direccion)
+                semaforo = self.motor.semaforos_vehiculares.get(direccion)
                 if semaforo:
                     tiempo_text = self.petri_scene.addText(f"{semaforo.tiempo_verde}s")
                     tiempo_text.setPos(state["pos"][0] - 10, state["pos"][1] + 10)
@@ -1206,7 +914,7 @@ class SimuladorSemaforos(QMainWindow):
         self.petri_scene.addPolygon(arrow, QPen(Qt.GlobalColor.black), QBrush(Qt.GlobalColor.black))
         
     def iniciar_simulacion(self):
-        self.timer.start(int(1500 / self.simulation_speed))
+        self.timer.start(int(1500 / self.motor.simulation_speed))
 
     def pausar_simulacion(self):
         self.timer.stop()
@@ -1218,365 +926,54 @@ class SimuladorSemaforos(QMainWindow):
     def reiniciar_simulacion(self):
         self.timer.stop()
         self.vehicle_timer.stop()
-        self.traffic_timer.stop()
         self.analysis_timer.stop()
 
-        # Limpiar vehículos
-        self.vehicles.clear()
-
-        # Reiniciar densidad automática
+        # Reiniciar densidad automática y todo el estado del motor
         self.density_spinner.setValue(0)
+        self.motor.reiniciar()
 
-        # Reiniciar contadores de tráfico
-        self.traffic_counts = {
-            "Norte": 0,
-            "Sur": 0,
-            "Este": 0,
-            "Oeste": 0
-        }
-
-        # Reiniciar historial de tráfico
-        self.traffic_history = {
-            "Norte": [],
-            "Sur": [],
-            "Este": [],
-            "Oeste": []
-        }
-
-        # Reiniciar priorización
-        self.prioritized_direction = None
-        self.priority_counter = 0
-        self.priority_label.setText("Sin priorización de tráfico")
-
-        # Reiniciar todos los semáforos a su estado inicial
-        for direccion, semaforo in self.semaforos_vehiculares.items():
-            if direccion == "Sur":
-                semaforo.estado = "verde"
-                semaforo.tokens = {"verde": 1, "amarillo": 0, "rojo": 0}
-            else:
-                semaforo.estado = "rojo"
-                semaforo.tokens = {"verde": 0, "amarillo": 0, "rojo": 1}
-            semaforo.resetear_tiempo_verde()
-
-        # Reiniciar semáforos peatonales según la nueva lógica
-        carril_activo = "Sur"  # El semáforo Sur comienza en verde
-        rutas_vehiculos = self.calcular_rutas_vehiculos(carril_activo)
-        self.actualizar_semaforos_peatonales(carril_activo, rutas_vehiculos)
-
-        self.estado_actual = "Sur_verde"
-        self.contador = 0
-        self.dibujar_cruce()
-        self.dibujar_petri_net()
-        self.estado_label.setText("Estado: Sur en verde")
-
-        # Reiniciar history
-        self.state_history = ["Sur_verde"]
+        self.priority_label.setText(self.motor.mensaje_prioridad)
+        self.estado_label.setText(self.motor.mensaje_estado)
+        self.profile_label.setText("Sin perfil")
+        self.redibujo.pedir(self.dibujar_cruce)
+        self.redibujo.pedir(self.dibujar_petri_net)
 
         # Reanudar timer de vehículos y análisis
         self.vehicle_timer.start(50)
         self.analysis_timer.start(3000)
+
+    def closeEvent(self, event):
+        # Vaciar el registro de eventos pendiente antes de salir
+        self.registro.cerrar()
+        if self.monitor is not None:
+            self.monitor.cerrar()
+        super().closeEvent(event)
         
     def actualizar_simulacion(self):
         """
-        Actualiza el estado de los semáforos vehiculares y peatonales según la lógica de la red de Petri
-        y considerando posibles rutas de vehículos para los estados peatonales.
+        Avanza un paso el ciclo de semáforos del motor y actualiza la visualización.
         """
-        # Guardar estado anterior para actualizar el historial
-        prev_state = self.estado_actual
-        prev_contador = self.contador
-
-        # Analizar carga de tráfico para priorizar direcciones
-        self.analyze_traffic_load()
-
-        # Determinar el carril activo (con semáforo en verde)
-        carril_activo = None
-        for direccion, semaforo in self.semaforos_vehiculares.items():
-            if semaforo.estado == "verde":
-                carril_activo = direccion
-                break
-
-        # === ACTUALIZACIÓN DE ESTADOS DEL CICLO DE SEMÁFOROS ===
-        if self.estado_actual == "Sur_verde":
-            if self.contador == 0 and (self.prioritized_direction != "Sur" or
-                                    self.semaforos_vehiculares["Sur"].tiempo_verde <= 1):
-                self.estado_label.setText("Estado: Sur en verde")
-                self.contador += 1
-            elif self.contador < self.semaforos_vehiculares["Sur"].tiempo_verde - 1:
-                self.estado_label.setText(f"Estado: Sur en verde (extendido {self.contador+1}/{self.semaforos_vehiculares['Sur'].tiempo_verde})")
-                self.contador += 1
-            else:
-                # Cambiar a amarillo
-                self.semaforos_vehiculares["Sur"].cambiar_estado("amarillo")
-                self.semaforos_vehiculares["Sur"].agregar_token("amarillo")
-                self.semaforos_vehiculares["Sur"].quitar_token("verde")
-                self.estado_label.setText("Estado: Sur cambia a amarillo")
-                self.estado_actual = "Sur_amarillo"
-                self.contador = 0
-                # Resetear tiempo extendido
-                self.semaforos_vehiculares["Sur"].resetear_tiempo_verde()
-
-                # Añadir nuevo estado al historial
-                self.state_history.append("Sur_amarillo")
-
-        elif self.estado_actual == "Sur_amarillo":
-            # Cambiar a rojo
-            self.semaforos_vehiculares["Sur"].cambiar_estado("rojo")
-            self.semaforos_vehiculares["Sur"].agregar_token("rojo")
-            self.semaforos_vehiculares["Sur"].quitar_token("amarillo")
-
-            # Activar semáforo Oeste
-            self.semaforos_vehiculares["Oeste"].cambiar_estado("verde")
-            self.semaforos_vehiculares["Oeste"].agregar_token("verde")
-            self.semaforos_vehiculares["Oeste"].quitar_token("rojo")
-
-            self.estado_label.setText("Estado: Sur cambia a rojo, Oeste cambia a verde")
-            self.estado_actual = "Oeste_verde"
-            self.contador = 0
-
-            # Añadir nuevo estado al historial
-            self.state_history.append("Oeste_verde")
-
-        elif self.estado_actual == "Oeste_verde":
-            if self.contador == 0 and (self.prioritized_direction != "Oeste" or
-                                    self.semaforos_vehiculares["Oeste"].tiempo_verde <= 1):
-                self.estado_label.setText("Estado: Oeste en verde")
-                self.contador += 1
-            elif self.contador < self.semaforos_vehiculares["Oeste"].tiempo_verde - 1:
-                self.estado_label.setText(f"Estado: Oeste en verde (extendido {self.contador+1}/{self.semaforos_vehiculares['Oeste'].tiempo_verde})")
-                self.contador += 1
-            else:
-                # Cambiar a amarillo
-                self.semaforos_vehiculares["Oeste"].cambiar_estado("amarillo")
-                self.semaforos_vehiculares["Oeste"].agregar_token("amarillo")
-                self.semaforos_vehiculares["Oeste"].quitar_token("verde")
-                self.estado_label.setText("Estado: Oeste cambia a amarillo")
-                self.estado_actual = "Oeste_amarillo"
-                self.contador = 0
-                # Resetear tiempo extendido
-                self.semaforos_vehiculares["Oeste"].resetear_tiempo_verde()
-
-                # Añadir nuevo estado al historial
-                self.state_history.append("Oeste_amarillo")
-
-        elif self.estado_actual == "Oeste_amarillo":
-            # Cambiar a rojo
-            self.semaforos_vehiculares["Oeste"].cambiar_estado("rojo")
-            self.semaforos_vehiculares["Oeste"].agregar_token("rojo")
-            self.semaforos_vehiculares["Oeste"].quitar_token("amarillo")
-
-            # Activar semáforo Norte
-            self.semaforos_vehiculares["Norte"].cambiar_estado("verde")
-            self.semaforos_vehiculares["Norte"].agregar_token("verde")
-            self.semaforos_vehiculares["Norte"].quitar_token("rojo")
-
-            self.estado_label.setText("Estado: Oeste cambia a rojo, Norte cambia a verde")
-            self.estado_actual = "Norte_verde"
-            self.contador = 0
-
-            # Añadir nuevo estado al historial
-            self.state_history.append("Norte_verde")
-
-        elif self.estado_actual == "Norte_verde":
-            if self.contador == 0 and (self.prioritized_direction != "Norte" or
-                                    self.semaforos_vehiculares["Norte"].tiempo_verde <= 1):
-                self.estado_label.setText("Estado: Norte en verde")
-                self.contador += 1
-            elif self.contador < self.semaforos_vehiculares["Norte"].tiempo_verde - 1:
-                self.estado_label.setText(f"Estado: Norte en verde (extendido {self.contador+1}/{self.semaforos_vehiculares['Norte'].tiempo_verde})")
-                self.contador += 1
-            else:
-                # Cambiar a amarillo
-                self.semaforos_vehiculares["Norte"].cambiar_estado("amarillo")
-                self.semaforos_vehiculares["Norte"].agregar_token("amarillo")
-                self.semaforos_vehiculares["Norte"].quitar_token("verde")
-                self.estado_label.setText("Estado: Norte cambia a amarillo")
-                self.estado_actual = "Norte_amarillo"
-                self.contador = 0
-                # Resetear tiempo extendido
-                self.semaforos_vehiculares["Norte"].resetear_tiempo_verde()
-
-                # Añadir nuevo estado al historial
-                self.state_history.append("Norte_amarillo")
-
-        elif self.estado_actual == "Norte_amarillo":
-            # Cambiar a rojo
-            self.semaforos_vehiculares["Norte"].cambiar_estado("rojo")
-            self.semaforos_vehiculares["Norte"].agregar_token("rojo")
-            self.semaforos_vehiculares["Norte"].quitar_token("amarillo")
-
-            # Activar semáforo Este
-            self.semaforos_vehiculares["Este"].cambiar_estado("verde")
-            self.semaforos_vehiculares["Este"].agregar_token("verde")
-            self.semaforos_vehiculares["Este"].quitar_token("rojo")
-
-            self.estado_label.setText("Estado: Norte cambia a rojo, Este cambia a verde")
-            self.estado_actual = "Este_verde"
-            self.contador = 0
-
-            # Añadir nuevo estado al historial
-            self.state_history.append("Este_verde")
-
-        elif self.estado_actual == "Este_verde":
-            if self.contador == 0 and (self.prioritized_direction != "Este" or
-                                    self.semaforos_vehiculares["Este"].tiempo_verde <= 1):
-                self.estado_label.setText("Estado: Este en verde")
-                self.contador += 1
-            elif self.contador < self.semaforos_vehiculares["Este"].tiempo_verde - 1:
-                self.estado_label.setText(f"Estado: Este en verde (extendido {self.contador+1}/{self.semaforos_vehiculares['Este'].tiempo_verde})")
-                self.contador += 1
-            else:
-                # Cambiar a amarillo
-                self.semaforos_vehiculares["Este"].cambiar_estado("amarillo")
-                self.semaforos_vehiculares["Este"].agregar_token("amarillo")
-                self.semaforos_vehiculares["Este"].quitar_token("verde")
-                self.estado_label.setText("Estado: Este cambia a amarillo")
-                self.estado_actual = "Este_amarillo"
-                self.contador = 0
-                # Resetear tiempo extendido
-                self.semaforos_vehiculares["Este"].resetear_tiempo_verde()
-
-                # Añadir nuevo estado al historial
-                self.state_history.append("Este_amarillo")
-
-        elif self.estado_actual == "Este_amarillo":
-            # Cambiar a rojo
-            self.semaforos_vehiculares["Este"].cambiar_estado("rojo")
-            self.semaforos_vehiculares["Este"].agregar_token("rojo")
-            self.semaforos_vehiculares["Este"].quitar_token("amarillo")
-
-            # Activar semáforo Sur para completar el ciclo
-            self.semaforos_vehiculares["Sur"].cambiar_estado("verde")
-            self.semaforos_vehiculares["Sur"].agregar_token("verde")
-            self.semaforos_vehiculares["Sur"].quitar_token("rojo")
-
-            self.estado_label.setText("Estado: Este cambia a rojo, Sur cambia a verde")
-            self.estado_actual = "Sur_verde"
-            self.contador = 0
-
-            # Añadir nuevo estado al historial
-            self.state_history.append("Sur_verde")
-
-        # === ACTUALIZACIÓN DE LOS SEMÁFOROS PEATONALES USANDO LA NUEVA LÓGICA ===
-        if carril_activo:
-            # Calcular rutas de vehículos posibles para el carril activo
-            rutas_vehiculos = self.calcular_rutas_vehiculos(carril_activo)
-            
-            # Actualizar estados de semáforos peatonales
-            self.actualizar_semaforos_peatonales(carril_activo, rutas_vehiculos)
+        cambio = self.motor.actualizar_simulacion()
+
+        self.estado_label.setText(self.motor.mensaje_estado)
+        self.priority_label.setText(self.motor.mensaje_prioridad)
 
         # Si el estado cambió, actualizar la visualización de Petri
-        if prev_state != self.estado_actual or prev_contador != self.contador:
-            self.dibujar_petri_net()
+        if cambio:
+            self.redibujo.pedir(self.dibujar_petri_net)
 
         # Actualizar visualización
-        self.dibujar_cruce()
+        self.redibujo.pedir(self.dibujar_cruce)
 
-    def calcular_rutas_vehiculos(self, carril_activo):
-        """
-        Calcula las posibles rutas de los vehículos en el carril activo.
-        """
-        movimientos_posibles = {
-            'Norte': ['Norte', 'Este', 'Oeste'],
-            'Sur': ['Sur', 'Este', 'Oeste'],
-            'Este': ['Este', 'Norte', 'Sur'],
-            'Oeste': ['Oeste', 'Norte', 'Sur']
-        }
-        
-        return movimientos_posibles.get(carril_activo, [])
-
-    def actualizar_semaforos_peatonales(self, carril_activo, rutas_vehiculos):
-        """
-        Actualiza los estados de los semáforos peatonales basado en el carril activo
-        y las posibles rutas de vehículos.
-        """
-        # Mapeo de nombres de semáforos peatonales en el código original a la nomenclatura actual
-        # Original: Norte_A, Norte_B, etc.
-        # Actual: Norte_directo, Norte_indirecto, etc.
-        mapeo_nombres = {
-            'Norte_A': 'Norte_directo',
-            'Norte_B': 'Norte_indirecto',
-            'Sur_A': 'Sur_directo',
-            'Sur_B': 'Sur_indirecto',
-            'Este_A': 'Este_directo',
-            'Este_B': 'Este_indirecto',
-            'Oeste_A': 'Oeste_directo',
-            'Oeste_B': 'Oeste_indirecto'
-        }
-        
-        # Mapeo inverso para facilitar la lógica
-        mapeo_inverso = {v: k for k, v in mapeo_nombres.items()}
-        
-        # Definir bloqueos para los pasos peatonales basados en rutas de vehículos
-        bloqueos_paso_b = {
-            'Norte': {
-                'Norte': ['Norte_B'],  # Recto bloquea su propio paso B
-                'Este': ['Este_B'],    # Giro a la derecha bloquea el paso B del Este
-                'Oeste': ['Oeste_B']   # Giro a la izquierda bloquea el paso B del Oeste
-            },
-            'Sur': {
-                'Sur': ['Sur_B'],      # Recto bloquea su propio paso B
-                'Este': ['Este_B'],    # Giro a la derecha bloquea el paso B del Este
-                'Oeste': ['Oeste_B']   # Giro a la izquierda bloquea el paso B del Oeste
-            },
-            'Este': {
-                'Este': ['Este_B'],    # Recto bloquea su propio paso B
-                'Norte': ['Norte_B'],  # Giro a la derecha bloquea el paso B del Norte
-                'Sur': ['Sur_B']       # Giro a la izquierda bloquea el paso B del Sur
-            },
-            'Oeste': {
-                'Oeste': ['Oeste_B'],  # Recto bloquea su propio paso B
-                'Norte': ['Norte_B'],  # Giro a la derecha bloquea el paso B del Norte
-                'Sur': ['Sur_B']       # Giro a la izquierda bloquea el paso B del Sur
-            }
-        }
-        
-        # Para cada semáforo peatonal, determinar si debe estar activo o inactivo
-        for nombre_actual, semaforo in self.semaforos_peatonales.items():
-            # Obtener el nombre equivalente en la nueva nomenclatura
-            nombre_original = mapeo_inverso.get(nombre_actual)
-            if nombre_original:
-                direccion, tipo = nombre_original.split('_')
-                
-                # Para los pasos tipo A (directos), solo están activos cuando su semáforo está en rojo
-                if tipo == 'A':
-                    if direccion == carril_activo:
-                        # Si el carril de este semáforo está en verde, el paso peatonal está inactivo
-                        semaforo.cambiar_estado("rojo")
-                        semaforo.agregar_token("rojo")
-                        semaforo.quitar_token("blanco")
-                    else:
-                        # Si el carril de este semáforo está en rojo, el paso peatonal está activo
-                        semaforo.cambiar_estado("blanco")
-                        semaforo.agregar_token("blanco")
-                        semaforo.quitar_token("rojo")
-                
-                # Para los pasos tipo B (indirectos), depende de las rutas de vehículos
-                else:  # tipo == 'B'
-                    # Verificar si este paso está bloqueado por alguna ruta activa
-                    bloqueado = False
-                    
-                    # Solo considerar bloqueos si el origen es el carril activo
-                    if carril_activo in bloqueos_paso_b:
-                        for destino in rutas_vehiculos:
-                            if destino in bloqueos_paso_b[carril_activo]:
-                                pasos_bloqueados = bloqueos_paso_b[carril_activo][destino]
-                                if nombre_original in pasos_bloqueados:
-                                    bloqueado = True
-                                    break
-                    
-                    if bloqueado:
-                        semaforo.cambiar_estado("rojo")
-                        semaforo.agregar_token("rojo")
-                        semaforo.quitar_token("blanco")
-                    else:
-                        semaforo.cambiar_estado("blanco")
-                        semaforo.agregar_token("blanco")
-                        semaforo.quitar_token("rojo")
-        
 def main():
     app = QApplication(sys.argv)
-    window = SimuladorSemaforos()
+    # SEMAFOROS_SEMILLA fija la semilla maestra para repetir una corrida
+    semilla = os.environ.get("SEMAFOROS_SEMILLA")
+    window = SimuladorSemaforos(int(semilla) if semilla else None)
     window.show()
+    # Usado por build.py para medir el tiempo de arranque
+    if os.environ.get("SEMAFOROS_SALIR_AL_INICIAR"):
+        QTimer.singleShot(0, app.quit)
     sys.exit(app.exec())
 
 if __name__ == "__main__":
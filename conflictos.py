@@ -0,0 +1,158 @@
+"""
+Rejilla de zonas de conflicto dentro de la intersección.
+
+La caja del cruce se divide en celdas y una tabla de reservas guarda qué
+vehículo ocupa cada una. Antes de entrar en la caja un vehículo reserva de
+una vez todas las celdas que pisa su ruta (todo o nada, así no hay bloqueos
+mutuos); mientras avanza va liberando las celdas que ya dejó atrás. Los
+vehículos que siguen la misma ruta no entran en conflicto entre sí y pueden
+compartir celdas en fila. Un vehículo cuya reserva falla espera en el borde
+de la caja.
+
+Las celdas de cada ruta se calculan una sola vez, así que reservar, comprobar
+y liberar cuestan O(celdas de la ruta) y no hay comparaciones entre pares de
+vehículos. Con esto se pueden simular giros permisivos (el giro solo entra si
+su trayectoria está libre) y el giro a la derecha en rojo.
+"""
+
+import numpy as np
+
+# Caja de la intersección en circulacion.py (x, y, ancho, alto) y celdas por lado
+CAJA_CRUCE = (415, 315, 70, 70)
+CELDAS_POR_LADO = 5
+
+# Longitud de un vehículo (px): una celda se libera cuando la cola la ha dejado
+LARGO_VEHICULO = 20
+
+# Margen con el que un vehículo que no consigue reserva se detiene antes de la caja
+HOLGURA = 1.0
+
+
+class RejillaConflictos:
+    def __init__(self, caja=CAJA_CRUCE, filas=CELDAS_POR_LADO, columnas=CELDAS_POR_LADO,
+                 giro_en_rojo=True):
+        """
+        caja: (x, y, ancho, alto) de la zona de conflicto.
+        giro_en_rojo: permite girar a la derecha en rojo tras detenerse.
+        """
+        self.x, self.y, ancho, alto = caja
+        self.filas = filas
+        self.columnas = columnas
+        self.ancho_celda = ancho / columnas
+        self.alto_celda = alto / filas
+        self.giro_en_rojo = giro_en_rojo
+
+        # Tabla de reservas: ruta que ocupa cada celda (None si está libre) y
+        # cuántos vehículos de esa ruta la tienen reservada
+        self.ocupante = [None] * (filas * columnas)
+        self.cuenta = [0] * (filas * columnas)
+        self._celdas_ruta = {}
+
+        # Pasos en que algún vehículo esperó por una celda ocupada
+        self.esperas = 0
+
+    def celdas(self, ruta):
+        """
+        Celdas que pisa la ruta, en orden, como lista de
+        (celda, distancia_entrada, distancia_salida). Se calcula una vez por ruta.
+        """
+        celdas = self._celdas_ruta.get(ruta)
+        if celdas is not None:
+            return celdas
+
+        paso = min(self.ancho_celda, self.alto_celda) / 4
+        distancias = np.arange(0.0, ruta.longitud + paso, paso)
+        x, y, _ = ruta.posiciones(distancias)
+        columna = np.floor((x - self.x) / self.ancho_celda).astype(int)
+        fila = np.floor((y - self.y) / self.alto_celda).astype(int)
+        dentro = (columna >= 0) & (columna < self.columnas) & (fila >= 0) & (fila < self.filas)
+        indice = np.where(dentro, fila * self.columnas + columna, -1)
+
+        # Tramos consecutivos de muestras en la misma celda
+        cortes = np.flatnonzero(np.diff(indice)) + 1
+        inicios = np.concatenate(([0], cortes))
+        finales = np.concatenate((cortes, [indice.size]))
+        celdas = [
+            (int(indice[i]), float(distancias[i]), float(distancias[f - 1] + paso))
+            for i, f in zip(inicios, finales) if indice[i] >= 0
+        ]
+        self._celdas_ruta[ruta] = celdas
+        return celdas
+
+    def entrada(self, ruta):
+        """Distancia de la ruta a la que empieza la caja (None si no la cruza)"""
+        celdas = self.celdas(ruta)
+        return celdas[0][1] if celdas else None
+
+    def reservar(self, vehicle):
+        """
+        Reserva todas las celdas de la ruta del vehículo si están libres.
+        Devuelve True si la reserva se concedió.
+        """
+        ruta = vehicle.ruta
+        celdas = self.celdas(ruta)
+        ocupante = self.ocupante
+        for celda, _, _ in celdas:
+            if ocupante[celda] is not None and ocupante[celda] is not ruta:
+                return False
+        for celda, _, _ in celdas:
+            ocupante[celda] = ruta
+            self.cuenta[celda] += 1
+        vehicle.reserva = 0
+        return True
+
+    def _soltar(self, celda):
+        self.cuenta[celda] -= 1
+        if self.cuenta[celda] <= 0:
+            self.cuenta[celda] = 0
+            self.ocupante[celda] = None
+
+    def avance_permitido(self, vehicle, paso):
+        """
+        Recorta el paso (distancia de ruta) de un vehículo que va a entrar en
+        la caja sin haber conseguido reserva.
+        """
+        if vehicle.reserva is not None:
+            return paso
+        entrada = self.entrada(vehicle.ruta)
+        if entrada is None or vehicle.distancia + paso < entrada:
+            return paso
+        if self.reservar(vehicle):
+            return paso
+        self.esperas += 1
+        return max(0.0, entrada - HOLGURA - vehicle.distancia)
+
+    def liberar_pasadas(self, vehicle):
+        """Libera las celdas que la cola del vehículo ya dejó atrás."""
+        if vehicle.reserva is None:
+            return
+        celdas = self.celdas(vehicle.ruta)
+        i = vehicle.reserva
+        cola = vehicle.distancia - LARGO_VEHICULO
+        while i < len(celdas) and cola >= celdas[i][2]:
+            self._soltar(celdas[i][0])
+            i += 1
+        vehicle.reserva = i
+
+    def liberar(self, vehicle):
+        """Libera todas las celdas que aún tenga el vehículo (p. ej. al retirarlo)."""
+        if vehicle.reserva is None:
+            return
+        for celda, _, _ in self.celdas(vehicle.ruta)[vehicle.reserva:]:
+            self._soltar(celda)
+        vehicle.reserva = None
+
+    def limpiar(self):
+        """Vacía la tabla de reservas."""
+        self.ocupante = [None] * (self.filas * self.columnas)
+        self.cuenta = [0] * (self.filas * self.columnas)
+        self.esperas = 0
+
+    def ocupadas(self):
+        """Rectángulos (x, y, ancho, alto) de las celdas ocupadas, para dibujarlas."""
+        return [
+            (self.x + (celda % self.columnas) * self.ancho_celda,
+             self.y + (celda // self.columnas) * self.alto_celda,
+             self.ancho_celda, self.alto_celda)
+            for celda, ruta in enumerate(self.ocupante) if ruta is not None
+        ]
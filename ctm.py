@@ -0,0 +1,341 @@
+"""
+Modelo macroscópico de transmisión de celdas (CTM) para redes de cruces.
+
+En lugar de mover vehículos uno a uno, cada aproximación de cada cruce es un
+enlace dividido en celdas que guardan cuántos vehículos contienen. En cada
+paso una celda envía min(n, capacidad) vehículos y la siguiente recibe como
+mucho min(capacidad, W_V * (n_max - n)); el flujo entre ambas es el menor
+de los dos. Todas las celdas de todos los enlaces se actualizan a la vez con
+arreglos de NumPy de forma (enlaces, celdas).
+
+Los cruces forman una rejilla de filas x columnas. La última celda de cada
+enlace de entrada descarga en el cruce repartiendo su envío entre recto y
+giros según el reparto de giros y el estado de los semáforos; cada
+movimiento alimenta la primera celda del enlace del cruce vecino (o sale de
+la red en el borde). Si varios movimientos llegan al mismo enlace se
+reparten su capacidad de recepción en proporción a lo que envían. Los
+vehículos que llegan por el borde esperan en una cola de entrada si la
+primera celda está llena, así que la cuenta de vehículos siempre cuadra.
+
+Cada cruce es un senales.CruceSenalizado: usa los mismos SemaforoVehicular,
+el ciclo de la red de Petri o cualquier controlador de fases (p. ej.
+nema.ControladorNEMA), que ven como demanda los vehículos de las celdas
+cercanas a la línea de parada. Los controladores solo se consultan cada
+PERIODO_FASE, no en cada paso. Un controlador de red (usar_control_red(),
+p. ej. presion.PresionMaxima) sustituye a los de cada cruce y decide todos
+a la vez con arreglos.
+
+    red = RedMacro(20, 20, semilla=1)
+    red.set_demanda(0.1)
+    red.correr(3600)
+
+    python ctm.py [filas] [columnas] [horas] [tasa] [nema | presion]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from aleatorio import FlujosAleatorios
+from llegadas import APROXIMACIONES, MOVIMIENTOS, REPARTO_GIROS
+from motor import PERIODO_FASE
+from registro import RegistroEventos
+from rutas import RUTAS_CRUCE, SALIDA_HACIA
+from senales import CruceSenalizado
+
+# Parámetros por celda con paso de 1 s y celdas de ~14 m (50 km/h):
+# capacidad (veh/paso, ~1800 veh/h), vehículos que caben en una celda y
+# relación entre la velocidad de la onda de congestión y la velocidad libre
+CAPACIDAD = 0.5
+VEHICULOS_CELDA = 2.0
+W_V = 0.5
+
+# Fracción de la capacidad de un giro a la izquierda permisivo (sin flecha)
+FACTOR_PERMISIVO = 0.5
+
+# Celdas antes de la línea de parada que actúan como detector
+CELDAS_DETECTOR = 3
+
+# Desplazamiento (fila, columna) del cruce al que lleva cada carril de salida:
+# el carril "Norte" circula hacia el sur (y creciente) y el "Este" hacia x creciente
+VECINO = {"Norte": (1, 0), "Sur": (-1, 0), "Este": (0, 1), "Oeste": (0, -1)}
+
+
+def _carril_salida(origen, destino):
+    """Carril por el que sale un movimiento (el suyo si va recto)."""
+    giro = RUTAS_CRUCE[(origen, destino)].giro
+    return (origen if giro == "recto" else SALIDA_HACIA[destino]), giro
+
+
+class NodoMacro(CruceSenalizado):
+    def __init__(self, red, indice):
+        self.red = red
+        self.indice = indice
+        super().__init__(red.registro)
+
+    def demanda_movimientos(self):
+        """Vehículos en las celdas del detector, repartidos por movimiento."""
+        cola = self.red.detector[self.indice]
+        conteo = {}
+        for a, origen in enumerate(APROXIMACIONES):
+            for m, destino in enumerate(MOVIMIENTOS[origen]):
+                tipo = "izquierda" if self.red.giros[a][m] == "izquierda" else "recto"
+                conteo[(origen, tipo)] = conteo.get((origen, tipo), 0) + int(round(cola[a, m]))
+        return conteo
+
+
+class RedMacro:
+    def __init__(self, filas, columnas, celdas=10, controlador=None, semilla=None,
+                 paso=1.0, reparto=REPARTO_GIROS, registro=None):
+        """
+        filas, columnas: tamaño de la rejilla de cruces.
+        celdas: celdas por enlace de entrada (longitud de cada cuadra).
+        controlador: fábrica sin argumentos de un controlador de fases por
+            cruce (p. ej. ControladorNEMA); None usa el ciclo de la red de Petri.
+        reparto: fracciones (recto, giro, giro) según MOVIMIENTOS.
+        """
+        self.filas = filas
+        self.columnas = columnas
+        self.paso = paso
+        self.flujos = FlujosAleatorios(semilla)
+        self.registro = registro if registro is not None else RegistroEventos()
+        nodos = filas * columnas
+        enlaces = nodos * len(APROXIMACIONES)
+
+        # Vehículos por celda de cada enlace; enlace = nodo * 4 + aproximación
+        self.n = np.zeros((enlaces, celdas))
+        self.reparto = np.tile(np.asarray(reparto, dtype=float), (enlaces, 1))
+
+        # Enlace de destino de cada movimiento (-1 si sale de la red) y
+        # enlaces del borde, que reciben la demanda externa
+        self.giros = [[None] * 3 for _ in APROXIMACIONES]
+        self.destino = np.full((enlaces, 3), -1, dtype=np.intp)
+        self.borde = np.ones(enlaces, dtype=bool)
+        for nodo in range(nodos):
+            fila, columna = divmod(nodo, columnas)
+            for a, origen in enumerate(APROXIMACIONES):
+                for m, destino in enumerate(MOVIMIENTOS[origen]):
+                    salida, giro = _carril_salida(origen, destino)
+                    self.giros[a][m] = giro
+                    df, dc = VECINO[salida]
+                    f, c = fila + df, columna + dc
+                    if 0 <= f < filas and 0 <= c < columnas:
+                        enlace = (f * columnas + c) * len(APROXIMACIONES) + APROXIMACIONES.index(salida)
+                        self.destino[nodo * len(APROXIMACIONES) + a, m] = enlace
+                        self.borde[enlace] = False
+
+        # Demanda externa (veh/s por enlace del borde) y cola de entrada de
+        # cada enlace (demanda del borde o vehículos entregados por otro modelo)
+        self.tasas = np.zeros(enlaces)
+        self.cola_entrada = np.zeros(enlaces)
+
+        # Enlaces cuya descarga toma otro modelo (cruces cedidos, ver
+        # ceder_nodo): aceptacion es lo que admite en el paso y entregado lo
+        # que se le entregó
+        self.externo = np.zeros(enlaces, dtype=bool)
+        self.aceptacion = np.zeros(enlaces)
+        self.entregado = np.zeros(enlaces)
+
+        # Capacidad de cada movimiento según los semáforos (0..1)
+        self.verde = np.zeros((enlaces, 3))
+        self.detector = np.zeros((nodos, len(APROXIMACIONES), 3))
+
+        self.nodos = [NodoMacro(self, i) for i in range(nodos)]
+        self.cedidos = set()
+
+        # Controlador de toda la red (p. ej. presion.PresionMaxima): decide las
+        # fases de todos los cruces a la vez con arreglos, sin consultar a
+        # los controladores de cada NodoMacro
+        self.control_red = None
+        if controlador is not None:
+            for nodo in self.nodos:
+                nodo.usar_controlador(controlador())
+
+        self.reloj = 0.0
+        self.proxima_fase = 0.0
+        self.total_generados = 0
+        self.total_salidos = 0.0
+        self._leer_semaforos()
+
+    def __len__(self):
+        """Número de cruces"""
+        return len(self.nodos)
+
+    def set_demanda(self, tasa):
+        """Demanda externa en veh/s por cada enlace que entra desde el borde."""
+        self.tasas = np.where(self.borde, tasa, 0.0)
+
+    def vehiculos_en_red(self):
+        return float(self.n.sum())
+
+    def enlaces_nodo(self, indice):
+        """Enlaces de entrada del cruce, en el orden de APROXIMACIONES."""
+        primero = indice * len(APROXIMACIONES)
+        return list(range(primero, primero + len(APROXIMACIONES)))
+
+    def enlace_salida(self, indice, origen, destino):
+        """Enlace al que lleva un movimiento del cruce (-1 si sale de la red)."""
+        a = APROXIMACIONES.index(origen)
+        return int(self.destino[indice * len(APROXIMACIONES) + a, MOVIMIENTOS[origen].index(destino)])
+
+    def ceder_nodo(self, indice):
+        """
+        Deja el cruce en manos de otro modelo: sus enlaces de entrada ya no
+        descargan en la red sino que entregan hasta aceptacion vehículos por
+        paso, y su controlador deja de consultarse.
+        """
+        self.cedidos.add(indice)
+        self.externo[self.enlaces_nodo(indice)] = True
+
+    def usar_control_red(self, control):
+        """
+        Pone todos los cruces bajo un controlador de red (None vuelve a los
+        controladores de cada cruce). Los cruces cedidos siguen sin consultarse.
+        """
+        self.control_red = control
+        if control is not None:
+            control.iniciar(self)
+        else:
+            self._leer_semaforos()
+
+    # === Semáforos ===
+
+    def _leer_semaforos(self, indices=None):
+        """
+        Traduce los semáforos de los cruces indicados (todos por defecto) a
+        la capacidad por movimiento.
+        """
+        if indices is None:
+            indices = range(len(self.nodos))
+        filas = []
+        for i in indices:
+            fila = []
+            for a, origen in enumerate(APROXIMACIONES):
+                semaforo = self.nodos[i].semaforos_vehiculares[origen]
+                permisivo = semaforo.flechas["izquierda"] != "verde"
+                for giro in self.giros[a]:
+                    valor = 1.0 if semaforo.estado_movimiento(giro) == "verde" else 0.0
+                    if permisivo and giro == "izquierda":
+                        valor *= FACTOR_PERMISIVO
+                    fila.append(valor)
+            filas.append(fila)
+        if filas:
+            verde = self.verde.reshape(len(self.nodos), -1)
+            verde[list(indices)] = filas
+
+    def actualizar_semaforos(self):
+        """
+        Avanza un paso el ciclo de fases de todos los cruces con la demanda
+        que ven sus detectores; solo se releen los que cambiaron.
+        """
+        if self.control_red is not None:
+            self.control_red.actualizar(self)
+            return
+        nodos = len(self.nodos)
+        cerca = self.n[:, -CELDAS_DETECTOR:].sum(axis=1)
+        self.detector = (cerca[:, None] * self.reparto).reshape(nodos, len(APROXIMACIONES), 3)
+        cuentas = np.rint(cerca.reshape(nodos, len(APROXIMACIONES))).astype(int).tolist()
+        cambiados = []
+        for nodo, cuenta in zip(self.nodos, cuentas):
+            if nodo.indice in self.cedidos:
+                continue
+            nodo.reloj = self.reloj
+            nodo.traffic_counts = dict(zip(APROXIMACIONES, cuenta))
+            if nodo.actualizar_simulacion():
+                cambiados.append(nodo.indice)
+        self._leer_semaforos(cambiados)
+
+    # === Transmisión de celdas ===
+
+    def avanzar(self):
+        """
+        Un paso del modelo: ciclo de fases cada PERIODO_FASE (como en el
+        motor microscópico) y transmisión de todas las celdas de la red.
+        """
+        if self.reloj >= self.proxima_fase:
+            self.actualizar_semaforos()
+            self.proxima_fase += PERIODO_FASE
+        self._transmitir()
+
+    def _transmitir(self):
+        n = self.n
+        envio = np.minimum(n, CAPACIDAD)
+        recepcion = np.minimum(CAPACIDAD, W_V * (VEHICULOS_CELDA - n))
+
+        # Entre celdas del mismo enlace
+        interno = np.minimum(envio[:, :-1], recepcion[:, 1:])
+
+        # Descarga de la última celda repartida por movimiento y limitada por
+        # el semáforo y por la recepción del enlace de destino
+        pedido = envio[:, -1:] * self.reparto * self.verde
+        pedido[self.externo] = 0.0
+        self.entregado = np.where(self.externo, np.minimum(envio[:, -1], self.aceptacion), 0.0)
+        dentro = self.destino >= 0
+        total = np.bincount(self.destino[dentro], weights=pedido[dentro], minlength=len(n))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            factor = np.where(total > 0, np.minimum(1.0, recepcion[:, 0] / total), 0.0)
+        movido = np.where(dentro, pedido * factor[self.destino], pedido)
+        llega = np.bincount(self.destino[dentro], weights=movido[dentro], minlength=len(n))
+
+        # Demanda externa: llegadas de Poisson a la cola de entrada del borde
+        rng = self.flujos.flujo("ctm", "llegadas")
+        llegadas = rng.poisson(self.tasas * self.paso)
+        self.total_generados += int(llegadas.sum())
+        self.cola_entrada += llegadas
+        libre = np.maximum(recepcion[:, 0] - llega, 0.0)
+        entra = np.minimum(self.cola_entrada, libre)
+        self.cola_entrada -= entra
+
+        n[:, :-1] -= interno
+        n[:, 1:] += interno
+        n[:, -1] -= movido.sum(axis=1) + self.entregado
+        n[:, 0] += llega + entra
+        self.total_salidos += float(movido[~dentro].sum())
+        self.reloj += self.paso
+
+    def correr(self, duracion):
+        """Avanza duracion segundos."""
+        fin = self.reloj + duracion
+        while self.reloj < fin:
+            self.avanzar()
+
+    def resumen(self):
+        """Balance de vehículos: generados = salidos + en la red + en colas de entrada."""
+        return {
+            "generados": self.total_generados,
+            "salidos": self.total_salidos,
+            "en_red": self.vehiculos_en_red(),
+            "en_cola": float(self.cola_entrada.sum()),
+        }
+
+
+def main():
+    """Simula una rejilla de cruces y compara el tiempo de cálculo con el simulado."""
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    columnas = int(sys.argv[2]) if len(sys.argv) > 2 else filas
+    horas = float(sys.argv[3]) if len(sys.argv) > 3 else 1.0
+    tasa = float(sys.argv[4]) if len(sys.argv) > 4 else 0.1
+    controlador = None
+    if len(sys.argv) > 5 and sys.argv[5] == "nema":
+        from nema import ControladorNEMA
+        controlador = ControladorNEMA
+
+    red = RedMacro(filas, columnas, controlador=controlador, semilla=1)
+    if len(sys.argv) > 5 and sys.argv[5] == "presion":
+        from presion import PresionMaxima
+        red.usar_control_red(PresionMaxima())
+    red.set_demanda(tasa)
+    inicio = time.perf_counter()
+    red.correr(horas * 3600)
+    duracion = time.perf_counter() - inicio
+
+    r = red.resumen()
+    print(f"{len(red)} cruces, {horas:g} h simuladas en {duracion:.1f} s "
+          f"({horas * 3600 / duracion:.0f}x tiempo real)")
+    print(f"Generados {r['generados']}, salidos {r['salidos']:.0f}, "
+          f"en la red {r['en_red']:.0f}, en cola de entrada {r['en_cola']:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+Perfiles de demanda a lo largo del día.
+
+Un perfil define, para cada movimiento origen → destino, la tasa de llegadas
+(veh/h) en función de la hora. Se carga desde un archivo JSON:
+
+    {
+        "nombre": "Día laboral",
+        "suave": false,
+        "movimientos": {
+            "Norte": {"Sur": [[0, 40], [7, 420], [9, 180]], "Este": ...},
+            ...
+        }
+    }
+
+Cada lista contiene puntos [hora, veh/h]. Con "suave": false la tasa es
+escalonada (se mantiene hasta el siguiente punto); con "suave": true se
+interpola linealmente. En ambos casos el perfil es periódico: después del
+último punto se vuelve al primero del día siguiente.
+
+Las llegadas se muestrean de forma vectorizada por inversión de la tasa
+acumulada (o por adelgazamiento), así que un día completo se genera en
+milisegundos y se entrega como un ProgramaLlegadas.
+"""
+
+import json
+import sys
+import time
+
+import numpy as np
+
+from aleatorio import FlujosAleatorios
+from llegadas import APROXIMACIONES, INDICE_APROXIMACION, MOVIMIENTOS, ProgramaLlegadas
+
+DIA = 24 * 3600
+
+# Resolución de la rejilla de la tasa acumulada (s)
+PASO_REJILLA = 60
+
+
+class _TasaMovimiento:
+    """Tasa de un movimiento y su integral precalculada sobre una rejilla."""
+
+    def __init__(self, puntos, suave):
+        puntos = sorted(puntos)
+        if not puntos:
+            raise ValueError("Un movimiento necesita al menos un punto [hora, veh/h]")
+
+        self.horas = np.array([p[0] for p in puntos], dtype=float) * 3600
+        self.tasas = np.array([p[1] for p in puntos], dtype=float) / 3600
+        if np.any(self.tasas < 0):
+            raise ValueError("Las tasas de demanda no pueden ser negativas")
+        if np.any((self.horas < 0) | (self.horas >= DIA)):
+            raise ValueError("Las horas del perfil deben estar en [0, 24)")
+        self.suave = suave
+
+        # Rejilla que contiene los puntos de quiebre: la integral es exacta en ella
+        self.rejilla = np.union1d(np.arange(0, DIA + 1, PASO_REJILLA, dtype=float), self.horas)
+        tasa = self(self.rejilla)
+        dt = np.diff(self.rejilla)
+        if suave:
+            tramos = 0.5 * (tasa[1:] + tasa[:-1]) * dt
+        else:
+            tramos = tasa[:-1] * dt
+        self.acumulada = np.concatenate(([0.0], np.cumsum(tramos)))
+
+    def __call__(self, t):
+        """Tasa en veh/s para los instantes t (segundos del día)."""
+        t = np.mod(t, DIA)
+        if self.suave:
+            return np.interp(t, self.horas, self.tasas, period=DIA)
+        # Escalonada: índice -1 (antes del primer punto) toma el último del día anterior
+        return self.tasas[np.searchsorted(self.horas, t, side="right") - 1]
+
+    def integral(self, t):
+        return np.interp(t, self.rejilla, self.acumulada)
+
+    def muestrear_inversa(self, rng, desde, hasta):
+        """
+        Proceso de Poisson no homogéneo por inversión de la tasa acumulada:
+        dado el número de llegadas, sus valores acumulados son uniformes.
+        """
+        inicio, fin = self.integral(desde), self.integral(hasta)
+        n = rng.poisson(fin - inicio)
+        u = np.sort(rng.uniform(inicio, fin, n))
+        return np.interp(u, self.acumulada, self.rejilla)
+
+    def muestrear_adelgazamiento(self, rng, desde, hasta):
+        """
+        Adelgazamiento (Lewis-Shedler) vectorizado: se generan candidatos a la
+        tasa máxima y se aceptan con probabilidad tasa(t) / tasa máxima.
+        """
+        maxima = float(self.tasas.max())
+        if maxima <= 0:
+            return np.empty(0)
+        n = rng.poisson(maxima * (hasta - desde))
+        t = np.sort(rng.uniform(desde, hasta, n))
+        return t[rng.uniform(0, maxima, n) < self(t)]
+
+
+class PerfilDemanda:
+    def __init__(self, movimientos, suave=False, nombre=""):
+        """
+        movimientos: dict origen -> dict destino -> lista de [hora, veh/h].
+        """
+        self.nombre = nombre
+        self.suave = suave
+        self.tasas = {}
+        for origen, destinos in movimientos.items():
+            if origen not in MOVIMIENTOS:
+                raise ValueError(f"Aproximación desconocida en el perfil: {origen}")
+            for destino, puntos in destinos.items():
+                if destino not in MOVIMIENTOS[origen]:
+                    raise ValueError(f"Movimiento no válido en el perfil: {origen} → {destino}")
+                self.tasas[(origen, destino)] = _TasaMovimiento(puntos, suave)
+
+    @classmethod
+    def cargar(cls, ruta):
+        """Carga un perfil desde un archivo JSON."""
+        with open(ruta, encoding="utf-8") as f:
+            datos = json.load(f)
+        return cls(datos["movimientos"], datos.get("suave", False), datos.get("nombre", ""))
+
+    def tasa(self, origen, t, destino=None):
+        """
+        Tasa (veh/h) de un movimiento, o de toda la aproximación si no se
+        indica destino, en los segundos del día t.
+        """
+        total = np.zeros(np.shape(t))
+        for (o, d), tasa in self.tasas.items():
+            if o == origen and (destino is None or d == destino):
+                total = total + tasa(t)
+        return total * 3600
+
+    def vehiculos_esperados(self, desde=0.0, hasta=DIA):
+        """Número esperado de vehículos por aproximación en [desde, hasta)."""
+        esperados = dict.fromkeys(APROXIMACIONES, 0.0)
+        for (origen, _), tasa in self.tasas.items():
+            esperados[origen] += float(tasa.integral(hasta) - tasa.integral(desde))
+        return esperados
+
+    def programa(self, rng=None, desde=0.0, hasta=DIA, inicio=0.0, metodo="inversa", flujos=None):
+        """
+        Muestrea las llegadas entre los segundos del día desde y hasta
+        (0 <= desde < hasta <= DIA). Los tiempos del programa se desplazan para
+        que desde corresponda a inicio en el reloj del motor. Con flujos
+        (FlujosAleatorios) cada movimiento usa su flujo ("demanda", origen, destino).
+        """
+        if not 0 <= desde < hasta <= DIA:
+            raise ValueError("La ventana del perfil debe cumplir 0 <= desde < hasta <= 24 h")
+        if metodo not in ("inversa", "adelgazamiento"):
+            raise ValueError(f"Método de muestreo desconocido: {metodo}")
+        rng = rng if rng is not None else np.random.default_rng()
+
+        tiempos, aproximaciones, destinos = [], [], []
+        for (origen, destino), tasa in self.tasas.items():
+            rng_movimiento = flujos.flujo("demanda", origen, destino) if flujos is not None else rng
+            if metodo == "inversa":
+                t = tasa.muestrear_inversa(rng_movimiento, desde, hasta)
+            else:
+                t = tasa.muestrear_adelgazamiento(rng_movimiento, desde, hasta)
+            tiempos.append(t - desde + inicio)
+            aproximaciones.append(np.full(t.size, INDICE_APROXIMACION[origen], dtype=np.int8))
+            destinos.append(np.full(t.size, INDICE_APROXIMACION[destino], dtype=np.int8))
+
+        if not tiempos:
+            vacio = np.empty(0, dtype=np.int8)
+            return ProgramaLlegadas(np.empty(0), vacio, vacio)
+
+        tiempos = np.concatenate(tiempos)
+        orden = np.argsort(tiempos, kind="stable")
+        return ProgramaLlegadas(
+            tiempos[orden],
+            np.concatenate(aproximaciones)[orden],
+            np.concatenate(destinos)[orden],
+        )
+
+
+def main():
+    """Muestrea un día completo de un perfil y muestra los vehículos por hora."""
+    if len(sys.argv) < 2:
+        print("Uso: python demanda.py perfil.json [semilla]")
+        return
+
+    perfil = PerfilDemanda.cargar(sys.argv[1])
+    semilla = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    inicio = time.perf_counter()
+    programa = perfil.programa(flujos=FlujosAleatorios(semilla))
+    duracion = time.perf_counter() - inicio
+
+    print(f"Perfil: {perfil.nombre} - {len(programa)} vehículos en {duracion * 1000:.1f} ms")
+    horas = (programa.tiempos // 3600).astype(int)
+    print("Hora  " + "  ".join(f"{a:>6}" for a in APROXIMACIONES))
+    for hora in range(24):
+        en_hora = programa.aproximacion[horas == hora]
+        conteos = np.bincount(en_hora, minlength=len(APROXIMACIONES))
+        print(f"{hora:02d}:00 " + "  ".join(f"{c:>6}" for c in conteos))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+"""
+Entornos de aprendizaje por refuerzo para controladores de fases.
+
+EntornoCruce envuelve el motor sin interfaz con la API de Gymnasium
+(reset() y step() devuelven observación, recompensa, terminado, truncado,
+info): cada paso es un paso del controlador (PERIODO_FASE segundos
+simulados) y la acción es la fase que debe seguir a la actual; elegir la
+fase en curso la extiende. Las fases, el amarillo y el despeje son los de
+predictivo.ControladorPredictivo, así que una política aprendida se
+compara directamente con los demás controladores.
+
+EntornoVectorial simula n cruces independientes a la vez con arreglos de
+NumPy: cada movimiento (recto con el giro a la derecha, o giro a la
+izquierda) de cada aproximación es una cola puntual que recibe llegadas de
+Poisson y descarga a flujo de saturación mientras tiene verde (el giro a la
+izquierda también, reducido, con el verde del recto). Un paso de los n
+cruces es un puñado de operaciones sobre arreglos (n, 8), lo que da
+millones de pasos por minuto en una CPU para entrenar; la política se
+afina después en EntornoCruce.
+
+Ambos entornos usan la misma observación (float32):
+
+    colas por aproximación / ESCALA_COLA     4
+    fase actual (one-hot)                    4
+    pasos en el intervalo / verde_maximo     1
+    en transición (amarillo o despeje)       1
+
+y la misma recompensa: menos la demora (vehículo-segundo) del paso.
+
+    entorno = EntornoCruce(semilla=1, densidad=8)
+    observacion, info = entorno.reset()
+    observacion, recompensa, terminado, truncado, info = entorno.step(1)
+
+    vectorial = EntornoVectorial(4096, semilla=1)
+    observaciones, info = vectorial.reset()
+    observaciones, recompensas, terminados, truncados, info = vectorial.step(acciones)
+
+    python entorno.py [cruces] [segundos]   # pasos por segundo de ambos entornos
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from aleatorio import FlujosAleatorios
+from ctm import CAPACIDAD, FACTOR_PERMISIVO
+from llegadas import APROXIMACIONES
+from motor import PERIODO_FASE, MotorSimulacion
+from predictivo import FASES_PREDICTIVO, ControladorPredictivo
+
+# Vehículos de cola que se observan como 1.0
+ESCALA_COLA = 20.0
+
+# Movimientos de las colas del entorno vectorial: (aproximación, tipo)
+MOVIMIENTOS_COLA = tuple((a, t) for a in APROXIMACIONES for t in ("recto", "izquierda"))
+
+# Fracción de las llegadas de cada aproximación que gira a la izquierda
+# (REPARTO_GIROS: 20% por giro; el de la derecha sale con el recto)
+FRACCION_IZQUIERDA = 0.2
+
+DIMENSION_OBSERVACION = len(APROXIMACIONES) + len(FASES_PREDICTIVO) + 2
+
+
+def _espacios(n_fases):
+    """Espacios de observación y acción de Gymnasium si está instalado; None si no."""
+    try:
+        from gymnasium import spaces
+    except ImportError:
+        return None, None
+    observacion = spaces.Box(0.0, np.inf, (DIMENSION_OBSERVACION,), np.float32)
+    return observacion, spaces.Discrete(n_fases)
+
+
+class _ControladorAgente(ControladorPredictivo):
+    """Ciclo del controlador predictivo con la fase siguiente elegida desde fuera."""
+
+    def __init__(self, **opciones):
+        super().__init__(presupuesto=None, **opciones)
+        self.accion = None
+
+    def decidir(self, motor):
+        fase = self.fase if self.accion is None else self.orden[self.accion]
+        if fase == self.fase and self.ticks >= self.verde_maximo:
+            fase = self.orden[(self.orden.index(self.fase) + 1) % len(self.orden)]
+        return fase
+
+
+class EntornoCruce:
+    def __init__(self, semilla=None, densidad=8, perfil=None, hora_inicio=7, duracion=3600,
+                 **opciones_controlador):
+        """
+        densidad: tráfico automático como en la interfaz (si no hay perfil).
+        perfil: demanda.PerfilDemanda que sustituye a la densidad fija.
+        duracion: segundos simulados por episodio (truncado al cumplirse).
+        opciones_controlador: verde_minimo, verde_maximo, amarillo, rojo_despeje.
+        """
+        self.semilla = semilla
+        self.densidad = densidad
+        self.perfil = perfil
+        self.hora_inicio = hora_inicio
+        self.duracion = duracion
+        self.opciones_controlador = opciones_controlador
+        self.motor = None
+        self.controlador = None
+        self.episodio = 0
+        self.observation_space, self.action_space = _espacios(len(FASES_PREDICTIVO))
+
+    def _observar(self):
+        colas = dict.fromkeys(APROXIMACIONES, 0)
+        for vehicle in self.motor.vehicles:
+            if vehicle.detenido and not vehicle.in_intersection:
+                colas[vehicle.lane] += 1
+        controlador = self.controlador
+        observacion = np.zeros(DIMENSION_OBSERVACION, dtype=np.float32)
+        observacion[:len(APROXIMACIONES)] = [colas[a] / ESCALA_COLA for a in APROXIMACIONES]
+        observacion[len(APROXIMACIONES) + controlador.orden.index(controlador.fase)] = 1.0
+        observacion[-2] = controlador.ticks / controlador.verde_maximo
+        observacion[-1] = controlador.intervalo != "verde"
+        return observacion
+
+    def _demora(self):
+        return self.motor.metricas.total.demora.suma + sum(v.demora for v in self.motor.vehicles)
+
+    def reset(self, seed=None, options=None):
+        """
+        Empieza un episodio. Sin seed cada episodio usa su propia replicación
+        de la semilla del entorno (llegadas distintas pero reproducibles).
+        """
+        if seed is not None:
+            self.semilla, self.episodio = seed, 0
+        self.motor = MotorSimulacion(self.semilla)
+        self.motor.flujos = self.motor.flujos.replica(self.episodio)
+        self.episodio += 1
+        self.controlador = _ControladorAgente(**self.opciones_controlador)
+        self.motor.usar_controlador(self.controlador)
+        if self.perfil is not None:
+            self.motor.usar_perfil_demanda(self.perfil, self.hora_inicio)
+        else:
+            self.motor.set_auto_traffic(self.densidad)
+        return self._observar(), {"reloj": self.motor.reloj}
+
+    def step(self, accion):
+        """Aplica la acción durante un paso del controlador."""
+        self.controlador.accion = int(accion)
+        antes = self._demora()
+        self.motor.correr(PERIODO_FASE)
+        recompensa = -(self._demora() - antes)
+        truncado = self.motor.reloj >= self.duracion - 1e-9
+        info = {"reloj": self.motor.reloj, "fase": self.controlador.estado(),
+                "salidos": self.motor.total_salidos}
+        return self._observar(), recompensa, False, truncado, info
+
+
+class EntornoVectorial:
+    def __init__(self, n, semilla=None, tasa=(0.05, 0.2), pasos=2400, dt=PERIODO_FASE,
+                 verde_minimo=2, verde_maximo=16, amarillo=1, rojo_despeje=1):
+        """
+        n: cruces independientes.
+        tasa: llegadas por aproximación (veh/s); un par (mínima, máxima) sortea
+            la de cada aproximación y cruce al empezar cada episodio.
+        pasos: pasos del controlador por episodio (2400 de 1.5 s: una hora).
+        Los tiempos del ciclo se cuentan en pasos, como en EntornoCruce.
+        """
+        self.n = n
+        self.tasa = tasa
+        self.pasos = pasos
+        self.dt = dt
+        self.verde_minimo = verde_minimo
+        self.verde_maximo = verde_maximo
+        self.amarillo = amarillo
+        self.rojo_despeje = rojo_despeje
+        self.rng = FlujosAleatorios(semilla).flujo("entorno_vectorial")
+
+        # Movimientos servidos por cada fase: 1 protegido, FACTOR_PERMISIVO
+        # para el giro a la izquierda con el verde de su recto
+        self.orden = tuple(FASES_PREDICTIVO)
+        self.servicio = np.zeros((len(self.orden), len(MOVIMIENTOS_COLA)))
+        for f, fase in enumerate(self.orden):
+            for aproximacion, tipo in FASES_PREDICTIVO[fase]:
+                self.servicio[f, MOVIMIENTOS_COLA.index((aproximacion, tipo))] = 1.0
+                if tipo == "recto":
+                    self.servicio[f, MOVIMIENTOS_COLA.index((aproximacion, "izquierda"))] = FACTOR_PERMISIVO
+        self.servicio *= CAPACIDAD * dt
+
+        self.colas = np.zeros((n, len(MOVIMIENTOS_COLA)))
+        self.llegadas = np.zeros((n, len(MOVIMIENTOS_COLA)))
+        self.fase = np.zeros(n, dtype=np.intp)
+        self.proxima = np.zeros(n, dtype=np.intp)
+        # 0 verde, 1 amarillo, 2 despeje
+        self.intervalo = np.zeros(n, dtype=np.int8)
+        self.ticks = np.zeros(n, dtype=np.int32)
+        self.paso = np.zeros(n, dtype=np.int32)
+        self.observation_space, self.action_space = _espacios(len(self.orden))
+
+    def _reiniciar(self, indices):
+        k = len(indices)
+        if np.isscalar(self.tasa):
+            tasas = np.full((k, len(APROXIMACIONES)), float(self.tasa))
+        else:
+            tasas = self.rng.uniform(self.tasa[0], self.tasa[1], (k, len(APROXIMACIONES)))
+        # Columnas en el orden de MOVIMIENTOS_COLA: (recto, izquierda) por aproximación
+        por_movimiento = np.stack((tasas * (1 - FRACCION_IZQUIERDA), tasas * FRACCION_IZQUIERDA), axis=2)
+        self.llegadas[indices] = por_movimiento.reshape(k, -1) * self.dt
+        self.colas[indices] = 0.0
+        self.fase[indices] = 0
+        self.proxima[indices] = 0
+        self.intervalo[indices] = 0
+        self.ticks[indices] = 0
+        self.paso[indices] = 0
+
+    def _observar(self):
+        observacion = np.zeros((self.n, DIMENSION_OBSERVACION), dtype=np.float32)
+        colas = self.colas.reshape(self.n, len(APROXIMACIONES), 2).sum(axis=2)
+        observacion[:, :len(APROXIMACIONES)] = colas / ESCALA_COLA
+        observacion[np.arange(self.n), len(APROXIMACIONES) + self.fase] = 1.0
+        observacion[:, -2] = self.ticks / self.verde_maximo
+        observacion[:, -1] = self.intervalo != 0
+        return observacion
+
+    def reset(self, seed=None, options=None):
+        if seed is not None:
+            self.rng = FlujosAleatorios(seed).flujo("entorno_vectorial")
+        self._reiniciar(np.arange(self.n))
+        return self._observar(), {}
+
+    def step(self, acciones):
+        """
+        Un paso de los n cruces. acciones: fase siguiente de cada cruce
+        (arreglo de n enteros). Los cruces que terminan su episodio empiezan
+        otro; su última observación queda en info["observacion_final"].
+        """
+        acciones = np.asarray(acciones, dtype=np.intp)
+        self.ticks += 1
+
+        # Cambios de intervalo con los mismos tiempos que ControladorPredictivo
+        verde = self.intervalo == 0
+        decide = verde & (self.ticks >= self.verde_minimo)
+        siguiente = (self.fase + 1) % len(self.orden)
+        elegida = np.where((acciones == self.fase) & (self.ticks >= self.verde_maximo), siguiente, acciones)
+        cambia = decide & (elegida != self.fase)
+        fin_amarillo = (self.intervalo == 1) & (self.ticks >= self.amarillo)
+        fin_despeje = (self.intervalo == 2) & (self.ticks >= self.rojo_despeje)
+
+        self.proxima[cambia] = elegida[cambia]
+        self.intervalo[cambia] = 1
+        self.intervalo[fin_amarillo] = 2
+        self.intervalo[fin_despeje] = 0
+        self.fase[fin_despeje] = self.proxima[fin_despeje]
+        self.ticks[cambia | fin_amarillo | fin_despeje] = 0
+
+        # Llegadas de Poisson y descarga de las colas con verde
+        self.colas += self.rng.poisson(self.llegadas)
+        servicio = self.servicio[self.fase] * (self.intervalo == 0)[:, None]
+        self.colas -= np.minimum(self.colas, servicio)
+        recompensas = -self.colas.sum(axis=1) * self.dt
+
+        self.paso += 1
+        truncados = self.paso >= self.pasos
+        terminados = np.zeros(self.n, dtype=bool)
+        info = {}
+        if truncados.any():
+            info["observacion_final"] = self._observar()
+            self._reiniciar(np.flatnonzero(truncados))
+        return self._observar(), recompensas, terminados, truncados, info
+
+
+def politica_cola_mayor(observaciones):
+    """
+    Referencia sencilla: la fase de rectos del par de aproximaciones con más
+    cola (la observación no separa los giros, que pasan permisivos).
+    """
+    colas = observaciones[..., :len(APROXIMACIONES)]
+    rectas = [f for f, fase in enumerate(FASES_PREDICTIVO.values()) if fase[0][1] == "recto"]
+    pares = np.stack([colas[..., [APROXIMACIONES.index(a) for a, _ in fase]].sum(axis=-1)
+                      for fase in FASES_PREDICTIVO.values() if fase[0][1] == "recto"], axis=-1)
+    return np.asarray(rectas)[pares.argmax(axis=-1)]
+
+
+def main():
+    """Pasos por segundo del entorno microscópico y del vectorial."""
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 4096
+    segundos = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+
+    entorno = EntornoCruce(semilla=1)
+    observacion, _ = entorno.reset()
+    pasos = 0
+    inicio = time.perf_counter()
+    while time.perf_counter() - inicio < segundos:
+        observacion, _, _, truncado, _ = entorno.step(politica_cola_mayor(observacion))
+        pasos += 1
+        if truncado:
+            observacion, _ = entorno.reset()
+    duracion = time.perf_counter() - inicio
+    print(f"EntornoCruce:          {pasos / duracion:12,.0f} pasos/s")
+
+    vectorial = EntornoVectorial(n, semilla=1)
+    observaciones, _ = vectorial.reset()
+    pasos = 0
+    inicio = time.perf_counter()
+    while time.perf_counter() - inicio < segundos:
+        observaciones, _, _, _, _ = vectorial.step(politica_cola_mayor(observaciones))
+        pasos += n
+    duracion = time.perf_counter() - inicio
+    print(f"EntornoVectorial({n}): {pasos / duracion:12,.0f} pasos/s "
+          f"({pasos / duracion * 3600 / 1e6:,.0f} millones por hora)")
+
+    # Demora por cruce en un episodio: ciclo fijo (cada fase hasta verde_maximo) y cola mayor
+    for nombre, politica in (("ciclo fijo", None), ("cola mayor", politica_cola_mayor)):
+        vectorial = EntornoVectorial(n, semilla=2)
+        observaciones, _ = vectorial.reset()
+        total = np.zeros(n)
+        for _ in range(vectorial.pasos):
+            acciones = politica(observaciones) if politica else vectorial.fase
+            observaciones, recompensas, _, _, _ = vectorial.step(acciones)
+            total += recompensas
+        print(f"  {nombre:10s} demora por cruce y episodio {-total.mean() / 3600:8.1f} vehículo-h")
+
+
+if __name__ == "__main__":
+    main()
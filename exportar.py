@@ -0,0 +1,264 @@
+"""
+Exportación columnar de corridas: Parquet (con pyarrow) o NPZ.
+
+Se exportan tres tablas:
+- vehiculos: una fila por vehículo activo en cada captura (t, id, origen,
+  destino, distancia, x, y, demora, detenido, emergencia);
+- fases: una fila por cambio de estado del ciclo de semáforos;
+- metricas: el resumen por movimiento de metricas.py al cerrar.
+
+Las columnas se llenan en búferes de NumPy preasignados (una pasada por
+columna sobre la flota, sin crear objetos por fila) y se escriben en lotes
+de filas_lote filas. Con pyarrow cada lote se entrega sin copiar como un
+grupo de filas de Parquet; sin pyarrow cada lote se añade como un miembro
+más de un archivo NPZ, así que la memoria no crece con la duración.
+
+    exportador = ExportadorColumnar("corrida")
+    exportador.correr(motor, 3600)       # captura cada intervalo segundos
+    exportador.cerrar(motor)
+    tablas = leer("corrida")
+
+    python exportar.py perfil.json horas carpeta [semilla] [npz|parquet]
+"""
+
+import os
+import sys
+import time
+import zipfile
+
+import numpy as np
+
+from llegadas import APROXIMACIONES, INDICE_APROXIMACION
+
+COLUMNAS_VEHICULOS = (
+    ("t", np.float64),
+    ("id", np.int64),
+    ("origen", np.int8),
+    ("destino", np.int8),
+    ("distancia", np.float32),
+    ("x", np.float32),
+    ("y", np.float32),
+    ("demora", np.float32),
+    ("detenido", np.bool_),
+    ("emergencia", np.bool_),
+)
+
+
+def _pyarrow():
+    """Módulos de pyarrow si están instalados; None si no."""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        return None
+    return pyarrow
+
+
+class _EscritorNPZ:
+    """Añade lotes de columnas a un NPZ como miembros columna/00000.npy, ..."""
+
+    def __init__(self, ruta):
+        self.zip = zipfile.ZipFile(ruta, "w", compression=zipfile.ZIP_STORED, allowZip64=True)
+        self.lotes = 0
+
+    def escribir(self, columnas):
+        for nombre, valores in columnas.items():
+            with self.zip.open(f"{nombre}/{self.lotes:05d}.npy", "w", force_zip64=True) as archivo:
+                np.lib.format.write_array(archivo, np.ascontiguousarray(valores), allow_pickle=False)
+        self.lotes += 1
+
+    def cerrar(self):
+        self.zip.close()
+
+
+class _EscritorParquet:
+    def __init__(self, ruta, pa):
+        self.pa = pa
+        self.ruta = ruta
+        self.escritor = None
+
+    def escribir(self, columnas):
+        # pa.array sobre arreglos numéricos de NumPy no copia los datos
+        lote = self.pa.record_batch([self.pa.array(v) for v in columnas.values()], names=list(columnas))
+        if self.escritor is None:
+            self.escritor = self.pa.parquet.ParquetWriter(self.ruta, lote.schema)
+        self.escritor.write_batch(lote)
+
+    def cerrar(self):
+        if self.escritor is not None:
+            self.escritor.close()
+
+
+class ExportadorColumnar:
+    def __init__(self, carpeta, formato=None, filas_lote=1 << 16, intervalo=1.0):
+        """
+        carpeta: destino de vehiculos.*, fases.* y metricas.*.
+        formato: "parquet", "npz" o None (parquet si pyarrow está instalado).
+        intervalo: segundos simulados entre capturas en correr().
+        """
+        pa = _pyarrow()
+        if formato is None:
+            formato = "parquet" if pa is not None else "npz"
+        if formato == "parquet" and pa is None:
+            raise ValueError("El formato parquet necesita pyarrow: pip install pyarrow")
+        if formato not in ("parquet", "npz"):
+            raise ValueError(f"Formato de exportación desconocido: {formato}")
+
+        os.makedirs(carpeta, exist_ok=True)
+        self.carpeta = carpeta
+        self.formato = formato
+        self.intervalo = intervalo
+        self._pa = pa
+        self._vehiculos = self._escritor("vehiculos")
+
+        self.filas_lote = filas_lote
+        self._buferes = {nombre: np.empty(filas_lote, dtype=tipo) for nombre, tipo in COLUMNAS_VEHICULOS}
+        self._fila = 0
+        self.filas = 0
+
+        self._fase_t = []
+        self._fase_estado = []
+
+    def _escritor(self, tabla):
+        if self.formato == "parquet":
+            return _EscritorParquet(os.path.join(self.carpeta, f"{tabla}.parquet"), self._pa)
+        return _EscritorNPZ(os.path.join(self.carpeta, f"{tabla}.npz"))
+
+    def _vaciar(self):
+        """Escribe las filas acumuladas como un lote."""
+        if self._fila:
+            self._vehiculos.escribir({n: b[:self._fila] for n, b in self._buferes.items()})
+            self.filas += self._fila
+            self._fila = 0
+
+    def _anotar_fases(self, motor):
+        """
+        Pasa a la tabla de fases los cambios que el motor anotó en cada paso,
+        con su reloj exacto. La primera vez anota el estado actual y empieza
+        a pedir al motor que anote los cambios.
+        """
+        if motor.cambios_fase is None:
+            motor.cambios_fase = [(motor.reloj, motor.estado_actual)]
+        for t, estado in motor.cambios_fase:
+            self._fase_t.append(t)
+            self._fase_estado.append(estado)
+        motor.cambios_fase.clear()
+
+    def capturar(self, motor):
+        """Añade una fila por vehículo activo y los cambios de fase desde la captura anterior."""
+        self._anotar_fases(motor)
+
+        vehiculos = list(motor.vehicles)
+        k = len(vehiculos)
+        if not k:
+            return
+        if self._fila + k > self.filas_lote:
+            self._vaciar()
+            if k > self.filas_lote:
+                self.filas_lote = k
+                self._buferes = {n: np.empty(k, dtype=b.dtype) for n, b in self._buferes.items()}
+
+        b = self._buferes
+        s = slice(self._fila, self._fila + k)
+        b["t"][s] = motor.reloj
+        b["id"][s] = [v.id_vehiculo for v in vehiculos]
+        b["origen"][s] = [INDICE_APROXIMACION[v.lane] for v in vehiculos]
+        b["destino"][s] = [INDICE_APROXIMACION[v.destination] for v in vehiculos]
+        b["distancia"][s] = [v.distancia for v in vehiculos]
+        xy = np.array([v.get_display_position()[:2] for v in vehiculos])
+        b["x"][s] = xy[:, 0]
+        b["y"][s] = xy[:, 1]
+        b["demora"][s] = [v.demora for v in vehiculos]
+        b["detenido"][s] = [v.detenido for v in vehiculos]
+        b["emergencia"][s] = [v.emergencia for v in vehiculos]
+        self._fila += k
+
+    def correr(self, motor, duracion):
+        """Avanza el motor duracion segundos capturando cada intervalo."""
+        self._anotar_fases(motor)
+        for _ in motor.correr_por_intervalos(duracion, self.intervalo):
+            self.capturar(motor)
+
+    def cerrar(self, motor=None):
+        """Escribe lo pendiente, las fases y (con motor) sus métricas agregadas."""
+        if motor is not None and motor.cambios_fase is not None:
+            self._anotar_fases(motor)
+            motor.cambios_fase = None
+        self._vaciar()
+        self._vehiculos.cerrar()
+
+        # Estados de fase como códigos con su tabla de nombres
+        nombres, codigos = np.unique(np.array(self._fase_estado, dtype=str), return_inverse=True)
+        fases = self._escritor("fases")
+        fases.escribir({"t": np.array(self._fase_t), "estado": codigos.astype(np.int16)})
+        fases.cerrar()
+        with open(os.path.join(self.carpeta, "fases_nombres.txt"), "w", encoding="utf-8") as archivo:
+            archivo.write("\n".join(nombres.tolist()))
+
+        if motor is not None:
+            movimientos = motor.metricas.resumen()["movimientos"]
+            claves = list(movimientos)
+            columnas = {
+                "origen": np.array([INDICE_APROXIMACION[o] for o, _ in claves], dtype=np.int8),
+                "destino": np.array([INDICE_APROXIMACION[d] for _, d in claves], dtype=np.int8),
+            }
+            for campo in ("vehiculos", "demora_media", "demora_p50", "demora_p95",
+                          "viaje_medio", "paradas_medias"):
+                columnas[campo] = np.array([movimientos[c][campo] for c in claves])
+            metricas = self._escritor("metricas")
+            metricas.escribir(columnas)
+            metricas.cerrar()
+
+
+def leer(carpeta):
+    """
+    Lee una exportación: dict tabla -> dict columna -> arreglo. Los códigos de
+    aproximación corresponden a llegadas.APROXIMACIONES.
+    """
+    tablas = {}
+    for tabla in ("vehiculos", "fases", "metricas"):
+        parquet = os.path.join(carpeta, f"{tabla}.parquet")
+        npz = os.path.join(carpeta, f"{tabla}.npz")
+        if os.path.exists(parquet):
+            pa = _pyarrow()
+            if pa is None:
+                raise ValueError("Leer parquet necesita pyarrow: pip install pyarrow")
+            datos = pa.parquet.read_table(parquet)
+            tablas[tabla] = {n: datos.column(n).to_numpy() for n in datos.column_names}
+        elif os.path.exists(npz):
+            with np.load(npz) as datos:
+                columnas = {}
+                for miembro in sorted(datos.files):
+                    columna = miembro.split("/")[0]
+                    columnas.setdefault(columna, []).append(datos[miembro])
+            tablas[tabla] = {n: np.concatenate(p) for n, p in columnas.items()}
+    return tablas
+
+
+def main():
+    """Corre un perfil de demanda exportando la corrida."""
+    if len(sys.argv) < 4:
+        print("Uso: python exportar.py perfil.json horas carpeta [semilla] [npz|parquet]")
+        return
+
+    from demanda import PerfilDemanda
+    from motor import MotorSimulacion
+
+    semilla = int(sys.argv[4]) if len(sys.argv) > 4 else None
+    formato = sys.argv[5] if len(sys.argv) > 5 else None
+
+    motor = MotorSimulacion(semilla)
+    motor.usar_perfil_demanda(PerfilDemanda.cargar(sys.argv[1]), 7)
+    exportador = ExportadorColumnar(sys.argv[3], formato)
+    inicio = time.perf_counter()
+    exportador.correr(motor, float(sys.argv[2]) * 3600)
+    exportador.cerrar(motor)
+    duracion = time.perf_counter() - inicio
+
+    print(f"{exportador.filas} filas de vehículos en {exportador.formato} "
+          f"({len(exportador._fase_t)} cambios de fase) en {duracion:.1f} s")
+    print("Aproximaciones:", ", ".join(f"{i}={a}" for i, a in enumerate(APROXIMACIONES)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Contenedor de la flota activa de vehículos.
+
+Los vehículos vivos se guardan en una lista compacta; cada uno recuerda su
+índice dentro de ella, así que retirarlo es un intercambio con el último
+elemento (swap-remove) en O(1). Los vehículos retirados pasan a una lista
+libre y se reutilizan en la siguiente aparición en lugar de crear objetos
+nuevos.
+"""
+
+
+class FlotaVehiculos:
+    def __init__(self, fabrica, max_libres=1024):
+        # fabrica(lane, position, destination, **opciones) crea un registro
+        # nuevo; los reutilizados se reinician con su método reiniciar()
+        self._fabrica = fabrica
+        self._activos = []
+        self._libres = []
+        self.max_libres = max_libres
+
+    def __len__(self):
+        return len(self._activos)
+
+    def __bool__(self):
+        return bool(self._activos)
+
+    def __iter__(self):
+        # Se itera sobre la lista interna: no liberar vehículos mientras se
+        # recorre la flota, recolectarlos primero y liberarlos después
+        return iter(self._activos)
+
+    def __contains__(self, vehicle):
+        indice = getattr(vehicle, "indice_flota", -1)
+        return 0 <= indice < len(self._activos) and self._activos[indice] is vehicle
+
+    def crear(self, lane, position, destination=None, **opciones):
+        """
+        Activa un vehículo, reutilizando un registro libre si hay alguno.
+        opciones se pasan tal cual a la fábrica o a reiniciar() (p. ej. la ruta).
+        """
+        if self._libres:
+            vehicle = self._libres.pop()
+            vehicle.reiniciar(lane, position, destination, **opciones)
+        else:
+            vehicle = self._fabrica(lane, position, destination, **opciones)
+
+        vehicle.indice_flota = len(self._activos)
+        self._activos.append(vehicle)
+        return vehicle
+
+    def liberar(self, vehicle):
+        """
+        Retira un vehículo activo en O(1) y guarda su registro para reutilizarlo.
+        Devuelve False si el vehículo no pertenece a la flota.
+        """
+        if vehicle not in self:
+            return False
+
+        indice = vehicle.indice_flota
+        ultimo = self._activos.pop()
+        if ultimo is not vehicle:
+            # Mover el último vehículo al hueco que deja el retirado
+            self._activos[indice] = ultimo
+            ultimo.indice_flota = indice
+
+        vehicle.indice_flota = -1
+        if len(self._libres) < self.max_libres:
+            self._libres.append(vehicle)
+        return True
+
+    def clear(self):
+        """
+        Retira todos los vehículos activos conservando sus registros.
+        """
+        for vehicle in self._activos:
+            vehicle.indice_flota = -1
+        espacio = max(0, self.max_libres - len(self._libres))
+        self._libres.extend(self._activos[:espacio])
+        self._activos.clear()
+
+    def libres(self):
+        """Número de registros disponibles para reutilizar"""
+        return len(self._libres)
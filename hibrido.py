@@ -0,0 +1,154 @@
+"""
+Simulación híbrida: cruces microscópicos dentro de una red macroscópica.
+
+Los cruces que se estudian se simulan con un MotorSimulacion completo
+(vehículos, rejilla de conflictos, carriles y controlador propios); el resto
+de la red es el modelo de transmisión de celdas de ctm.py. En la frontera:
+
+- macro → micro: la última celda de cada enlace que entra en un cruce
+  microscópico entrega flujo (fracciones de vehículo) mientras el acceso del
+  motor tenga sitio. El flujo se acumula por enlace y cada vehículo entero se
+  crea en el motor con un destino sorteado según el reparto de giros del
+  enlace; la fracción sobrante espera al paso siguiente.
+- micro → macro: cada vehículo que termina su ruta en el motor se suma a la
+  cola de entrada del enlace del cruce vecino al que lleva su movimiento, o
+  sale de la red si está en el borde.
+
+Ningún vehículo se crea ni se pierde en la conversión: resumen() cuadra
+generados con salidos más los que hay en cada parte. El coste de la parte
+microscópica crece con el número de cruces estudiados; la red macroscópica
+se actualiza con arreglos.
+
+    hibrido = SimulacionHibrida(20, 20, micro=[(10, 10)], semilla=1)
+    hibrido.red.set_demanda(0.08)
+    hibrido.correr(600)
+
+    python hibrido.py [filas] [columnas] [minutos] [tasa] [cruces micro]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from ctm import RedMacro
+from llegadas import APROXIMACIONES, MOVIMIENTOS
+from motor import MotorSimulacion
+
+# Vehículos que admite cada acceso del motor antes de la zona de aproximación
+# (avance < INICIO_ACCESO); con más, el enlace macroscópico retiene el flujo
+MAX_EN_ACCESO = 6
+INICIO_ACCESO = 35
+
+# Vehículos por paso que puede entregar un enlace a un acceso con sitio
+ACEPTACION = 1.0
+
+
+class SimulacionHibrida:
+    def __init__(self, filas, columnas, micro, semilla=None, controlador=None, celdas=10):
+        """
+        micro: lista de (fila, columna) de los cruces que se simulan vehículo a vehículo.
+        controlador: fábrica de controladores de fases, para los cruces
+            macroscópicos y los microscópicos (None: ciclo de la red de Petri).
+        """
+        self.red = RedMacro(filas, columnas, celdas=celdas, controlador=controlador, semilla=semilla)
+        self.motores = {}
+        for fila, columna in micro:
+            indice = fila * columnas + columna
+            # Cada cruce con su propia semilla derivada de la maestra, para que
+            # no repitan los mismos flujos aleatorios
+            semilla_cruce = int(self.red.flujos.secuencia("micro", indice).generate_state(1, np.uint64)[0])
+            motor = MotorSimulacion(semilla_cruce, registro=self.red.registro)
+            if controlador is not None:
+                motor.usar_controlador(controlador())
+            motor.salidas = []
+            self.red.ceder_nodo(indice)
+            self.motores[indice] = motor
+
+        # Flujo recibido por cada enlace de frontera que aún no formó un vehículo
+        self.acumulado = np.zeros(len(self.red.n))
+        self.salidos_micro = 0
+
+    @property
+    def reloj(self):
+        return self.red.reloj
+
+    def _aceptacion(self):
+        """Cuánto admite en este paso cada acceso de los cruces microscópicos."""
+        aceptacion = self.red.aceptacion
+        for indice, motor in self.motores.items():
+            en_acceso = dict.fromkeys(APROXIMACIONES, 0)
+            for vehicle in motor.vehicles:
+                if vehicle.avance < INICIO_ACCESO:
+                    en_acceso[vehicle.lane] += 1
+            for enlace, aproximacion in zip(self.red.enlaces_nodo(indice), APROXIMACIONES):
+                aceptacion[enlace] = ACEPTACION if en_acceso[aproximacion] < MAX_EN_ACCESO else 0.0
+
+    def _entregar(self):
+        """Convierte el flujo entregado por la red en vehículos del motor."""
+        self.acumulado += self.red.entregado
+        rng = self.red.flujos.flujo("hibrido", "giros")
+        for indice, motor in self.motores.items():
+            for enlace, origen in zip(self.red.enlaces_nodo(indice), APROXIMACIONES):
+                while self.acumulado[enlace] >= 1.0:
+                    self.acumulado[enlace] -= 1.0
+                    destino = MOVIMIENTOS[origen][rng.choice(3, p=self.red.reparto[enlace])]
+                    motor.add_vehicle(origen, destino)
+
+    def _recoger(self, indice, motor):
+        """Pasa a la red los vehículos que terminaron su ruta en el motor."""
+        for origen, destino in motor.salidas:
+            enlace = self.red.enlace_salida(indice, origen, destino)
+            if enlace >= 0:
+                self.red.cola_entrada[enlace] += 1
+            else:
+                self.salidos_micro += 1
+        motor.salidas.clear()
+
+    def avanzar(self):
+        """Un paso de la red y el mismo tiempo en cada cruce microscópico."""
+        self._aceptacion()
+        self.red.avanzar()
+        self._entregar()
+        for indice, motor in self.motores.items():
+            motor.correr(self.red.paso)
+            self._recoger(indice, motor)
+
+    def correr(self, duracion):
+        fin = self.red.reloj + duracion
+        while self.red.reloj < fin:
+            self.avanzar()
+
+    def resumen(self):
+        """Balance de vehículos de toda la simulación."""
+        resumen = self.red.resumen()
+        resumen["salidos"] += self.salidos_micro
+        resumen["en_micro"] = sum(len(m.vehicles) for m in self.motores.values())
+        resumen["en_frontera"] = float(self.acumulado.sum())
+        return resumen
+
+
+def main():
+    """Compara el coste de la red solo macroscópica con el de la híbrida."""
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    columnas = int(sys.argv[2]) if len(sys.argv) > 2 else filas
+    minutos = float(sys.argv[3]) if len(sys.argv) > 3 else 10
+    tasa = float(sys.argv[4]) if len(sys.argv) > 4 else 0.08
+    cruces = int(sys.argv[5]) if len(sys.argv) > 5 else 1
+
+    centro = (filas // 2, columnas // 2)
+    micro = [(centro[0], centro[1] + k) for k in range(cruces)]
+    for nombre, zona in (("Solo macro", []), (f"Híbrida ({cruces} micro)", micro)):
+        hibrido = SimulacionHibrida(filas, columnas, zona, semilla=1)
+        hibrido.red.set_demanda(tasa)
+        inicio = time.perf_counter()
+        hibrido.correr(minutos * 60)
+        duracion = time.perf_counter() - inicio
+        r = hibrido.resumen()
+        balance = r["generados"] - r["salidos"] - r["en_red"] - r["en_cola"] - r["en_micro"] - r["en_frontera"]
+        print(f"{nombre:20s} {duracion:6.1f} s  generados {r['generados']}  salidos {r['salidos']:.0f}  "
+              f"en micro {r['en_micro']}  balance {balance:+.2e}")
+
+
+if __name__ == "__main__":
+    main()
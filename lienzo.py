@@ -0,0 +1,292 @@
+"""
+Vista directa del cruce pintada con QPainter, sin QGraphicsScene.
+
+La escena de circulacion.py se reconstruye entera en cada cuadro: crear un
+elemento por triángulo, colocarlo, rotarlo e indexarlo en el árbol BSP
+cuesta más que dibujarlo. LienzoCruce pinta calles, semáforos y toda la
+flota en un único paintEvent a partir de los arreglos de
+motor.posiciones_vehiculos(): cada vehículo es un fragmento rotado de un
+mismo sprite, los fragmentos se llenan con NumPy y toda la flota se dibuja
+con una sola llamada a drawPixmapFragments.
+
+    SEMAFOROS_VISTA=lienzo python circulacion.py
+    python lienzo.py 1000 10000        # compara ambas vistas
+"""
+
+import math
+import sys
+import time
+
+import numpy as np
+from PyQt6 import sip
+from PyQt6.QtCore import QPointF, QRectF, Qt
+from PyQt6.QtGui import QBrush, QColor, QFont, QPainter, QPen, QPixmap, QPolygonF
+from PyQt6.QtWidgets import QSizePolicy, QWidget
+
+from modelo import COLOR_EMERGENCIA, COLOR_GIRO_ESTE_OESTE, COLOR_GIRO_NORTE_SUR, COLOR_RECTO
+
+ANCHO, ALTO = 900, 700
+
+# Triángulo de un vehículo en sus coordenadas locales (apunta hacia +x)
+TRIANGULO = np.array([(0.0, -10.0), (20.0, 0.0), (0.0, 10.0)])
+COLORES_VEHICULO = (COLOR_RECTO, COLOR_GIRO_NORTE_SUR, COLOR_GIRO_ESTE_OESTE, COLOR_EMERGENCIA)
+
+COLORES_LUZ = {"rojo": QColor(255, 0, 0), "amarillo": QColor(255, 255, 0), "verde": QColor(0, 255, 0)}
+APAGADAS = {"rojo": QColor(100, 0, 0), "amarillo": QColor(100, 100, 0), "verde": QColor(0, 100, 0)}
+
+# Posición y rotación de los semáforos, como en circulacion.dibujar_cruce()
+SEMAFOROS_VEHICULARES = {"Norte": (500, 200, 0), "Sur": (400, 500, 180), "Este": (600, 400, 90),
+                         "Oeste": (300, 300, 270)}
+SEMAFOROS_PEATONALES = {
+    "Norte_directo": (475, 410, 0), "Norte_indirecto": (475, 260, 0),
+    "Sur_directo": (425, 295, 180), "Sur_indirecto": (425, 440, 180),
+    "Este_directo": (400, 370, 90), "Este_indirecto": (530, 370, 90),
+    "Oeste_directo": (500, 320, 270), "Oeste_indirecto": (370, 320, 270),
+}
+CONTADORES = {"Norte": ((430, 120, 25, 15), (465, 135)), "Sur": ((445, 565, 25, 15), (480, 580)),
+              "Este": ((565, 315, 15, 25), (585, 330)), "Oeste": ((320, 345, 15, 25), (250, 360))}
+NOMBRES = {"Norte": (430, 55), "Sur": (435, 655), "Este": (700, 355), "Oeste": (200, 355)}
+
+
+# Cada vehículo es un fragmento de un sprite con los tres triángulos (uno
+# por color) en celdas de LADO_SPRITE px; el centro de la celda corresponde
+# al punto (10, 0) del triángulo
+LADO_SPRITE = 24
+_sprite = None
+
+
+def sprite_vehiculos():
+    """Pixmap con un triángulo de cada color, como los de la escena."""
+    global _sprite
+    if _sprite is None:
+        _sprite = QPixmap(LADO_SPRITE * len(COLORES_VEHICULO), LADO_SPRITE)
+        _sprite.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(_sprite)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setPen(QPen(Qt.GlobalColor.black))
+        margen = (LADO_SPRITE - 20) / 2
+        for k, rgb in enumerate(COLORES_VEHICULO):
+            painter.setBrush(QColor(*rgb))
+            x0 = k * LADO_SPRITE + margen
+            painter.drawPolygon(QPolygonF([QPointF(x0 + px, LADO_SPRITE / 2 + py) for px, py in TRIANGULO]))
+        painter.end()
+    return _sprite
+
+
+def fragmentos(x, y, angulo, color):
+    """
+    Arreglo de QPainter.PixmapFragment para drawPixmapFragments, llenado
+    en bloque desde NumPy: cada fragmento son 10 reales (x, y, sourceLeft,
+    sourceTop, width, height, scaleX, scaleY, rotation, opacity).
+    """
+    n = len(x)
+    arreglo = sip.array(QPainter.PixmapFragment, n)
+    if n:
+        datos = np.frombuffer(memoryview(arreglo).cast("B"), dtype=np.float64).reshape(n, 10)
+        radianes = np.radians(angulo)
+        datos[:, 0] = x + 10 * np.cos(radianes)
+        datos[:, 1] = y + 10 * np.sin(radianes)
+        datos[:, 2] = color * LADO_SPRITE
+        datos[:, 3] = 0
+        datos[:, 4:6] = LADO_SPRITE
+        datos[:, 6:8] = 1
+        datos[:, 8] = angulo
+        datos[:, 9] = 1
+    return arreglo
+
+
+def pintar_calles(painter):
+    """Fondo, calles, líneas divisorias y caja del cruce."""
+    painter.fillRect(QRectF(0, 0, ANCHO, ALTO), QColor(255, 255, 255))
+    painter.setPen(QPen(Qt.GlobalColor.black))
+    painter.setBrush(QBrush(Qt.GlobalColor.gray))
+    painter.drawRect(QRectF(0, 315, 900, 70))
+    painter.drawRect(QRectF(415, 0, 70, 700))
+    painter.setPen(QPen(Qt.GlobalColor.white, 3, Qt.PenStyle.DashLine))
+    painter.drawLine(0, 350, 900, 350)
+    painter.drawLine(450, 0, 450, 700)
+    painter.setBrush(Qt.BrushStyle.NoBrush)
+    painter.setPen(QPen(QColor(255, 0, 0), 2, Qt.PenStyle.DashLine))
+    painter.drawRect(QRectF(415, 315, 70, 70))
+
+
+def pintar_semaforos(painter, estados):
+    """Semáforos vehiculares; estados es un dict aproximación -> estado."""
+    painter.setPen(QPen(Qt.GlobalColor.black))
+    for direccion, (x, y, rotacion) in SEMAFOROS_VEHICULARES.items():
+        estado = estados[direccion]
+        painter.save()
+        painter.translate(x, y)
+        painter.rotate(rotacion)
+        painter.setBrush(QBrush(Qt.GlobalColor.darkGray))
+        painter.drawRect(QRectF(0, 0, 30, 90))
+        for i, luz in enumerate(("rojo", "amarillo", "verde")):
+            painter.setBrush(COLORES_LUZ[luz] if estado == luz else APAGADAS[luz])
+            painter.drawEllipse(QRectF(2.5, 5 + 27.5 * i, 25, 25))
+        painter.restore()
+
+
+def pintar_vehiculos(painter, x, y, angulo, color):
+    """Toda la flota en una llamada (arreglos como motor.posiciones_vehiculos())."""
+    painter.save()
+    painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+    painter.drawPixmapFragments(fragmentos(x, y, angulo, color), sprite_vehiculos())
+    painter.restore()
+
+
+def pintar_leyenda(painter):
+    """Nombres de las aproximaciones y leyenda de colores."""
+    painter.setPen(QPen(Qt.GlobalColor.black))
+    painter.setFont(QFont("Arial", 16, QFont.Weight.Bold))
+    for nombre, (x, y) in NOMBRES.items():
+        painter.drawText(QPointF(x, y), nombre)
+    painter.setBrush(QColor(240, 240, 240, 180))
+    painter.drawRect(QRectF(700, 580, 180, 110))
+    painter.setFont(QFont("Arial", 9))
+    painter.drawText(QPointF(710, 600), "Leyenda Vehículos")
+    textos = ("Recto", "Giro a Norte/Sur", "Giro a Este/Oeste", "Emergencia")
+    for i, (rgb, texto) in enumerate(zip(COLORES_VEHICULO, textos)):
+        painter.setBrush(QColor(*rgb))
+        painter.drawRect(QRectF(710, 610 + 20 * i, 15, 15))
+        painter.drawText(QPointF(732, 622 + 20 * i), texto)
+
+
+def pintar_cruce(painter, motor):
+    """Pinta el estado actual del motor en coordenadas de escena (900 x 700)."""
+    negro = QPen(Qt.GlobalColor.black)
+    pintar_calles(painter)
+
+    # Carriles y celdas de conflicto reservadas
+    if motor.carriles is not None:
+        divisorias, cabezas = motor.carriles.marcas()
+        painter.setPen(QPen(Qt.GlobalColor.white, 1))
+        for (x0, y0), (x1, y1) in divisorias:
+            painter.drawLine(QPointF(x0, y0), QPointF(x1, y1))
+        painter.setPen(negro)
+        for aproximacion, k, x, y in cabezas:
+            movimientos = motor.carriles.aproximaciones[aproximacion][k].movimientos
+            estado = motor.semaforos_vehiculares[aproximacion].estado_carril(movimientos)
+            painter.setBrush(COLORES_LUZ[estado])
+            painter.drawEllipse(QRectF(x - 3, y - 3, 6, 6))
+
+    painter.setPen(Qt.PenStyle.NoPen)
+    painter.setBrush(QColor(255, 0, 0, 60))
+    for x, y, ancho, alto in motor.conflictos.ocupadas():
+        painter.drawRect(QRectF(x, y, ancho, alto))
+
+    # Semáforos
+    pintar_semaforos(painter, {d: s.estado for d, s in motor.semaforos_vehiculares.items()})
+    for clave, (x, y, rotacion) in SEMAFOROS_PEATONALES.items():
+        estado = motor.semaforos_peatonales[clave].estado
+        painter.save()
+        painter.translate(x, y)
+        painter.rotate(rotacion)
+        painter.setBrush(QColor(120, 120, 120) if clave.endswith("directo") else QColor(80, 80, 80))
+        painter.drawRect(QRectF(0, 0, 20, 30))
+        painter.setBrush(QColor(255, 0, 0) if estado == "rojo" else QColor(255, 255, 255))
+        painter.drawEllipse(QRectF(2.5, 7.5, 15, 15))
+        painter.restore()
+
+    pintar_vehiculos(painter, *motor.posiciones_vehiculos())
+
+    # Contadores y aviso de la caja
+    painter.setFont(QFont("Arial", 12, QFont.Weight.Bold))
+    for direccion, ((x, y, ancho, alto), texto) in CONTADORES.items():
+        painter.setPen(QPen(QColor(30, 30, 30), 2))
+        painter.setBrush(QColor(50, 50, 50))
+        painter.drawRect(QRectF(x, y, ancho, alto))
+        painter.setPen(QColor(255, 255, 255))
+        painter.drawText(QPointF(*texto), f"Tráfico: {motor.traffic_counts[direccion]}")
+    en_cruce = sum(motor.intersection_stats.values()) if motor.intersection_stats else 0
+    if en_cruce:
+        painter.setPen(QColor(255, 0, 0))
+        painter.setFont(QFont("Arial", 9))
+        painter.drawText(QPointF(420, 305), f"¡{en_cruce} vehículo(s) en intersección!")
+
+    pintar_leyenda(painter)
+
+
+class LienzoCruce(QWidget):
+    def __init__(self, motor, parent=None):
+        super().__init__(parent)
+        self.motor = motor
+        self.setMinimumSize(450, 350)
+        self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+
+    def sizeHint(self):
+        return self.minimumSize() * 2
+
+    def paintEvent(self, event):
+        inicio = time.perf_counter()
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.fillRect(self.rect(), QColor(255, 255, 255))
+
+        # Escala uniforme y centrada, como QGraphicsView con la escena fija
+        escala = min(self.width() / ANCHO, self.height() / ALTO)
+        painter.translate((self.width() - ANCHO * escala) / 2, (self.height() - ALTO * escala) / 2)
+        painter.scale(escala, escala)
+        pintar_cruce(painter, self.motor)
+        painter.end()
+
+        if self.motor.monitor is not None:
+            self.motor.monitor.observar_render(time.perf_counter() - inicio)
+
+
+def _motor_con_flota(n, semilla=1):
+    """Motor con n vehículos repartidos al azar a lo largo de sus rutas."""
+    from llegadas import MOVIMIENTOS
+    from motor import MotorSimulacion
+
+    motor = MotorSimulacion(semilla)
+    rng = np.random.default_rng(semilla)
+    origenes = list(MOVIMIENTOS)
+    for _ in range(n):
+        origen = origenes[rng.integers(4)]
+        vehicle = motor.add_vehicle(origen, MOVIMIENTOS[origen][rng.integers(3)])
+        vehicle.distancia = rng.uniform(0, vehicle.ruta.longitud)
+    return motor
+
+
+def main():
+    """Milisegundos por cuadro de la escena y del lienzo directo con n vehículos."""
+    from PyQt6.QtGui import QImage
+    from PyQt6.QtWidgets import QApplication
+
+    import circulacion
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    cantidades = [int(a) for a in sys.argv[1:]] or [1000, 10000]
+    imagen = QImage(ANCHO, ALTO, QImage.Format.Format_ARGB32_Premultiplied)
+    ventana = circulacion.SimuladorSemaforos(semilla=1, vista="escena")
+
+    for n in cantidades:
+        motor = _motor_con_flota(n)
+        ventana.motor = motor
+        cuadros = max(3, math.ceil(20000 / n))
+
+        inicio = time.perf_counter()
+        for _ in range(cuadros):
+            ventana.dibujar_cruce()
+            painter = QPainter(imagen)
+            painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+            ventana.scene.render(painter, QRectF(0, 0, ANCHO, ALTO), QRectF(0, 0, ANCHO, ALTO))
+            painter.end()
+        escena = (time.perf_counter() - inicio) / cuadros
+
+        inicio = time.perf_counter()
+        for _ in range(cuadros):
+            painter = QPainter(imagen)
+            painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+            pintar_cruce(painter, motor)
+            painter.end()
+        directo = (time.perf_counter() - inicio) / cuadros
+
+        print(f"{n:6d} vehículos  escena {escena * 1000:7.1f} ms  lienzo {directo * 1000:6.1f} ms  "
+              f"({escena / directo:.0f}x)")
+    ventana.close()
+    del app
+
+
+if __name__ == "__main__":
+    main()
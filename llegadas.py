@@ -0,0 +1,178 @@
+"""
+Generación vectorizada de llegadas de vehículos.
+
+En lugar de sortear un vehículo cada vez que dispara un temporizador, se
+precalcula de una sola vez el programa completo de llegadas (horas de tiempo
+simulado) para cada aproximación con NumPy. El motor solo avanza un cursor
+sobre arreglos ordenados por tiempo y recoge las llegadas vencidas en cada
+paso.
+
+Procesos disponibles:
+- "poisson": intervalos exponenciales.
+- "exponencial_desplazada": intervalos exponenciales con un avance mínimo
+  entre vehículos (distribución exponencial negativa desplazada).
+- "pelotones": pelotones que llegan como proceso de Poisson, con tamaño
+  aleatorio y separación fija entre los vehículos del pelotón.
+"""
+
+import numpy as np
+
+APROXIMACIONES = ("Norte", "Sur", "Este", "Oeste")
+INDICE_APROXIMACION = {nombre: i for i, nombre in enumerate(APROXIMACIONES)}
+
+# Destinos por origen: recto, giro, giro (mismo orden que generate_traffic)
+MOVIMIENTOS = {
+    "Norte": ("Sur", "Este", "Oeste"),
+    "Sur": ("Norte", "Este", "Oeste"),
+    "Este": ("Oeste", "Norte", "Sur"),
+    "Oeste": ("Este", "Norte", "Sur"),
+}
+
+# 60% recto, 20% para cada giro
+REPARTO_GIROS = (0.6, 0.2, 0.2)
+
+
+def _intervalos_acumulados(rng, tasa, duracion, muestrear):
+    """
+    Acumula intervalos muestreados en bloque hasta cubrir la duración pedida.
+    muestrear(n) devuelve n intervalos; se pide un margen sobre la media para
+    que casi siempre baste un único bloque.
+    """
+    if tasa <= 0 or duracion <= 0:
+        return np.empty(0)
+
+    esperados = tasa * duracion
+    bloque = int(esperados + 5 * np.sqrt(esperados) + 16)
+    tiempos = np.cumsum(muestrear(bloque))
+    while tiempos[-1] < duracion:
+        extra = np.cumsum(muestrear(bloque)) + tiempos[-1]
+        tiempos = np.concatenate((tiempos, extra))
+
+    return tiempos[:np.searchsorted(tiempos, duracion)]
+
+
+def llegadas_poisson(rng, tasa, duracion):
+    """Tiempos de llegada de un proceso de Poisson de tasa veh/s"""
+    return _intervalos_acumulados(
+        rng, tasa, duracion, lambda n: rng.exponential(1.0 / tasa, n))
+
+
+def llegadas_exponencial_desplazada(rng, tasa, duracion, avance_minimo=1.0):
+    """
+    Intervalos = avance_minimo + exponencial, con la media ajustada para
+    conservar la tasa pedida. La tasa no puede superar 1/avance_minimo: por
+    encima, los vehículos llegan saturados, uno cada avance_minimo s.
+    """
+    if tasa <= 0 or duracion <= 0:
+        return np.empty(0)
+
+    exceso = max(1.0 / tasa - avance_minimo, 0.0)
+    return _intervalos_acumulados(
+        rng, min(tasa, 1.0 / avance_minimo), duracion,
+        lambda n: avance_minimo + rng.exponential(exceso, n))
+
+
+def llegadas_pelotones(rng, tasa, duracion, tamano_medio=4.0, avance_peloton=1.5):
+    """
+    Pelotones con cabeza de Poisson de tasa tasa/tamano_medio; cada pelotón
+    tiene 1 + Poisson(tamano_medio - 1) vehículos separados avance_peloton s.
+    """
+    if tasa <= 0 or duracion <= 0:
+        return np.empty(0)
+
+    cabezas = llegadas_poisson(rng, tasa / tamano_medio, duracion)
+    tamanos = 1 + rng.poisson(tamano_medio - 1.0, cabezas.size)
+
+    # Desplazamiento de cada vehículo respecto a la cabeza de su pelotón
+    inicio = np.repeat(np.cumsum(tamanos) - tamanos, tamanos)
+    posicion = np.arange(inicio.size) - inicio
+    tiempos = np.repeat(cabezas, tamanos) + posicion * avance_peloton
+
+    tiempos.sort()
+    return tiempos[:np.searchsorted(tiempos, duracion)]
+
+
+PROCESOS = {
+    "poisson": llegadas_poisson,
+    "exponencial_desplazada": llegadas_exponencial_desplazada,
+    "pelotones": llegadas_pelotones,
+}
+
+
+class ProgramaLlegadas:
+    """
+    Llegadas precalculadas ordenadas por tiempo. aproximacion y destino son
+    índices en APROXIMACIONES.
+    """
+
+    def __init__(self, tiempos, aproximacion, destino):
+        self.tiempos = tiempos
+        self.aproximacion = aproximacion
+        self.destino = destino
+        self.cursor = 0
+
+    def __len__(self):
+        return self.tiempos.size
+
+    def restantes(self):
+        return self.tiempos.size - self.cursor
+
+    def fin(self):
+        """Tiempo de la última llegada programada (0 si está vacío)"""
+        return float(self.tiempos[-1]) if self.tiempos.size else 0.0
+
+    def extraer_hasta(self, tiempo):
+        """
+        Devuelve (aproximacion, destino) de todas las llegadas con tiempo <= tiempo
+        que aún no se habían extraído, como vistas de los arreglos internos.
+        """
+        fin = int(np.searchsorted(self.tiempos, tiempo, side="right"))
+        inicio = self.cursor
+        self.cursor = max(inicio, fin)
+        return self.aproximacion[inicio:self.cursor], self.destino[inicio:self.cursor]
+
+
+def _destinos(rng, origen, n, reparto):
+    """Sortea en bloque los destinos de n vehículos que llegan por origen."""
+    destinos = np.array([INDICE_APROXIMACION[d] for d in MOVIMIENTOS[origen]], dtype=np.int8)
+    return destinos[rng.choice(len(destinos), size=n, p=reparto)]
+
+
+def generar_programa(tasas, duracion, proceso="poisson", reparto=None,
+                     rng=None, inicio=0.0, flujos=None, **parametros):
+    """
+    Genera el programa de llegadas de todas las aproximaciones.
+
+    tasas: dict aproximación -> veh/s.
+    reparto: dict aproximación -> probabilidades (recto, giro, giro) según
+        MOVIMIENTOS; por defecto REPARTO_GIROS para todas.
+    flujos: FlujosAleatorios opcional; si se indica, cada aproximación usa
+        sus propios flujos ("llegadas", origen) y ("giros", origen) en vez de rng.
+    parametros: se pasan al proceso (avance_minimo, tamano_medio, ...).
+    """
+    if proceso not in PROCESOS:
+        raise ValueError(f"Proceso de llegadas desconocido: {proceso}")
+    generador = PROCESOS[proceso]
+    rng = rng if rng is not None else np.random.default_rng()
+    reparto = reparto or {}
+
+    tiempos, aproximaciones, destinos = [], [], []
+    for origen, tasa in tasas.items():
+        rng_llegadas = flujos.flujo("llegadas", origen) if flujos is not None else rng
+        rng_giros = flujos.flujo("giros", origen) if flujos is not None else rng
+        t = generador(rng_llegadas, tasa, duracion, **parametros) if tasa > 0 else np.empty(0)
+        tiempos.append(t + inicio)
+        aproximaciones.append(np.full(t.size, INDICE_APROXIMACION[origen], dtype=np.int8))
+        destinos.append(_destinos(rng_giros, origen, t.size, reparto.get(origen, REPARTO_GIROS)))
+
+    if not tiempos:
+        vacio = np.empty(0, dtype=np.int8)
+        return ProgramaLlegadas(np.empty(0), vacio, vacio)
+
+    tiempos = np.concatenate(tiempos)
+    orden = np.argsort(tiempos, kind="stable")
+    return ProgramaLlegadas(
+        tiempos[orden],
+        np.concatenate(aproximaciones)[orden],
+        np.concatenate(destinos)[orden],
+    )
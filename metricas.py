@@ -0,0 +1,215 @@
+"""
+Medidas de desempeño en línea con memoria constante.
+
+Cada vehículo lleva solo cuatro números (aparición, demora acumulada,
+paradas y si está detenido) que actualiza en cada paso. Al salir, su demora,
+tiempo de viaje y paradas se agregan a histogramas logarítmicos por
+movimiento y por fase, de tamaño fijo: se pueden simular muchas horas y
+pedir la mediana, el percentil 95 o el nivel de servicio sin guardar
+trayectorias.
+
+La demora es el tiempo perdido respecto a circular a la velocidad libre; el
+nivel de servicio usa los umbrales de demora de control de intersecciones
+semaforizadas del HCM.
+
+    motor.correr(3600)
+    print(motor.metricas.informe())
+"""
+
+import math
+
+import numpy as np
+
+# Nivel de servicio según la demora media por vehículo (s): A ≤ 10, B ≤ 20, ...
+UMBRALES_LOS = ((10, "A"), (20, "B"), (35, "C"), (55, "D"), (80, "E"))
+
+# Fracción del paso libre por debajo de la cual un vehículo cuenta como detenido
+UMBRAL_DETENIDO = 0.1
+
+
+def nivel_servicio(demora):
+    """Letra A-F del nivel de servicio para una demora media en segundos."""
+    for limite, letra in UMBRALES_LOS:
+        if demora <= limite:
+            return letra
+    return "F"
+
+
+class HistogramaStreaming:
+    def __init__(self, error_relativo=0.02, minimo=0.01, maximo=24 * 3600):
+        """
+        Histograma de cubetas logarítmicas: cualquier cuantil se obtiene con
+        un error relativo de error_relativo para valores entre minimo y
+        maximo. Los valores menores que minimo (p. ej. demora nula) se
+        cuentan aparte como cero.
+        """
+        self.gamma = (1 + error_relativo) / (1 - error_relativo)
+        self._log_gamma = math.log(self.gamma)
+        self.minimo = minimo
+        self.cubetas = np.zeros(int(math.ceil(math.log(maximo / minimo) / self._log_gamma)) + 1, dtype=np.int64)
+        self.ceros = 0
+        self.n = 0
+        self.suma = 0.0
+        self.maximo = 0.0
+
+    def agregar(self, valor):
+        """Añade un valor en O(1)."""
+        self.n += 1
+        self.suma += valor
+        if valor > self.maximo:
+            self.maximo = valor
+        if valor < self.minimo:
+            self.ceros += 1
+            return
+        i = min(int(math.log(valor / self.minimo) / self._log_gamma), len(self.cubetas) - 1)
+        self.cubetas[i] += 1
+
+    def fusionar(self, otro):
+        """Suma otro histograma con los mismos parámetros (p. ej. de otra replicación)."""
+        self.cubetas += otro.cubetas
+        self.ceros += otro.ceros
+        self.n += otro.n
+        self.suma += otro.suma
+        self.maximo = max(self.maximo, otro.maximo)
+
+    @property
+    def media(self):
+        return self.suma / self.n if self.n else 0.0
+
+    def cuantil(self, q):
+        """Valor aproximado del cuantil q (0-1); 0 si no hay datos."""
+        if self.n == 0:
+            return 0.0
+        rango = q * (self.n - 1)
+        if rango < self.ceros:
+            return 0.0
+        i = int(np.searchsorted(np.cumsum(self.cubetas), rango - self.ceros, side="right"))
+        # Centro geométrico de la cubeta, acotado por el máximo observado
+        return min(self.minimo * self.gamma ** i * 2 * self.gamma / (1 + self.gamma), self.maximo)
+
+
+class _Agregado:
+    """Demora, tiempo de viaje y paradas de un grupo de vehículos."""
+
+    def __init__(self):
+        self.demora = HistogramaStreaming()
+        self.viaje = HistogramaStreaming()
+        self.paradas = 0
+
+    def agregar(self, demora, viaje, paradas):
+        self.demora.agregar(demora)
+        self.viaje.agregar(viaje)
+        self.paradas += paradas
+
+    def resumen(self):
+        n = self.demora.n
+        return {
+            "vehiculos": n,
+            "demora_media": self.demora.media,
+            "demora_p50": self.demora.cuantil(0.5),
+            "demora_p95": self.demora.cuantil(0.95),
+            "viaje_medio": self.viaje.media,
+            "paradas_medias": self.paradas / n if n else 0.0,
+            "los": nivel_servicio(self.demora.media),
+        }
+
+
+class MetricasEnLinea:
+    def __init__(self):
+        self.reiniciar()
+
+    def reiniciar(self):
+        self.total = _Agregado()
+        self.por_movimiento = {}
+        self.por_fase = {}
+        # Longitud de cola por aproximación: vehículos detenidos integrados en
+        # el tiempo (para la media) y máximo observado
+        self.cola_integrada = {}
+        self.cola_maxima = {}
+        self.tiempo = 0.0
+        # Preempción (preempcion.py): vehículos de emergencia, latencia hasta
+        # su verde y tiempo de recuperación de la cola tras volver al plan
+        self.emergencia = _Agregado()
+        self.latencia_preempcion = HistogramaStreaming()
+        self.recuperacion_preempcion = HistogramaStreaming()
+
+    def registrar_salida(self, vehicle, reloj):
+        """Agrega un vehículo que termina su ruta (O(1))."""
+        viaje = reloj - vehicle.t_aparicion
+        demora = max(0.0, vehicle.demora)
+        self.total.agregar(demora, viaje, vehicle.paradas)
+
+        movimiento = (vehicle.lane, vehicle.destination)
+        agregado = self.por_movimiento.get(movimiento)
+        if agregado is None:
+            agregado = self.por_movimiento[movimiento] = _Agregado()
+        agregado.agregar(demora, viaje, vehicle.paradas)
+
+        if vehicle.fase is not None:
+            agregado = self.por_fase.get(vehicle.fase)
+            if agregado is None:
+                agregado = self.por_fase[vehicle.fase] = _Agregado()
+            agregado.agregar(demora, viaje, vehicle.paradas)
+
+        if vehicle.emergencia:
+            self.emergencia.agregar(demora, viaje, vehicle.paradas)
+
+    def registrar_preempcion(self, latencia=None, recuperacion=None):
+        """Latencia de una solicitud atendida o recuperación tras una preempción (s)."""
+        if latencia is not None:
+            self.latencia_preempcion.agregar(latencia)
+        if recuperacion is not None:
+            self.recuperacion_preempcion.agregar(recuperacion)
+
+    def registrar_colas(self, detenidos, dt):
+        """detenidos: dict aproximación -> vehículos detenidos en este paso."""
+        self.tiempo += dt
+        for aproximacion, cola in detenidos.items():
+            self.cola_integrada[aproximacion] = self.cola_integrada.get(aproximacion, 0.0) + cola * dt
+            if cola > self.cola_maxima.get(aproximacion, 0):
+                self.cola_maxima[aproximacion] = cola
+
+    def resumen(self):
+        return {
+            "total": self.total.resumen(),
+            "movimientos": {m: a.resumen() for m, a in sorted(self.por_movimiento.items())},
+            "fases": {f: a.resumen() for f, a in sorted(self.por_fase.items())},
+            "colas": {
+                a: {"media": self.cola_integrada[a] / self.tiempo if self.tiempo else 0.0,
+                    "maxima": self.cola_maxima.get(a, 0)}
+                for a in sorted(self.cola_integrada)
+            },
+            "preempcion": {
+                "emergencias": self.emergencia.demora.n,
+                "demora_emergencia": self.emergencia.demora.media,
+                "solicitudes": self.latencia_preempcion.n,
+                "latencia_media": self.latencia_preempcion.media,
+                "latencia_maxima": self.latencia_preempcion.maximo,
+                "recuperaciones": self.recuperacion_preempcion.n,
+                "recuperacion_media": self.recuperacion_preempcion.media,
+                "recuperacion_maxima": self.recuperacion_preempcion.maximo,
+            },
+        }
+
+    def informe(self):
+        """Tabla de texto con demora, percentiles y nivel de servicio."""
+        resumen = self.resumen()
+        lineas = [f"{'':24s} {'veh':>6s} {'demora':>7s} {'p50':>6s} {'p95':>6s} {'paradas':>7s}  LOS"]
+
+        def fila(nombre, r):
+            lineas.append(f"{nombre:24s} {r['vehiculos']:6d} {r['demora_media']:7.1f} {r['demora_p50']:6.1f} "
+                          f"{r['demora_p95']:6.1f} {r['paradas_medias']:7.2f}  {r['los']}")
+
+        fila("Total", resumen["total"])
+        for (origen, destino), r in resumen["movimientos"].items():
+            fila(f"{origen} → {destino}", r)
+        for fase, r in resumen["fases"].items():
+            fila(f"Fase {fase}", r)
+        for aproximacion, cola in resumen["colas"].items():
+            lineas.append(f"Cola {aproximacion:8s} media {cola['media']:.1f}  máxima {cola['maxima']}")
+        p = resumen["preempcion"]
+        if p["solicitudes"]:
+            lineas.append(f"Preempción: {p['solicitudes']} solicitudes, latencia media {p['latencia_media']:.2f} s "
+                          f"(máxima {p['latencia_maxima']:.2f} s), recuperación media "
+                          f"{p['recuperacion_media']:.1f} s (máxima {p['recuperacion_maxima']:.1f} s)")
+        return "\n".join(lineas)
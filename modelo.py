@@ -0,0 +1,302 @@
+"""
+Modelo de la intersección sin dependencias de Qt: vehículos y semáforos.
+
+Se puede importar desde scripts de simulación sin interfaz gráfica; la
+interfaz (circulacion.py) solo traduce los colores y posiciones a Qt.
+"""
+
+from metricas import UMBRAL_DETENIDO
+from rutas import RUTAS_CRUCE
+
+# Colores (r, g, b) de los vehículos según su movimiento
+COLOR_RECTO = (30, 144, 255)
+COLOR_GIRO_NORTE_SUR = (255, 165, 0)
+COLOR_GIRO_ESTE_OESTE = (0, 255, 0)
+COLOR_EMERGENCIA = (220, 20, 60)
+
+# Clase Vehicle mejorada con mejor gestión de la intersección
+class Vehicle:
+    def __init__(self, lane, position, destination=None, ruta=None, carril=0):
+        self.indice_flota = -1  # Índice dentro de FlotaVehiculos (-1 si no está activo)
+        self.reiniciar(lane, position, destination, ruta, carril)
+
+    def reiniciar(self, lane, position, destination=None, ruta=None, carril=0):
+        """
+        Deja el vehículo como recién creado; permite reutilizar el registro
+        desde la lista libre de la flota. Con varios carriles por aproximación
+        se indican la ruta del carril asignado y su índice plano (carriles.py).
+        """
+        self.lane = lane  # "Norte", "Sur", "Este", "Oeste"
+        self.speed = 2  # Default speed
+        self.stopped = False
+        self.in_intersection = False
+        self.committed_to_crossing = False  # Punto de no retorno, ya decidió cruzar
+        self.destination = destination or self._get_default_destination()
+        # For traffic that turns left or right
+        self.turning = destination is not None and destination != self._get_default_destination()
+        self.turn_started = False
+
+        # Ruta precalculada del movimiento; el vehículo solo guarda la distancia recorrida
+        self.ruta = ruta or RUTAS_CRUCE[(self.lane, self.destination)]
+        self.tramo = 0
+        self.indice_carril = carril
+        # Distancia de ruta que no puede rebasar por el vehículo de delante
+        self.limite_cola = float("inf")
+        # Distancia de ruta equivalente a un 1% del carril de entrada
+        self.escala = RUTAS_CRUCE[(self.lane, self._get_default_destination())].longitud / 100
+        self.position = position  # Position on the lane (0-100)
+        # Celdas de conflicto: índice de la primera celda aún reservada (None sin reserva)
+        self.reserva = None
+        self.waiting_at_red = False  # Ya se detuvo ante el rojo (para girar a la derecha)
+        self.emergencia = False  # Vehículo de emergencia: pide preempción al acercarse (preempcion.py)
+
+        # Medidas en línea (metricas.py): número de orden en el motor, reloj de
+        # aparición, demora acumulada (s), paradas, si está detenido y fase
+        # con la que entró en el cruce
+        self.id_vehiculo = -1
+        self.t_aparicion = 0.0
+        self.demora = 0.0
+        self.paradas = 0
+        self.detenido = False
+        self.fase = None
+
+        # Añadimos dirección actual para controlar los giros
+        self.current_direction = lane
+        self.turn_point = 55  # Avance (%) donde comienza el giro
+
+    @property
+    def avance(self):
+        """Porcentaje del carril de entrada recorrido, siempre creciente (0-100)"""
+        return self.distancia / self.escala
+
+    @property
+    def position(self):
+        # Coordenada del carril: crece hacia Norte/Este y decrece hacia Sur/Oeste
+        if self.lane in ["Norte", "Este"]:
+            return self.avance
+        return 100 - self.avance
+
+    @position.setter
+    def position(self, valor):
+        avance = valor if self.lane in ["Norte", "Este"] else 100 - valor
+        self.distancia = avance * self.escala
+
+    def _get_default_destination(self):
+        # Default straight path destinations
+        destinations = {
+            "Norte": "Sur",
+            "Sur": "Norte",
+            "Este": "Oeste",
+            "Oeste": "Este"
+        }
+        return destinations.get(self.lane)
+
+    def is_approaching_intersection(self):
+        # Check if vehicle is approaching the intersection
+        # Ampliamos el rango para detectar mejor la aproximación
+        return 35 <= self.avance <= 48
+
+    def is_in_intersection(self):
+        # Check if vehicle is in the intersection - ampliamos el rango
+        return 48 < self.avance < 65
+
+    def has_cleared_intersection(self):
+        # Check if vehicle has cleared the intersection
+        return self.avance >= 65
+
+    def is_about_to_enter_intersection(self):
+        # Punto de no retorno: tan cerca que debe seguir aunque el semáforo cambie
+        return 45 <= self.avance <= 48
+
+    def should_start_turn(self):
+        """Determina si el vehículo debe comenzar a girar"""
+        if not self.turning or self.turn_started:
+            return False
+        return self.avance >= self.turn_point
+
+    def avanzar(self, avance):
+        """Avanza sobre la ruta el equivalente a avance (% del carril de entrada)"""
+        self.distancia += avance * self.escala
+
+    def has_left_route(self):
+        # El vehículo sale de la escena al terminar su ruta
+        return self.distancia > self.ruta.longitud
+
+    def update_position(self, simulation_speed, traffic_lights, conflictos=None, dt=0.05):
+        """
+        Actualiza la posición del vehículo según su velocidad y el estado de los semáforos.
+        Con una RejillaConflictos el vehículo solo entra en la caja del cruce si
+        consigue reservar las celdas de su trayectoria. dt (s) es la duración
+        del paso, para acumular la demora.
+        """
+        antes = self.distancia
+        # Si está en la intersección o ha pasado el punto de no retorno,
+        # nunca debe detenerse
+        if self.in_intersection or self.committed_to_crossing:
+            stop_at_light = False
+
+            # Asegurar velocidad constante o mayor en la intersección
+            speed_factor = max(simulation_speed / 5, 0.5)  # Mínimo 0.5 para evitar bloqueos
+        else:
+            # Determinar si el vehículo debe detenerse en un semáforo rojo
+            stop_at_light = False
+
+            # Verificar si está aproximándose a la intersección
+            if self.is_approaching_intersection():
+                semaforo = traffic_lights.get(self.lane)
+                if semaforo:
+                    estado = semaforo.estado_movimiento(self.ruta.giro)
+                    # Si el semáforo está en rojo o amarillo, detener; el giro a
+                    # la derecha puede seguir tras detenerse si la rejilla lo permite
+                    if estado != "verde":
+                        stop_at_light = not (
+                            conflictos is not None and conflictos.giro_en_rojo
+                            and estado == "rojo"
+                            and self.ruta.giro == "derecha" and self.waiting_at_red
+                        )
+                        self.waiting_at_red = True
+                    # Si está muy cerca y el semáforo está en verde, se compromete a cruzar
+                    elif self.is_about_to_enter_intersection():
+                        self.committed_to_crossing = True
+
+            speed_factor = simulation_speed / 5
+
+        # Si está entrando en la intersección, marcar como tal
+        if self.is_in_intersection():
+            self.in_intersection = True
+            self.committed_to_crossing = True
+
+        # Si ha salido de la intersección, desmarcar
+        if self.has_cleared_intersection():
+            self.in_intersection = False
+            self.committed_to_crossing = False
+
+        # Verificar si debe comenzar a girar
+        if self.should_start_turn() and not self.turn_started:
+            self.turn_started = True
+            # Cambiar a la dirección de destino después de pasar la intersección
+            self.current_direction = self.destination
+
+        # Avanzar sobre la ruta si no está detenido (el giro lo resuelve la ruta)
+        if not stop_at_light and not self.stopped:
+            paso = self.speed * speed_factor * self.escala
+            if paso > self.limite_cola - self.distancia:
+                paso = max(0.0, self.limite_cola - self.distancia)
+            if conflictos is not None:
+                sin_reserva = self.reserva is None
+                paso = conflictos.avance_permitido(self, paso)
+                # Con las celdas reservadas ya está dentro de la caja y no se detiene
+                if sin_reserva and self.reserva is not None:
+                    self.committed_to_crossing = True
+            self.distancia += paso
+
+        if conflictos is not None:
+            conflictos.liberar_pasadas(self)
+
+        # Demora: fracción del paso perdida respecto a la velocidad libre
+        libre = self.speed * (simulation_speed / 5) * self.escala
+        if libre > 0:
+            avance = (self.distancia - antes) / libre
+            if avance < 1:
+                self.demora += (1 - avance) * dt
+            detenido = avance < UMBRAL_DETENIDO
+            if detenido and not self.detenido:
+                self.paradas += 1
+            self.detenido = detenido
+
+        return self.position
+
+    def get_color_based_on_destination(self):
+        # Colores (r, g, b) según destino para mejor visualización
+        if self.emergencia:
+            return COLOR_EMERGENCIA  # Carmesí para emergencias
+        if not self.turning:
+            return COLOR_RECTO  # Azul para directo
+
+        # Colores para vehículos que giran
+        if self.destination in ["Norte", "Sur"]:
+            return COLOR_GIRO_NORTE_SUR  # Naranja para norte/sur
+        else:
+            return COLOR_GIRO_ESTE_OESTE  # Verde para este/oeste
+
+    def get_display_position(self):
+        """
+        Posición (x, y) y rotación del vehículo, interpoladas sobre su ruta.
+        La rotación sigue la dirección del tramo actual, también en los giros.
+        """
+        x, y, rotation, self.tramo = self.ruta.posicion(self.distancia, self.tramo)
+        return x, y, rotation
+
+class SemaforoVehicular:
+    def __init__(self, direccion):
+        self.direccion = direccion
+        self.estado = "rojo"  # Inicialmente todos en rojo excepto el Sur
+        self.tokens = {"verde": 0, "amarillo": 0, "rojo": 1}
+        self.tiempo_verde = 2  # Tiempo base en verde (en ciclos)
+        self.tiempo_verde_extendido = False  # Indica si el tiempo en verde ya fue extendido
+        # Flechas de giro protegido (las usa el controlador NEMA; con el ciclo
+        # fijo quedan en rojo y los giros siguen al estado general)
+        self.flechas = {"izquierda": "rojo", "derecha": "rojo"}
+
+    def cambiar_estado(self, nuevo_estado):
+        self.estado = nuevo_estado
+
+    def estado_movimiento(self, giro):
+        """
+        Indicación para un movimiento ("recto", "izquierda" o "derecha"): la
+        flecha en verde protege el giro; si no, el giro es permisivo con el
+        estado general.
+        """
+        if giro != "recto" and self.flechas[giro] == "verde":
+            return "verde"
+        return self.estado
+
+    def estado_carril(self, movimientos):
+        """
+        Indicación de la cabeza de un carril que admite varios movimientos:
+        la más permisiva entre las de sus movimientos.
+        """
+        estados = [self.estado_movimiento(m) for m in movimientos]
+        for estado in ("verde", "amarillo"):
+            if estado in estados:
+                return estado
+        return "rojo"
+
+    def agregar_token(self, estado, cantidad=1):
+        self.tokens[estado] += cantidad
+
+    def quitar_token(self, estado, cantidad=1):
+        if self.tokens[estado] >= cantidad:
+            self.tokens[estado] -= cantidad
+            return True
+        return False
+
+    def extender_tiempo_verde(self):
+        if not self.tiempo_verde_extendido:
+            self.tiempo_verde += 1
+            self.tiempo_verde_extendido = True
+            return True
+        return False
+
+    def resetear_tiempo_verde(self):
+        self.tiempo_verde = 2
+        self.tiempo_verde_extendido = False
+
+class SemaforoPeatonal:
+    def __init__(self, carril, tipo):
+        self.carril = carril
+        self.tipo = tipo  # "directo" o "indirecto"
+        self.estado = "rojo"  # Inicialmente en rojo, se cambiará según configuración
+        self.tokens = {"blanco": 0, "rojo": 1}
+
+    def cambiar_estado(self, nuevo_estado):
+        self.estado = nuevo_estado
+
+    def agregar_token(self, estado, cantidad=1):
+        self.tokens[estado] += cantidad
+
+    def quitar_token(self, estado, cantidad=1):
+        if self.tokens[estado] >= cantidad:
+            self.tokens[estado] -= cantidad
+            return True
+        return False
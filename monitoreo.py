@@ -0,0 +1,222 @@
+"""
+Métricas en vivo en formato de texto de Prometheus.
+
+MonitorMetricas sirve GET /metrics en localhost desde un hilo propio con un
+bucle de asyncio. El hilo de la simulación nunca comparte estructuras
+mutables con él: cada paso solo suma a contadores propios, y lo que se
+expone es una Instantanea nueva e inmutable que se publica asignando una
+referencia (atómica en CPython). Los pasos publican como mucho cada
+intervalo segundos de reloj real; además motor.correr publica cada vez que
+vuelve (hibrido.py lo llama en cada paso de la red), así que en una corrida
+sin interfaz la última instantánea es la del reloj en que se detuvo. El
+servidor formatea la última instantánea publicada, así que una lectura
+lenta o un raspado cada segundo no bloquea nunca update_vehicles ni el hilo
+de la interfaz, y no hace falta ningún candado.
+
+    monitor = MonitorMetricas(puerto=9464).iniciar()
+    motor.monitor = monitor      # motor.update_vehicles informa de cada paso
+    ...
+    monitor.cerrar()
+
+    SEMAFOROS_METRICAS=9464 python circulacion.py
+    curl localhost:9464/metrics
+"""
+
+import asyncio
+import bisect
+import threading
+import time
+from collections import namedtuple
+
+from llegadas import APROXIMACIONES
+
+# Límites superiores (s) de las cubetas de los histogramas de latencia
+LIMITES_LATENCIA = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+Instantanea = namedtuple("Instantanea", [
+    "reloj", "activos", "generados", "salidos", "colas", "fase",
+    "fases_suma", "fases_cuenta", "paso", "render",
+])
+
+
+class _Histograma:
+    """Histograma acumulativo de Prometheus; solo lo modifica un hilo."""
+
+    def __init__(self):
+        self.cubetas = [0] * (len(LIMITES_LATENCIA) + 1)
+        self.suma = 0.0
+
+    def observar(self, valor):
+        self.cubetas[bisect.bisect_left(LIMITES_LATENCIA, valor)] += 1
+        self.suma += valor
+
+    def copia(self):
+        return tuple(self.cubetas), self.suma
+
+
+class MonitorMetricas:
+    def __init__(self, anfitrion="127.0.0.1", puerto=9464, intervalo=0.5):
+        """
+        anfitrion, puerto: dirección de escucha (puerto 0 elige uno libre).
+        intervalo: segundos de reloj real entre las instantáneas que publican
+            los pasos (motor.correr publica además al volver).
+        """
+        self.anfitrion = anfitrion
+        self.puerto = puerto
+        self.intervalo = intervalo
+
+        # Estado del hilo de la simulación
+        self._paso = _Histograma()
+        self._render = _Histograma()
+        self._fase = None
+        self._inicio_fase = 0.0
+        self._fases_suma = {}
+        self._fases_cuenta = {}
+        self._proxima = 0.0
+
+        # Última instantánea publicada: lo único que lee el servidor
+        self.instantanea = None
+        self.raspados = 0
+
+        self._hilo = None
+        self._bucle = None
+        self._detener = None
+
+    def observar_paso(self, motor, segundos):
+        """Anota la duración de un paso de update_vehicles (hilo de la simulación)."""
+        self._paso.observar(segundos)
+        if motor.estado_actual != self._fase:
+            if self._fase is not None:
+                duracion = motor.reloj - self._inicio_fase
+                self._fases_suma[self._fase] = self._fases_suma.get(self._fase, 0.0) + duracion
+                self._fases_cuenta[self._fase] = self._fases_cuenta.get(self._fase, 0) + 1
+            self._fase = motor.estado_actual
+            self._inicio_fase = motor.reloj
+
+        ahora = time.monotonic()
+        if ahora >= self._proxima:
+            self._proxima = ahora + self.intervalo
+            self.publicar(motor)
+
+    def observar_render(self, segundos):
+        """Anota la duración de un redibujado de la escena."""
+        self._render.observar(segundos)
+
+    def publicar(self, motor):
+        """Construye una instantánea nueva y la publica con una asignación."""
+        colas = dict.fromkeys(APROXIMACIONES, 0)
+        for vehicle in motor.vehicles:
+            if vehicle.detenido and not vehicle.in_intersection:
+                colas[vehicle.lane] += 1
+        self.instantanea = Instantanea(
+            reloj=motor.reloj,
+            activos=len(motor.vehicles),
+            generados=motor.total_generados,
+            salidos=motor.total_salidos,
+            colas=colas,
+            fase=motor.estado_actual,
+            fases_suma=dict(self._fases_suma),
+            fases_cuenta=dict(self._fases_cuenta),
+            paso=self._paso.copia(),
+            render=self._render.copia(),
+        )
+
+    # === Servidor ===
+
+    def iniciar(self):
+        """Arranca el servidor en un hilo de fondo y espera a que escuche."""
+        listo = threading.Event()
+        self._hilo = threading.Thread(target=self._correr, args=(listo,), name="monitor-metricas", daemon=True)
+        self._hilo.start()
+        listo.wait()
+        return self
+
+    def _correr(self, listo):
+        asyncio.run(self._servir(listo))
+
+    async def _servir(self, listo):
+        self._bucle = asyncio.get_running_loop()
+        self._detener = asyncio.Event()
+        servidor = await asyncio.start_server(self._atender, self.anfitrion, self.puerto)
+        self.puerto = servidor.sockets[0].getsockname()[1]
+        listo.set()
+        async with servidor:
+            await self._detener.wait()
+
+    async def _atender(self, lector, escritor):
+        try:
+            peticion = await asyncio.wait_for(lector.readuntil(b"\r\n\r\n"), timeout=5)
+            partes = peticion.split(b" ", 2)
+            if len(partes) > 1 and partes[1].split(b"?")[0] == b"/metrics":
+                self.raspados += 1
+                cuerpo = formatear(self.instantanea).encode("utf-8")
+                estado = b"200 OK"
+            else:
+                cuerpo = b"Solo /metrics\n"
+                estado = b"404 Not Found"
+            escritor.write(b"HTTP/1.1 " + estado + b"\r\n"
+                           b"Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                           b"Content-Length: " + str(len(cuerpo)).encode() + b"\r\n"
+                           b"Connection: close\r\n\r\n" + cuerpo)
+            await escritor.drain()
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            escritor.close()
+
+    def cerrar(self):
+        """Detiene el servidor y espera a su hilo."""
+        if self._hilo is None:
+            return
+        self._bucle.call_soon_threadsafe(self._detener.set)
+        self._hilo.join()
+        self._hilo = None
+
+
+def _histograma(lineas, nombre, ayuda, valores):
+    cubetas, suma = valores
+    lineas.append(f"# HELP {nombre} {ayuda}")
+    lineas.append(f"# TYPE {nombre} histogram")
+    acumulado = 0
+    for limite, n in zip(LIMITES_LATENCIA + ("+Inf",), cubetas):
+        acumulado += n
+        lineas.append(f'{nombre}_bucket{{le="{limite}"}} {acumulado}')
+    lineas.append(f"{nombre}_sum {suma}")
+    lineas.append(f"{nombre}_count {acumulado}")
+
+
+def formatear(instantanea):
+    """Texto de exposición de Prometheus para una instantánea (o vacío si aún no hay)."""
+    if instantanea is None:
+        return ""
+    i = instantanea
+    lineas = [
+        "# HELP semaforos_reloj_segundos Reloj de la simulación.",
+        "# TYPE semaforos_reloj_segundos gauge",
+        f"semaforos_reloj_segundos {i.reloj}",
+        "# HELP semaforos_vehiculos_activos Vehículos circulando.",
+        "# TYPE semaforos_vehiculos_activos gauge",
+        f"semaforos_vehiculos_activos {i.activos}",
+        "# HELP semaforos_vehiculos_generados_total Vehículos creados.",
+        "# TYPE semaforos_vehiculos_generados_total counter",
+        f"semaforos_vehiculos_generados_total {i.generados}",
+        "# HELP semaforos_vehiculos_salidos_total Vehículos que terminaron su ruta.",
+        "# TYPE semaforos_vehiculos_salidos_total counter",
+        f"semaforos_vehiculos_salidos_total {i.salidos}",
+        "# HELP semaforos_cola_vehiculos Vehículos detenidos por aproximación.",
+        "# TYPE semaforos_cola_vehiculos gauge",
+    ]
+    lineas += [f'semaforos_cola_vehiculos{{aproximacion="{a}"}} {n}' for a, n in i.colas.items()]
+    lineas += [
+        "# HELP semaforos_fase_actual Fase activa del ciclo (1 en la actual).",
+        "# TYPE semaforos_fase_actual gauge",
+        f'semaforos_fase_actual{{fase="{i.fase}"}} 1',
+        "# HELP semaforos_fase_duracion_segundos Duración de las fases terminadas.",
+        "# TYPE semaforos_fase_duracion_segundos summary",
+    ]
+    for fase in sorted(i.fases_cuenta):
+        lineas.append(f'semaforos_fase_duracion_segundos_sum{{fase="{fase}"}} {i.fases_suma[fase]}')
+        lineas.append(f'semaforos_fase_duracion_segundos_count{{fase="{fase}"}} {i.fases_cuenta[fase]}')
+    _histograma(lineas, "semaforos_paso_segundos", "Duración de cada paso de update_vehicles.", i.paso)
+    _histograma(lineas, "semaforos_render_segundos", "Duración de cada redibujado de la escena.", i.render)
+    return "\n".join(lineas) + "\n"
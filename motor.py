@@ -0,0 +1,518 @@
+"""
+Motor de simulación sin interfaz gráfica.
+
+Contiene todo el estado de la intersección (flota, llegadas y, heredados
+de senales.CruceSenalizado, semáforos, priorización y ciclo de la red de
+Petri) y no importa Qt, así que los
+scripts de simulación por lotes arrancan rápido y no necesitan PyQt6. La
+ventana de circulacion.py crea un MotorSimulacion y solo se encarga de
+dibujarlo y de llamar a sus métodos desde los temporizadores.
+
+    motor = MotorSimulacion(semilla=1)
+    motor.set_auto_traffic(5)
+    motor.correr(600)
+"""
+
+import math
+import sys
+import time
+
+import numpy as np
+
+from aleatorio import FlujosAleatorios
+from conflictos import CELDAS_POR_LADO, RejillaConflictos
+from demanda import DIA, PerfilDemanda
+from flota import FlotaVehiculos
+from llegadas import APROXIMACIONES, generar_programa
+from metricas import MetricasEnLinea
+from modelo import Vehicle
+from preempcion import Preempcion
+from senales import CruceSenalizado
+
+# Segundos de llegadas que se precalculan cada vez que se agota el programa
+HORIZONTE_LLEGADAS = 3600
+
+# Periodos de los temporizadores de la interfaz (s): movimiento de vehículos,
+# análisis de tráfico y ciclo de semáforos a velocidad 1x
+PASO_VEHICULOS = 0.05
+PERIODO_ANALISIS = 3.0
+PERIODO_FASE = 1.5
+
+# Zona de detección antes de la línea de parada (% del carril de entrada)
+DETECTOR = (20, 48)
+
+
+class MotorSimulacion(CruceSenalizado):
+    def __init__(self, semilla=None, registro=None):
+        # Flujos aleatorios reproducibles derivados de una semilla maestra
+        self.flujos = FlujosAleatorios(semilla)
+
+        # Velocidad de simulación
+        self.simulation_speed = 1.0
+
+        # Llegadas automáticas precalculadas
+        self.programa_llegadas = None
+        self.tasa_llegadas = 0.0
+        self.proceso_llegadas = "poisson"
+        self.fin_programa_llegadas = 0.0
+
+        # Perfil de demanda diario (si se carga uno sustituye a la densidad fija)
+        self.perfil_demanda = None
+        self.hora_inicio_perfil = 7
+
+        # Inicialización de vehículos (flota con registros reutilizables)
+        self.vehicles = FlotaVehiculos(Vehicle)
+
+        # Zonas de conflicto dentro de la intersección (tabla de reservas)
+        self.conflictos = RejillaConflictos()
+
+        # Carriles por aproximación: None es un carril por aproximación sin
+        # colas; una carriles.ConfiguracionCarriles activa varios carriles
+        self.carriles = None
+        self.colas = None
+
+        # Lista opcional donde se anotan las salidas (lane, destination), para
+        # acoplar el motor con otro modelo (hibrido.py)
+        self.salidas = None
+
+        # Demora, paradas y colas agregadas en línea
+        self.metricas = MetricasEnLinea()
+
+        # Monitor opcional de métricas en vivo (monitoreo.MonitorMetricas)
+        self.monitor = None
+
+        # Vehículos de emergencia activos, los únicos que revisa la preempción
+        self.emergencias = []
+
+        # Semáforos, ciclo de fases y estado inicial (llama a reiniciar())
+        super().__init__(registro)
+
+        # Preempción atendida en cada paso de vehículos (None la desactiva)
+        self.preempcion = Preempcion()
+
+    def reiniciar(self):
+        """
+        Vuelve la simulación a su estado inicial: sin vehículos, sin tráfico
+        automático, Sur en verde y flujos aleatorios desde el principio.
+        """
+        # Limpiar vehículos
+        self.vehicles.clear()
+        self.emergencias.clear()
+        self.conflictos.limpiar()
+        if self.carriles is not None:
+            self.colas = np.zeros(len(self.carriles), dtype=np.intp)
+        self.total_generados = 0
+        self.total_salidos = 0
+        self.intersection_stats = {}
+        self.metricas.reiniciar()
+
+        # Detener tráfico automático y reiniciar el reloj y los flujos aleatorios
+        self.set_auto_traffic(0)
+        self.reloj = 0.0
+        self.flujos.reiniciar()
+
+        # Próximos disparos de los temporizadores de correr()
+        self.proximo_analisis = PERIODO_ANALISIS
+        self.proxima_fase = PERIODO_FASE / self.simulation_speed
+        if self.preempcion is not None:
+            self.preempcion.reiniciar()
+
+        super().reiniciar()
+
+    def demanda_movimientos(self):
+        """
+        Vehículos en la zona de detección de cada movimiento que aún no
+        entraron en la caja del cruce.
+        """
+        conteo = {}
+        for vehicle in self.vehicles:
+            if vehicle.reserva is None and DETECTOR[0] <= vehicle.avance <= DETECTOR[1]:
+                clave = (vehicle.lane, "izquierda" if vehicle.ruta.giro == "izquierda" else "recto")
+                conteo[clave] = conteo.get(clave, 0) + 1
+        return conteo
+
+    def usar_carriles(self, config):
+        """
+        Activa una configuración de carriles (None vuelve a un carril por
+        aproximación). Vacía la intersección: los vehículos existentes tienen
+        rutas de la geometría anterior. Con más carriles la rejilla de
+        conflictos se hace más fina para que carriles vecinos no compartan celdas.
+        """
+        self.vehicles.clear()
+        self.emergencias.clear()
+        self.carriles = config
+        celdas = CELDAS_POR_LADO
+        if config is not None:
+            celdas = max(CELDAS_POR_LADO, 2 * config.max_carriles())
+            self.colas = np.zeros(len(config), dtype=np.intp)
+        else:
+            self.colas = None
+        self.conflictos = RejillaConflictos(filas=celdas, columnas=celdas,
+                                            giro_en_rojo=self.conflictos.giro_en_rojo)
+
+    def _limitar_colas(self):
+        """
+        Calcula de una vez, con arreglos, el vehículo de delante de cada
+        vehículo en su carril y las colas por carril.
+        """
+        vehiculos = list(self.vehicles)
+        if not vehiculos:
+            self.colas[:] = 0
+            return
+        distancias = [v.distancia for v in vehiculos]
+        carriles = [v.indice_carril for v in vehiculos]
+        limites, self.colas = self.carriles.colas(distancias, carriles)
+        for vehicle, limite in zip(vehiculos, limites.tolist()):
+            vehicle.limite_cola = limite
+
+    def correr(self, duracion):
+        """
+        Avanza la simulación duracion segundos sin interfaz, reproduciendo los
+        temporizadores de la ventana: vehículos cada PASO_VEHICULOS, análisis
+        cada PERIODO_ANALISIS y ciclo de semáforos cada PERIODO_FASE / velocidad.
+        Los temporizadores siguen entre llamadas, así que correr() a trozos
+        (p. ej. de 1 s en hibrido.py) avanza el ciclo igual que de una vez.
+        """
+        # Margen para que la suma de pasos de 0.05 s no añada un paso de más
+        fin = self.reloj + duracion - 1e-9
+        # Los temporizadores acumulan su propio error de redondeo (más de 1e-9
+        # pasada media hora simulada); vencen en el paso más cercano, así que
+        # entorno.py recibe exactamente un paso del controlador por step()
+        margen = PASO_VEHICULOS / 2
+
+        while self.reloj < fin:
+            self.update_vehicles(PASO_VEHICULOS)
+            if self.reloj >= self.proximo_analisis - margen:
+                self.analyze_traffic_load()
+                self.proximo_analisis += PERIODO_ANALISIS
+            if self.reloj >= self.proxima_fase - margen:
+                self.actualizar_simulacion()
+                self.proxima_fase += PERIODO_FASE / self.simulation_speed
+
+        # Sin interfaz, un trozo corto puede acabar antes del siguiente
+        # intervalo del monitor; se publica el estado en que queda el motor
+        if self.monitor is not None:
+            self.monitor.publicar(self)
+
+    def correr_por_intervalos(self, duracion, intervalo):
+        """
+        Avanza duracion segundos en trozos de intervalo y cede el control
+        después de cada uno (p. ej. para capturar un cuadro):
+
+            for _ in motor.correr_por_intervalos(3600, 1.0):
+                exportador.capturar(motor)
+
+        El número de trozos se fija al empezar y cada uno avanza hasta su
+        instante objetivo, así que el redondeo del reloj no añade trozos vacíos.
+        """
+        inicio = self.reloj
+        trozos = max(1, math.ceil(duracion / intervalo - 1e-9))
+        for k in range(1, trozos + 1):
+            self.correr(inicio + min(k * intervalo, duracion) - self.reloj)
+            yield
+
+    def update_vehicles(self, dt=0.05):
+        """
+        Actualiza la posición de todos los vehículos y maneja la eliminación de los
+        que salen de la pantalla. Devuelve los vehículos retirados en este paso.
+        """
+        if self.monitor is not None:
+            inicio = time.perf_counter()
+
+        # Incorporar las llegadas automáticas vencidas en este paso
+        self.consumir_llegadas(dt)
+        if self.carriles is not None:
+            self._limitar_colas()
+
+        vehicles_to_remove = []
+
+        # Variable para rastrear si hay vehículos en la intersección
+        vehicles_in_intersection = {}
+        detenidos = dict.fromkeys(APROXIMACIONES, 0)
+
+        for vehicle in self.vehicles:
+            # Actualizar posición considerando semáforos e intersección
+            # Los vehículos dentro de la caja tienen sus celdas reservadas, así
+            # que nunca quedan bloqueados en ella
+            vehicle.update_position(self.simulation_speed, self.semaforos_vehiculares, self.conflictos, dt)
+
+            # Registrar vehículos en la intersección y la fase con que entraron
+            if vehicle.in_intersection:
+                vehicles_in_intersection[vehicle.lane] = vehicles_in_intersection.get(vehicle.lane, 0) + 1
+                if vehicle.fase is None:
+                    vehicle.fase = self.estado_actual
+            elif vehicle.detenido:
+                detenidos[vehicle.lane] += 1
+
+            # Verificar si el vehículo terminó su ruta (salió de la pantalla)
+            if vehicle.has_left_route():
+                vehicles_to_remove.append(vehicle)
+
+        # Eliminar vehículos que han salido de la pantalla (O(1) por vehículo)
+        for vehicle in vehicles_to_remove:
+            self.conflictos.liberar(vehicle)
+            if self.vehicles.liberar(vehicle):
+                self.total_salidos += 1
+                self.metricas.registrar_salida(vehicle, self.reloj)
+                if vehicle.emergencia:
+                    self.emergencias.remove(vehicle)
+                if self.salidas is not None:
+                    self.salidas.append((vehicle.lane, vehicle.destination))
+                # Disminuir contador de tráfico
+                if vehicle.lane in self.traffic_counts:
+                    self.traffic_counts[vehicle.lane] = max(0, self.traffic_counts[vehicle.lane] - 1)
+
+        # Estadísticas de intersección y contadores de tráfico cercanos
+        self.metricas.registrar_colas(detenidos, dt)
+        self.intersection_stats = vehicles_in_intersection
+        self.contar_vehiculos_cercanos()
+
+        # Camino rápido de la preempción: no espera al temporizador de fase
+        if self.preempcion is not None and (self.emergencias or self.preempcion.ocupada):
+            self.preempcion.actualizar(self, sum(detenidos.values()))
+
+        if self.monitor is not None:
+            self.monitor.observar_paso(self, time.perf_counter() - inicio)
+        return vehicles_to_remove
+
+    def add_vehicle(self, lane, destination=None, emergencia=False):
+        """
+        Añade un vehículo en el carril especificado con un destino opcional.
+        Si no se especifica destino, se asigna uno por defecto (movimiento recto).
+        Un vehículo de emergencia pide preempción al acercarse al cruce.
+        """
+        # Con varios carriles se elige el de menor cola que admite el movimiento
+        opciones = {}
+        if self.carriles is not None:
+            destino = destination or self._get_opposite_direction(lane)
+            k = self.carriles.asignar(lane, destino, self.colas)
+            opciones = {"ruta": self.carriles.rutas[(lane, destino, k)],
+                        "carril": self.carriles.indice[(lane, k)]}
+
+        # Determinar posición inicial según el carril
+        vehicle = None
+        if lane == "Norte":
+            vehicle = self.vehicles.crear("Norte", 0, destination, **opciones)
+        elif lane == "Sur":
+            vehicle = self.vehicles.crear("Sur", 100, destination, **opciones)
+        elif lane == "Este":
+            vehicle = self.vehicles.crear("Este", 0, destination, **opciones)
+        elif lane == "Oeste":
+            vehicle = self.vehicles.crear("Oeste", 100, destination, **opciones)
+        if vehicle is not None:
+            vehicle.id_vehiculo = self.total_generados
+            vehicle.t_aparicion = self.reloj
+            vehicle.emergencia = emergencia
+            if emergencia:
+                self.emergencias.append(vehicle)
+        if self.colas is not None and vehicle is not None:
+            # Cuenta ya en la cola para que las llegadas del mismo paso se repartan
+            self.colas[vehicle.indice_carril] += 1
+
+        # Actualizar contadores de tráfico
+        self.traffic_counts[lane] += 1
+        self.total_generados += 1
+
+        return vehicle
+
+    def set_auto_traffic(self, value):
+        """
+        Configura la generación automática de tráfico según la densidad especificada.
+        Cada unidad de densidad equivale a un vehículo cada 5 s repartido entre
+        las cuatro aproximaciones.
+        """
+        # La densidad fija sustituye a cualquier perfil cargado
+        self.perfil_demanda = None
+
+        if value > 0:
+            # Iniciar generación automática de tráfico
+            self.tasa_llegadas = value / 5.0  # Más densidad = intervalos más cortos
+            self.programar_llegadas()
+        else:
+            # Detener generación automática
+            self.tasa_llegadas = 0.0
+            self.programa_llegadas = None
+
+    def usar_perfil_demanda(self, perfil, hora_inicio=7):
+        """
+        Activa un perfil de demanda; el reloj actual corresponde a hora_inicio.
+        """
+        self.tasa_llegadas = 0.0
+        self.perfil_demanda = perfil
+        self.hora_inicio_perfil = hora_inicio - self.reloj / 3600
+        self.programar_llegadas()
+
+    def programar_llegadas(self):
+        """
+        Precalcula en bloque las llegadas de las próximas HORIZONTE_LLEGADAS
+        segundos a partir del reloj actual.
+        """
+        if self.perfil_demanda is not None:
+            # Ventana del día que corresponde al reloj, sin pasar de medianoche
+            segundo_dia = (self.hora_inicio_perfil * 3600 + self.reloj) % DIA
+            hasta = min(DIA, segundo_dia + HORIZONTE_LLEGADAS)
+            self.programa_llegadas = self.perfil_demanda.programa(
+                desde=segundo_dia, hasta=hasta, inicio=self.reloj, flujos=self.flujos)
+            self.fin_programa_llegadas = self.reloj + (hasta - segundo_dia)
+            return
+
+        tasa_por_aproximacion = self.tasa_llegadas / len(APROXIMACIONES)
+        self.programa_llegadas = generar_programa(
+            {aproximacion: tasa_por_aproximacion for aproximacion in APROXIMACIONES},
+            HORIZONTE_LLEGADAS,
+            proceso=self.proceso_llegadas,
+            inicio=self.reloj,
+            flujos=self.flujos,
+        )
+        self.fin_programa_llegadas = self.reloj + HORIZONTE_LLEGADAS
+
+    def consumir_llegadas(self, dt):
+        """
+        Avanza el reloj de llegadas dt segundos y crea los vehículos vencidos.
+        """
+        self.reloj += dt
+        if self.programa_llegadas is None:
+            return
+
+        origenes, destinos = self.programa_llegadas.extraer_hasta(self.reloj)
+        for origen, destino in zip(origenes.tolist(), destinos.tolist()):
+            self.add_vehicle(APROXIMACIONES[origen], APROXIMACIONES[destino])
+
+        # Renovar el programa cuando se alcanza su horizonte
+        if self.reloj >= self.fin_programa_llegadas:
+            self.programar_llegadas()
+
+    def generate_traffic(self):
+        """
+        Genera tráfico con patrones origen-destino realistas.
+        Los vehículos pueden ir recto, girar a la izquierda o a la derecha.
+        """
+        # Flujo propio para el tráfico manual: no altera las llegadas automáticas
+        rng = self.flujos.flujo("manual")
+
+        # Definimos todas las combinaciones origen-destino válidas
+        traffic_patterns = {
+            # Desde Norte
+            "Norte": ["Sur", "Este", "Oeste"],  # Recto, derecha, izquierda
+            # Desde Sur
+            "Sur": ["Norte", "Este", "Oeste"],  # Recto, izquierda, derecha
+            # Desde Este
+            "Este": ["Oeste", "Norte", "Sur"],  # Recto, izquierda, derecha
+            # Desde Oeste
+            "Oeste": ["Este", "Norte", "Sur"]   # Recto, derecha, izquierda
+        }
+
+        # Seleccionar un origen aleatorio
+        origins = list(traffic_patterns.keys())
+        origin = origins[rng.integers(len(origins))]
+        
+        # Pesos diferentes para favorecer movimiento recto vs. giros
+        weights = []
+        for dest in traffic_patterns[origin]:
+            if dest == self._get_opposite_direction(origin):  # Es el destino recto
+                weights.append(0.6)  # 60% probabilidad para movimiento recto
+            else:
+                weights.append(0.2)  # 20% probabilidad para cada giro
+        
+        # Seleccionar destino basado en pesos
+        destination = traffic_patterns[origin][rng.choice(len(weights), p=weights)]
+        
+        self.registro.evento("vehiculo_generado", nivel="debug", origen=origin, destino=destination)
+        
+        # Crear vehículo con posición y destino
+        self.add_vehicle(origin, destination)
+
+    def _get_opposite_direction(self, direction):
+        """Helper para obtener la dirección opuesta (para movimiento recto)"""
+        opposites = {
+            "Norte": "Sur",
+            "Sur": "Norte",
+            "Este": "Oeste",
+            "Oeste": "Este"
+        }
+        return opposites.get(direction)
+
+    def contar_vehiculos_cercanos(self):
+        # Actualizar contadores de tráfico para cada carril
+        # Reiniciar contadores
+        prev_counts = self.traffic_counts.copy()
+        self.traffic_counts = {
+            "Norte": 0,
+            "Sur": 0,
+            "Este": 0,
+            "Oeste": 0
+        }
+
+        # Contar vehículos cerca del cruce (área de influencia)
+        for vehicle in self.vehicles:
+            is_near = False
+            if vehicle.lane == "Norte" and 30 <= vehicle.position <= 70:
+                self.traffic_counts["Norte"] += 1
+                is_near = True
+            elif vehicle.lane == "Sur" and 30 <= vehicle.position <= 70:
+                self.traffic_counts["Sur"] += 1
+                is_near = True
+            elif vehicle.lane == "Este" and 30 <= vehicle.position <= 70:
+                self.traffic_counts["Este"] += 1
+                is_near = True
+            elif vehicle.lane == "Oeste" and 30 <= vehicle.position <= 70:
+                self.traffic_counts["Oeste"] += 1
+                is_near = True
+
+        # Actualizar historial para análisis de tendencias
+        for direction in self.traffic_counts:
+            self.traffic_history[direction].append(self.traffic_counts[direction])
+            # Mantener solo los últimos 10 valores para análisis
+            if len(self.traffic_history[direction]) > 10:
+                self.traffic_history[direction].pop(0)
+
+    def posiciones_vehiculos(self):
+        """
+        Posición de toda la flota como arreglos (x, y, angulo, color) para
+        dibujarla de una vez. color es 0 recto, 1 giro hacia Norte/Sur, 2
+        giro hacia Este/Oeste y 3 emergencia, como en
+        Vehicle.get_color_based_on_destination().
+        Las posiciones se interpolan por ruta con Ruta.posiciones().
+        """
+        vehiculos = list(self.vehicles)
+        n = len(vehiculos)
+        x = np.empty(n)
+        y = np.empty(n)
+        angulo = np.empty(n)
+        color = np.array([3 if v.emergencia else 0 if not v.turning
+                          else 1 if v.destination in ("Norte", "Sur") else 2
+                          for v in vehiculos], dtype=np.int8)
+        distancias = np.array([v.distancia for v in vehiculos])
+
+        por_ruta = {}
+        for i, vehicle in enumerate(vehiculos):
+            por_ruta.setdefault(vehicle.ruta, []).append(i)
+        for ruta, indices in por_ruta.items():
+            x[indices], y[indices], angulo[indices] = ruta.posiciones(distancias[indices])
+        return x, y, angulo, color
+
+
+def main():
+    """Corre un perfil de demanda sin interfaz y muestra un resumen."""
+    if len(sys.argv) < 3:
+        print("Uso: python motor.py perfil.json horas [semilla] [hora_inicio]")
+        return
+
+    semilla = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    hora_inicio = int(sys.argv[4]) if len(sys.argv) > 4 else 0
+
+    motor = MotorSimulacion(semilla)
+    motor.usar_perfil_demanda(PerfilDemanda.cargar(sys.argv[1]), hora_inicio)
+    inicio = time.perf_counter()
+    motor.correr(float(sys.argv[2]) * 3600)
+    duracion = time.perf_counter() - inicio
+
+    print(f"Simulado: {sys.argv[2]} h en {duracion:.1f} s (semilla {motor.flujos.semilla})")
+    print(f"Vehículos generados: {motor.total_generados}, salidos: {motor.total_salidos}, "
+          f"activos: {len(motor.vehicles)}")
+    print()
+    print(motor.metricas.informe())
+
+
+if __name__ == "__main__":
+    main()
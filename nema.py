@@ -0,0 +1,334 @@
+"""
+Controlador de doble anillo con barreras (NEMA).
+
+El ciclo de la red de Petri de motor.py da verde a una sola aproximación
+cada vez (Sur → Oeste → Norte → Este). Este controlador sirve a la vez los
+movimientos compatibles con la numeración NEMA habitual:
+
+    Anillo 1:  φ1 Sur izq   φ2 Norte recto  ║  φ3 Oeste izq  φ4 Este recto
+    Anillo 2:  φ5 Norte izq φ6 Sur recto    ║  φ7 Este izq   φ8 Oeste recto
+
+Cada anillo avanza por sus fases de forma independiente dentro del grupo de
+la barrera; para cruzar la barrera ambos anillos deben terminar y pasan por
+amarillo a la vez. Las fases de giro solo se sirven si hay vehículos
+esperando y los verdes se extienden hasta verde_maximo mientras haya demanda
+(control actuado). Los movimientos rectos incluyen el giro a la derecha; los
+giros a la izquierda usan la flecha del SemaforoVehicular de su aproximación
+y, fuera de su fase protegida, pueden girar de forma permisiva con el verde
+del recto si la rejilla de conflictos lo permite.
+
+Las superposiciones (overlaps) son movimientos que reciben flecha verde
+mientras alguna de sus fases padre está en verde.
+
+    motor.usar_controlador(ControladorNEMA())
+
+La ganancia es de capacidad: con un carril por aproximación sin colas
+(motor sin carriles) los vehículos no se siguen y el cruce no se satura, así
+que ambos controladores sacan los mismos vehículos y el ciclo fijo tiene
+algo menos de demora. La comparación usa por defecto carriles.py (un carril
+y bahía de giro a la izquierda), donde el ciclo fijo se satura antes.
+
+    python nema.py [horas] [semilla] [densidad] [carriles]   # carriles 0: sin colas
+"""
+
+import sys
+import time
+
+# Fase -> (aproximación, movimiento). "recto" incluye el giro a la derecha.
+FASES_NEMA = {
+    1: ("Sur", "izquierda"),
+    2: ("Norte", "recto"),
+    3: ("Oeste", "izquierda"),
+    4: ("Este", "recto"),
+    5: ("Norte", "izquierda"),
+    6: ("Sur", "recto"),
+    7: ("Este", "izquierda"),
+    8: ("Oeste", "recto"),
+}
+
+ANILLOS = ((1, 2, 3, 4), (5, 6, 7, 8))
+
+# Grupos separados por las barreras: los anillos solo cambian de grupo juntos
+GRUPOS = ((1, 2, 5, 6), (3, 4, 7, 8))
+
+
+def cambiar_senal(semaforo, estado):
+    """Cambia una señal moviendo también su token de la red de Petri."""
+    if semaforo.estado != estado:
+        semaforo.quitar_token(semaforo.estado)
+        semaforo.agregar_token(estado)
+        semaforo.cambiar_estado(estado)
+
+
+def actualizar_peatonales(motor):
+    """
+    Pasos directos en blanco cuando su aproximación tiene todo en rojo;
+    pasos indirectos en rojo si los cruza algún movimiento en verde.
+    """
+    activos = [d for d, s in motor.semaforos_vehiculares.items()
+               if s.estado == "verde" or "verde" in s.flechas.values()]
+    bloqueados = set()
+    for carril in activos:
+        bloqueados.update(motor.calcular_rutas_vehiculos(carril))
+
+    for semaforo in motor.semaforos_peatonales.values():
+        if semaforo.tipo == "directo":
+            libre = semaforo.carril not in activos
+        else:
+            libre = semaforo.carril not in bloqueados
+        nuevo = "blanco" if libre else "rojo"
+        if semaforo.estado != nuevo:
+            semaforo.quitar_token(semaforo.estado)
+            semaforo.agregar_token(nuevo)
+            semaforo.cambiar_estado(nuevo)
+
+
+class _Anillo:
+    def __init__(self, fases):
+        self.fases = fases
+        self.fase = None
+        self.proxima = None  # Fase elegida al pasar a amarillo dentro del grupo
+        self.intervalo = "rojo"
+        self.ticks = 0
+        self.cruzando = False  # Cruzando la barrera hacia el otro grupo
+
+
+class ControladorNEMA:
+    def __init__(self, fases=None, anillos=ANILLOS, grupos=GRUPOS, verde_minimo=2,
+                 verde_maximo=6, amarillo=1, rojo_despeje=0, superposiciones=None,
+                 recuerdo=(2, 4, 6, 8)):
+        """
+        Los tiempos se cuentan en pasos del ciclo de semáforos (PERIODO_FASE).
+        superposiciones: dict (aproximación, "izquierda" | "derecha") -> fases padre.
+        recuerdo: fases que se sirven aunque no haya demanda (recall).
+        """
+        self.fases = dict(fases or FASES_NEMA)
+        self.anillos = [_Anillo(tuple(f)) for f in anillos]
+        self.grupos = tuple(tuple(g) for g in grupos)
+        self.verde_minimo = verde_minimo
+        self.verde_maximo = verde_maximo
+        self.amarillo = amarillo
+        self.rojo_despeje = rojo_despeje
+        self.superposiciones = dict(superposiciones or {})
+        self.recuerdo = set(recuerdo)
+        self.grupo = 0
+        self._validar()
+
+    def _validar(self):
+        for anillo in self.anillos:
+            for fase in anillo.fases:
+                if fase not in self.fases:
+                    raise ValueError(f"Fase {fase} sin movimiento asignado")
+        for grupo in self.grupos:
+            for anillo in self.anillos:
+                if not any(f in grupo for f in anillo.fases):
+                    raise ValueError(f"El anillo {anillo.fases} no tiene fases en el grupo {grupo}")
+        for (_, giro), padres in self.superposiciones.items():
+            if giro not in ("izquierda", "derecha"):
+                raise ValueError(f"Superposición no válida: {giro}")
+            if any(p not in self.fases for p in padres):
+                raise ValueError(f"Fases padre desconocidas en la superposición: {padres}")
+
+    # === Estado para la red de Petri ===
+
+    @staticmethod
+    def nombre_fase(fase, movimiento):
+        aproximacion, tipo = movimiento
+        return f"φ{fase} {aproximacion} {'izq' if tipo == 'izquierda' else 'recto'}"
+
+    def estado(self):
+        """Nombre del estado conjunto de los anillos, p. ej. 'φ2_verde + φ6_verde'"""
+        return " + ".join(f"φ{a.fase}_{a.intervalo}" for a in self.anillos)
+
+    def estados_activos(self):
+        """Lugares de la red de Petri marcados (fase actual de cada anillo)."""
+        return {self.nombre_fase(a.fase, self.fases[a.fase]) for a in self.anillos}
+
+    def red_petri(self):
+        """
+        Lugares y transiciones para dibujar la red: un anillo exterior y otro
+        interior, con la barrera en el centro.
+        """
+        esquinas = (((100, 150), (100, 550), (620, 550), (620, 150)),
+                    ((250, 250), (250, 450), (470, 450), (470, 250)))
+        estados, transiciones = [], []
+        for anillo, posiciones in zip(self.anillos, esquinas):
+            nombres = [self.nombre_fase(f, self.fases[f]) for f in anillo.fases]
+            for nombre, pos in zip(nombres, posiciones):
+                estados.append({"name": nombre, "pos": pos})
+            for i, fase in enumerate(anillo.fases):
+                siguiente = anillo.fases[(i + 1) % len(anillo.fases)]
+                barrera = self._grupo_de(fase) != self._grupo_de(siguiente)
+                transiciones.append({"from": nombres[i], "to": nombres[(i + 1) % len(nombres)],
+                                     "label": "barrera" if barrera else "tiempo"})
+        return estados, transiciones
+
+    # === Ciclo ===
+
+    def _grupo_de(self, fase):
+        return next(i for i, g in enumerate(self.grupos) if fase in g)
+
+    def demanda(self, motor):
+        """
+        Vehículos esperando cada fase según los detectores del motor
+        (MotorSimulacion o un nodo de ctm.py).
+        """
+        conteo = motor.demanda_movimientos()
+        return {fase: conteo.get(movimiento, 0) for fase, movimiento in self.fases.items()}
+
+    def _siguiente(self, anillo, demanda, grupo):
+        """
+        Próxima fase del anillo dentro del grupo tras la actual (None si debe
+        cruzar la barrera). Se saltan las fases sin demanda ni recuerdo.
+        """
+        fases = anillo.fases
+        for fase in fases[fases.index(anillo.fase) + 1:]:
+            if fase not in self.grupos[grupo]:
+                break
+            if demanda[fase] or fase in self.recuerdo:
+                return fase
+        return None
+
+    def _primera(self, anillo, demanda, grupo):
+        """Primera fase a servir del anillo al entrar en un grupo."""
+        candidatas = [f for f in anillo.fases if f in self.grupos[grupo]]
+        for fase in candidatas:
+            if demanda[fase] or fase in self.recuerdo:
+                return fase
+        return candidatas[-1]
+
+    def iniciar(self, motor):
+        """Arranca en el primer grupo con las fases de recuerdo en verde."""
+        demanda = dict.fromkeys(self.fases, 0)
+        self.grupo = 0
+        for anillo in self.anillos:
+            anillo.fase = self._primera(anillo, demanda, self.grupo)
+            anillo.intervalo = "verde"
+            anillo.ticks = 0
+            anillo.cruzando = False
+        self._aplicar(motor)
+        motor.estado_actual = self.estado()
+        motor.contador = 0
+        motor.mensaje_estado = f"Estado: {self.estado()}"
+        motor.state_history = [motor.estado_actual]
+
+    def actualizar(self, motor):
+        """
+        Avanza un paso del controlador, actualiza las señales del motor y
+        devuelve True si cambió algún intervalo.
+        """
+        demanda = self.demanda(motor)
+        cambio = False
+
+        for anillo in self.anillos:
+            anillo.ticks += 1
+
+        # Fin de verde: pasar a la siguiente fase del grupo o esperar en la barrera
+        listos = []
+        for anillo in self.anillos:
+            if anillo.intervalo != "verde" or anillo.ticks < self.verde_minimo:
+                continue
+            if anillo.ticks >= self.verde_maximo or not demanda[anillo.fase]:
+                listos.append(anillo)
+
+        for anillo in listos:
+            anillo.proxima = self._siguiente(anillo, demanda, self.grupo)
+            if anillo.proxima is not None:
+                anillo.intervalo, anillo.ticks = "amarillo", 0
+                cambio = True
+
+        # Cruce de barrera: todos los anillos terminan a la vez
+        en_barrera = [a for a in listos if a.intervalo == "verde"]
+        if len(en_barrera) == len(self.anillos):
+            for anillo in self.anillos:
+                anillo.intervalo, anillo.ticks, anillo.cruzando = "amarillo", 0, True
+            cambio = True
+
+        for anillo in self.anillos:
+            if anillo.intervalo == "amarillo" and anillo.ticks >= self.amarillo:
+                anillo.intervalo, anillo.ticks = "rojo", 0
+                cambio = True
+
+        # Despeje terminado: arrancar la siguiente fase
+        cruzan = [a for a in self.anillos if a.cruzando]
+        if cruzan and all(a.intervalo == "rojo" and a.ticks >= self.rojo_despeje for a in cruzan):
+            self.grupo = (self.grupo + 1) % len(self.grupos)
+            for anillo in cruzan:
+                anillo.fase = self._primera(anillo, demanda, self.grupo)
+                anillo.intervalo, anillo.ticks, anillo.cruzando = "verde", 0, False
+            cambio = True
+        for anillo in self.anillos:
+            if (not anillo.cruzando and anillo.intervalo == "rojo"
+                    and anillo.ticks >= self.rojo_despeje):
+                anillo.fase, anillo.proxima = anillo.proxima, None
+                anillo.intervalo, anillo.ticks = "verde", 0
+                cambio = True
+
+        self._aplicar(motor)
+
+        estado = self.estado()
+        motor.contador = max(a.ticks for a in self.anillos)
+        if estado != motor.estado_actual:
+            motor.mensaje_estado = f"Estado: {estado}"
+            motor.estado_actual = estado
+            motor.state_history.append(estado)
+        return cambio
+
+    def terminar_amarillo(self, motor):
+        """Pasa a rojo (con su despeje por delante) los anillos en amarillo."""
+        for anillo in self.anillos:
+            if anillo.intervalo == "amarillo":
+                anillo.intervalo, anillo.ticks = "rojo", 0
+        self._aplicar(motor)
+
+    # === Señales ===
+
+    def _aplicar(self, motor):
+        """Traduce el estado de los anillos a los semáforos del motor."""
+        recto = dict.fromkeys(motor.semaforos_vehiculares, "rojo")
+        izquierda = dict.fromkeys(motor.semaforos_vehiculares, "rojo")
+        verdes = set()
+        for anillo in self.anillos:
+            aproximacion, tipo = self.fases[anillo.fase]
+            (izquierda if tipo == "izquierda" else recto)[aproximacion] = anillo.intervalo
+            if anillo.intervalo == "verde":
+                verdes.add(anillo.fase)
+
+        for direccion, semaforo in motor.semaforos_vehiculares.items():
+            cambiar_senal(semaforo, recto[direccion])
+            semaforo.flechas["izquierda"] = izquierda[direccion]
+            semaforo.flechas["derecha"] = "rojo"
+        for (aproximacion, giro), padres in self.superposiciones.items():
+            if verdes.intersection(padres):
+                motor.semaforos_vehiculares[aproximacion].flechas[giro] = "verde"
+
+        actualizar_peatonales(motor)
+
+
+def main():
+    """Compara el ciclo fijo con el controlador NEMA con las mismas llegadas."""
+    from carriles import configuracion_uniforme
+    from motor import MotorSimulacion
+
+    horas = float(sys.argv[1]) if len(sys.argv) > 1 else 0.25
+    semilla = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    densidad = float(sys.argv[3]) if len(sys.argv) > 3 else 10
+    carriles = int(sys.argv[4]) if len(sys.argv) > 4 else 1
+
+    for nombre, controlador in (("Ciclo fijo", None), ("NEMA doble anillo", ControladorNEMA())):
+        motor = MotorSimulacion(semilla)
+        if carriles:
+            motor.usar_carriles(configuracion_uniforme(carriles, bahia_izquierda=120))
+        motor.usar_controlador(controlador)
+        motor.set_auto_traffic(densidad)
+        inicio = time.perf_counter()
+        motor.correr(horas * 3600)
+        duracion = time.perf_counter() - inicio
+        total = motor.metricas.resumen()["total"]
+        print(f"{nombre:18s} generados {motor.total_generados:6d}  salidos {motor.total_salidos:6d}  "
+              f"en cola {len(motor.vehicles):5d}  demora media {total['demora_media']:5.1f} s  "
+              f"p95 {total['demora_p95']:5.1f} s  ({duracion:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,8 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtCore import Qt, QTimer, QRectF, QPointF
 from PyQt6.QtGui import QBrush, QPen, QColor, QFont, QPainter, QPolygonF
 
+from redibujo import PlanificadorRedibujo
+
 # Clase Vehicle mejorada con mejor gestión de la intersección
 class Vehicle:
     def __init__(self, lane, position, destination=None):
@@ -161,7 +163,7 @@ def update_vehicles(self):
 
     # Actualizar visualización si hay cambios
     if vehicles_to_remove or self.vehicles:
-        self.dibujar_cruce()
+        self.redibujo.pedir(self.dibujar_cruce)
 
     # Visualizar estadísticas de intersección
     self.intersection_stats = vehicles_in_intersection
@@ -369,6 +371,9 @@ class SimuladorSemaforos(QMainWindow):
         # Historial de estados para Petri Net
         self.state_history = ["Sur_verde"]
 
+        # Los redibujados se agrupan en uno por cuadro de pantalla
+        self.redibujo = PlanificadorRedibujo(self)
+
         # Configurar la interfaz gráfica
         self.setup_ui()
 
@@ -523,8 +528,8 @@ class SimuladorSemaforos(QMainWindow):
         main_layout.addWidget(self.tabs)
 
         # Dibujar el cruce inicial
-        self.dibujar_cruce()
-        self.dibujar_petri_net()
+        self.redibujo.pedir(self.dibujar_cruce)
+        self.redibujo.pedir(self.dibujar_petri_net)
 
         # Configurar timer para auto-tráfico
         self.traffic_timer = QTimer(self)
@@ -585,7 +590,7 @@ class SimuladorSemaforos(QMainWindow):
         self.traffic_counts[lane] += 1
 
         # Actualizar visualización
-        self.dibujar_cruce()
+        self.redibujo.pedir(self.dibujar_cruce)
 
     def dibujar_vehiculos(self):
         """
@@ -722,7 +727,7 @@ class SimuladorSemaforos(QMainWindow):
 
         # Actualizar visualización si hay cambios
         if vehicles_to_remove or self.vehicles:
-            self.dibujar_cruce()
+            self.redibujo.pedir(self.dibujar_cruce)
 
         # Almacenar estadísticas de intersección
         self.intersection_stats = vehicles_in_intersection
@@ -788,7 +793,7 @@ class SimuladorSemaforos(QMainWindow):
         msg_timer.start(2000)
 
         # Actualizar visualización
-        self.dibujar_cruce()
+        self.redibujo.pedir(self.dibujar_cruce)
         """
         Actualiza la posición de todos los vehículos considerando solo su propio semáforo
         """
@@ -841,7 +846,7 @@ class SimuladorSemaforos(QMainWindow):
 
         # Actualizar visualización si hay cambios
         if vehicles_to_remove or self.vehicles:
-            self.dibujar_cruce()
+            self.redibujo.pedir(self.dibujar_cruce)
 
     def set_auto_traffic(self, value):
         if value > 0:
@@ -913,7 +918,7 @@ class SimuladorSemaforos(QMainWindow):
         self.timer.start(2000)
 
         # Actualizar visualización
-        self.dibujar_cruce()
+        self.redibujo.pedir(self.dibujar_cruce)
 
     def change_speed(self, value):
         self.simulation_speed = value / 5.0
@@ -1763,8 +1768,8 @@ class SimuladorSemaforos(QMainWindow):
 
         self.estado_actual = "Sur_verde"
         self.contador = 0
-        self.dibujar_cruce()
-        self.dibujar_petri_net()
+        self.redibujo.pedir(self.dibujar_cruce)
+        self.redibujo.pedir(self.dibujar_petri_net)
         self.estado_label.setText("Estado: Sur en verde")
 
         # Reiniciar history
@@ -2026,10 +2031,10 @@ class SimuladorSemaforos(QMainWindow):
 
         # Si el estado cambió, actualizar la visualización de Petri
         if prev_state != self.estado_actual or prev_contador != self.contador:
-            self.dibujar_petri_net()
+            self.redibujo.pedir(self.dibujar_petri_net)
 
         # Actualizar visualización
-        self.dibujar_cruce()
+        self.redibujo.pedir(self.dibujar_cruce)
 
 def main():
     app = QApplication(sys.argv)
@@ -0,0 +1,301 @@
+"""
+Controlador predictivo de fases (MPC) con simulaciones de prueba.
+
+El ciclo de la red de Petri y el doble anillo NEMA solo reaccionan a lo que
+ven los detectores en el momento. ControladorPredictivo, en cada punto de
+decisión (verde con el mínimo cumplido), simula horizonte segundos hacia
+delante cada acción posible (mantener la fase o pasar a otra con demanda)
+sobre una copia del motor y elige la de menor demora predicha. Todas las
+pruebas ven las mismas llegadas, porque la copia lleva el estado de los
+flujos aleatorios.
+
+Las pruebas de una decisión corren a la vez en procesos hijos creados con
+fork() (punto_control.ramificar) o, con procesos=1, una tras otra sobre
+copias ligeras del motor (punto_control.copiar). En ambos casos cada
+decisión tiene un presupuesto estricto de tiempo: las pruebas lo comprueban
+en cada paso de vehículos y se detienen con un margen para la copia y la
+recogida; las que no terminan a tiempo se descartan y, si no termina
+ninguna, se mantiene la fase
+(o, cumplido verde_maximo, se pasa a la siguiente con demanda). Con
+presupuesto=None las decisiones no dependen de la velocidad de la máquina.
+
+Las fases son los pares compatibles de nema.py; fuera de su fase protegida
+los giros a la izquierda son permisivos si la rejilla de conflictos lo permite:
+
+    Norte-Sur izq   flechas de giro a la izquierda Norte y Sur
+    Norte-Sur       rectos Norte y Sur
+    Este-Oeste izq  flechas de giro a la izquierda Este y Oeste
+    Este-Oeste      rectos Este y Oeste
+
+    motor.usar_controlador(ControladorPredictivo(horizonte=10, presupuesto=0.1))
+
+    python predictivo.py [horas] [semilla] [densidad]   # compara con el ciclo fijo y NEMA
+"""
+
+import copy
+import functools
+import os
+import sys
+import time
+
+from motor import PASO_VEHICULOS
+from nema import ControladorNEMA, actualizar_peatonales, cambiar_senal
+from punto_control import copiar, ramificar
+
+# Fase -> movimientos (aproximación, "recto" | "izquierda") en verde, en orden de ciclo
+FASES_PREDICTIVO = {
+    "Norte-Sur izq": (("Norte", "izquierda"), ("Sur", "izquierda")),
+    "Norte-Sur": (("Norte", "recto"), ("Sur", "recto")),
+    "Este-Oeste izq": (("Este", "izquierda"), ("Oeste", "izquierda")),
+    "Este-Oeste": (("Este", "recto"), ("Oeste", "recto")),
+}
+
+# Segundos simulados entre comprobaciones del presupuesto durante una prueba
+PASO_PRUEBA = PASO_VEHICULOS
+
+# Parte del presupuesto reservada para copiar el motor (o lanzar los hijos) y
+# recoger las pruebas: las simulaciones se detienen antes
+MARGEN_PRESUPUESTO = 0.2
+
+
+class ControladorPredictivo:
+    def __init__(self, fases=None, horizonte=10.0, presupuesto=0.1, procesos=None,
+                 verde_minimo=2, verde_maximo=16, amarillo=1, rojo_despeje=1):
+        """
+        horizonte: segundos simulados de cada prueba.
+        presupuesto: segundos de reloj por decisión (None: sin límite).
+        procesos: pruebas simultáneas en procesos hijos (None: uno por núcleo;
+            1: en este proceso, sobre copias ligeras).
+        Verde mínimo y máximo, amarillo y despeje se cuentan en pasos del
+        controlador, como en ControladorNEMA.
+        """
+        self.fases = dict(fases or FASES_PREDICTIVO)
+        self.orden = tuple(self.fases)
+        self.horizonte = horizonte
+        self.presupuesto = presupuesto
+        self.procesos = procesos
+        self.verde_minimo = verde_minimo
+        self.verde_maximo = verde_maximo
+        self.amarillo = amarillo
+        self.rojo_despeje = rojo_despeje
+
+        self.fase = self.orden[0]
+        self.proxima = None
+        self.intervalo = "verde"
+        self.ticks = 0
+        # Dentro de una prueba el controlador ejecuta la acción y no decide más
+        self.en_prueba = False
+
+        # Decisiones tomadas, pruebas lanzadas y descartadas por el presupuesto
+        self.decisiones = 0
+        self.pruebas = 0
+        self.descartadas = 0
+        self.latencia_total = 0.0
+        self.latencia_maxima = 0.0
+
+        # Motor reutilizado para las copias ligeras (procesos=1)
+        self._borrador = None
+
+    def __getstate__(self):
+        # El motor borrador no viaja en las copias ni en los puntos de control
+        estado = self.__dict__.copy()
+        estado["_borrador"] = None
+        return estado
+
+    @property
+    def latencia_media(self):
+        return self.latencia_total / self.decisiones if self.decisiones else 0.0
+
+    # === Estado para la red de Petri ===
+
+    def estado(self):
+        return f"{self.fase}_{self.intervalo}"
+
+    def estados_activos(self):
+        return {self.fase}
+
+    def red_petri(self):
+        """Una plaza por fase, en anillo; cada transición es una decisión."""
+        posiciones = ((100, 150), (100, 550), (620, 550), (620, 150))
+        estados = [{"name": f, "pos": posiciones[i % len(posiciones)]} for i, f in enumerate(self.orden)]
+        transiciones = []
+        for i, fase in enumerate(self.orden):
+            for otra in self.orden[i + 1:]:
+                transiciones.append({"from": fase, "to": otra, "label": "predicción"})
+        return estados, transiciones
+
+    # === Ciclo ===
+
+    def demanda(self, motor):
+        """Vehículos esperando cada fase según los detectores del motor."""
+        conteo = motor.demanda_movimientos()
+        return {fase: sum(conteo.get(m, 0) for m in movimientos) for fase, movimientos in self.fases.items()}
+
+    def iniciar(self, motor):
+        self.fase = self.orden[0]
+        self.proxima = None
+        self.intervalo = "verde"
+        self.ticks = 0
+        self._aplicar(motor)
+        motor.estado_actual = self.estado()
+        motor.contador = 0
+        motor.mensaje_estado = f"Estado: {self.estado()}"
+        motor.state_history = [motor.estado_actual]
+
+    def actualizar(self, motor):
+        """
+        Avanza un paso del controlador (decidiendo si toca), actualiza las
+        señales del motor y devuelve True si cambió el intervalo.
+        """
+        self.ticks += 1
+        cambio = False
+        if self.intervalo == "verde":
+            if not self.en_prueba and self.ticks >= self.verde_minimo:
+                proxima = self.decidir(motor)
+                if proxima != self.fase:
+                    self.proxima = proxima
+                    self.intervalo, self.ticks = "amarillo", 0
+                    cambio = True
+        elif self.intervalo == "amarillo":
+            if self.ticks >= self.amarillo:
+                self.intervalo, self.ticks = "rojo", 0
+                cambio = True
+        elif self.ticks >= self.rojo_despeje:
+            self.fase, self.proxima = self.proxima, None
+            self.intervalo, self.ticks = "verde", 0
+            cambio = True
+
+        self._aplicar(motor)
+
+        estado = self.estado()
+        motor.contador = self.ticks
+        if estado != motor.estado_actual:
+            motor.mensaje_estado = f"Estado: {estado}"
+            motor.estado_actual = estado
+            motor.state_history.append(estado)
+        return cambio
+
+    def terminar_amarillo(self, motor):
+        """Pasa a rojo (con su despeje por delante) si estaba en amarillo."""
+        if self.intervalo == "amarillo":
+            self.intervalo, self.ticks = "rojo", 0
+        self._aplicar(motor)
+
+    def decidir(self, motor):
+        """
+        Fase que debe seguir a la actual: la de menor demora predicha entre
+        mantenerla (antes de verde_maximo) y las demás fases con demanda.
+        """
+        demanda = self.demanda(motor)
+        i = self.orden.index(self.fase)
+        otras = [self.orden[(i + k) % len(self.orden)] for k in range(1, len(self.orden))]
+        candidatas = [f for f in otras if demanda[f]]
+        if self.ticks < self.verde_maximo or not candidatas:
+            candidatas.insert(0, self.fase)
+        if len(candidatas) == 1:
+            return candidatas[0]
+
+        inicio = time.perf_counter()
+        costos = self._evaluar(motor, candidatas, inicio)
+        latencia = time.perf_counter() - inicio
+
+        self.decisiones += 1
+        self.pruebas += len(candidatas)
+        self.descartadas += sum(c is None for c in costos)
+        self.latencia_total += latencia
+        self.latencia_maxima = max(self.latencia_maxima, latencia)
+
+        evaluadas = [(c, k) for k, c in enumerate(costos) if c is not None]
+        elegida = candidatas[min(evaluadas)[1]] if evaluadas else candidatas[0]
+        motor.registro.evento("decision_predictiva", "debug", fase=self.fase, elegida=elegida,
+                              costos=[None if c is None else round(c, 1) for c in costos],
+                              latencia_ms=round(latencia * 1000, 2))
+        return elegida
+
+    def _evaluar(self, motor, candidatas, inicio):
+        """Demora predicha de cada candidata (None si agotó el presupuesto)."""
+        limite = fin = None
+        if self.presupuesto is not None:
+            limite = inicio + self.presupuesto
+            fin = limite - MARGEN_PRESUPUESTO * self.presupuesto
+        procesos = self.procesos or os.cpu_count() or 1
+        if procesos > 1 and hasattr(os, "fork"):
+            restante = None if limite is None else max(0.0, limite - time.perf_counter())
+            return ramificar(motor, candidatas, functools.partial(self._probar, fin=fin),
+                             procesos, restante)
+
+        costos = []
+        for accion in candidatas:
+            if fin is not None and time.perf_counter() >= fin:
+                costos.append(None)
+                continue
+            self._borrador = copiar(motor, self._borrador)
+            costos.append(self._probar(self._borrador, accion, fin))
+        return costos
+
+    def _probar(self, motor, accion, fin=None):
+        """
+        Simula horizonte segundos en motor (una copia) ejecutando accion y
+        manteniendo después la fase. Devuelve la demora acumulada por todos
+        los vehículos en ese tiempo, o None si se pasa de fin.
+        """
+        plan = copy.copy(self)
+        plan.en_prueba = True
+        plan._borrador = None
+        if accion != self.fase:
+            plan.proxima = accion
+            plan.intervalo, plan.ticks = "amarillo", 0
+        motor.controlador = plan
+        plan._aplicar(motor)
+
+        base = motor.metricas.total.demora.suma + sum(v.demora for v in motor.vehicles)
+        objetivo = motor.reloj + self.horizonte
+        while motor.reloj < objetivo - 1e-9:
+            if fin is not None and time.perf_counter() >= fin:
+                return None
+            motor.correr(min(PASO_PRUEBA, objetivo - motor.reloj))
+        return motor.metricas.total.demora.suma + sum(v.demora for v in motor.vehicles) - base
+
+    # === Señales ===
+
+    def _aplicar(self, motor):
+        """Traduce la fase e intervalo actuales a los semáforos del motor."""
+        recto = dict.fromkeys(motor.semaforos_vehiculares, "rojo")
+        izquierda = dict.fromkeys(motor.semaforos_vehiculares, "rojo")
+        for aproximacion, tipo in self.fases[self.fase]:
+            (izquierda if tipo == "izquierda" else recto)[aproximacion] = self.intervalo
+
+        for direccion, semaforo in motor.semaforos_vehiculares.items():
+            cambiar_senal(semaforo, recto[direccion])
+            semaforo.flechas["izquierda"] = izquierda[direccion]
+            semaforo.flechas["derecha"] = "rojo"
+        actualizar_peatonales(motor)
+
+
+def main():
+    """Compara el ciclo fijo, NEMA y el controlador predictivo con las mismas llegadas."""
+    from motor import MotorSimulacion
+
+    horas = float(sys.argv[1]) if len(sys.argv) > 1 else 0.25
+    semilla = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    densidad = float(sys.argv[3]) if len(sys.argv) > 3 else 8
+
+    for nombre, controlador in (("Ciclo fijo", None), ("NEMA doble anillo", ControladorNEMA()),
+                                ("Predictivo", ControladorPredictivo())):
+        motor = MotorSimulacion(semilla)
+        motor.usar_controlador(controlador)
+        motor.set_auto_traffic(densidad)
+        inicio = time.perf_counter()
+        motor.correr(horas * 3600)
+        duracion = time.perf_counter() - inicio
+        total = motor.metricas.resumen()["total"]
+        print(f"{nombre:18s} salidos {motor.total_salidos:6d}  en cola {len(motor.vehicles):5d}  "
+              f"demora media {total['demora_media']:6.1f} s  p95 {total['demora_p95']:6.1f} s  ({duracion:.1f} s)")
+        if isinstance(controlador, ControladorPredictivo):
+            print(f"{'':18s} {controlador.decisiones} decisiones, latencia media "
+                  f"{controlador.latencia_media * 1000:.1f} ms, máxima {controlador.latencia_maxima * 1000:.1f} ms, "
+                  f"{controlador.descartadas} de {controlador.pruebas} pruebas fuera de presupuesto")
+
+
+if __name__ == "__main__":
+    main()
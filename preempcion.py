@@ -0,0 +1,285 @@
+"""
+Preempción de semáforos para vehículos de emergencia.
+
+El plan de fases (el ciclo de la red de Petri o un controlador) solo cambia
+las señales cuando vence el temporizador de fase, cada PERIODO_FASE /
+velocidad. La preempción no espera a ese temporizador: el motor la atiende
+al final de cada paso de vehículos (PASO_VEHICULOS), así que un vehículo de
+emergencia (motor.add_vehicle("Norte", emergencia=True)) que entra en la
+zona de solicitud recibe respuesta en el mismo paso.
+
+Con la primera solicitud se suspende el plan y se guardan sus señales. Las
+demás aproximaciones que no están en rojo pasan a amarillo (amarillo s) y
+después a rojo (rojo_despeje s); entonces la aproximación pedida recibe
+verde en todos sus movimientos y los pasos peatonales quedan en rojo. La
+latencia de una solicitud que no espera a otra está acotada por amarillo +
+rojo_despeje, y es cero si la aproximación pedida ya era la única sin rojo.
+Cuando los vehículos de emergencia de esa aproximación despejan el cruce se
+atiende la siguiente solicitud. Si no queda ninguna, se despeja igual el
+verde de la preempción y el plan recupera sus señales y sigue donde lo dejó;
+si se suspendió en amarillo, ese amarillo ya lo cubrió el despeje y el plan
+lo termina (motor.terminar_amarillo) sin adelantar el resto del ciclo.
+
+Las medidas van a motor.metricas (registrar_preempcion), en segundos
+simulados:
+
+    latencia       de la solicitud al verde de la aproximación pedida
+    recuperacion   de la vuelta al plan hasta que la cola total detenida
+                   baja al nivel que tenía al llegar la solicitud
+
+    python preempcion.py [minutos] [semilla] [densidad] [cada]   # con y sin preempción
+"""
+
+import sys
+import time
+
+from nema import ControladorNEMA, cambiar_senal
+
+# Avance (% del carril de entrada) desde el que un vehículo de emergencia pide
+# la preempción; a la velocidad libre quedan unos 4.7 s hasta la línea de parada
+DISTANCIA_SOLICITUD = 10
+
+
+class Preempcion:
+    def __init__(self, distancia=DISTANCIA_SOLICITUD, amarillo=1.5, rojo_despeje=1.0, servicio_maximo=30.0):
+        """
+        distancia: avance (%) al que el vehículo de emergencia pide paso.
+        Amarillo, despeje y servicio_maximo (verde máximo de una preempción si
+        el vehículo no despeja el cruce) se dan en segundos simulados.
+        """
+        self.distancia = distancia
+        self.amarillo = amarillo
+        self.rojo_despeje = rojo_despeje
+        self.servicio_maximo = servicio_maximo
+        self.reiniciar()
+
+    def reiniciar(self):
+        # Solicitudes por atender: (id del vehículo, aproximación, reloj)
+        self.solicitudes = []
+        # Vehículos que ya pidieron paso, para no repetir la solicitud
+        self.pedidas = set()
+        # Solicitudes en servicio con el verde actual
+        self.en_servicio = []
+
+        # Intervalo de la preempción: None (plan activo), "amarillo", "rojo" o
+        # "verde"; objetivo es la aproximación servida (None al volver al plan)
+        self.intervalo = None
+        self.objetivo = None
+        self.desde = 0.0
+        self.senales = {}
+
+        # Señales del plan suspendido y cola total al llegar la solicitud
+        self._plan = None
+        self._cola_previa = 0
+        # (reloj de vuelta al plan, cola a recuperar) mientras se recupera
+        self._recuperacion = None
+
+    @property
+    def activa(self):
+        """True mientras el plan está suspendido."""
+        return self._plan is not None
+
+    @property
+    def ocupada(self):
+        """True si hay algo que atender en el próximo paso."""
+        return self.activa or bool(self.solicitudes) or self._recuperacion is not None
+
+    # === Camino rápido (cada paso de vehículos) ===
+
+    def actualizar(self, motor, cola):
+        """
+        Atiende solicitudes y avanza los intervalos de la preempción.
+        cola: vehículos detenidos en el paso, para medir la recuperación.
+        """
+        self._detectar(motor)
+
+        if not self.activa:
+            if self._recuperacion is not None:
+                self._medir_recuperacion(motor, cola)
+            if not self.solicitudes:
+                return
+            self._suspender(motor, cola)
+            self._siguiente(motor)
+
+        # Margen para que la suma de pasos de 0.05 s no alargue los intervalos un paso
+        reloj = motor.reloj + 1e-9
+        if self.intervalo == "amarillo" and reloj >= self.desde + self.amarillo:
+            self._cambiar(motor, "rojo")
+        if self.intervalo == "rojo" and reloj >= self.desde + self.rojo_despeje:
+            if self.objetivo is None:
+                self._reanudar(motor, cola)
+                return
+            self._cambiar(motor, "verde")
+        if self.intervalo == "verde":
+            self._servir(motor)
+            if self._despejado(motor) or reloj >= self.desde + self.servicio_maximo:
+                self.pedidas.difference_update(i for i, _ in self.en_servicio)
+                self.en_servicio = []
+                self._siguiente(motor)
+
+        # Se reaplican en cada paso por si algo más tocó los semáforos
+        self._aplicar(motor)
+
+    def _detectar(self, motor):
+        """Solicitudes de los vehículos de emergencia que entran en la zona."""
+        for vehicle in motor.emergencias:
+            if (vehicle.id_vehiculo not in self.pedidas and vehicle.avance >= self.distancia
+                    and not vehicle.committed_to_crossing and not vehicle.has_cleared_intersection()):
+                self.pedidas.add(vehicle.id_vehiculo)
+                self.solicitudes.append((vehicle.id_vehiculo, vehicle.lane, motor.reloj))
+                motor.registro.evento("preempcion_solicitud", vehiculo=vehicle.id_vehiculo,
+                                      aproximacion=vehicle.lane, reloj=round(motor.reloj, 3))
+
+    def _servir(self, motor):
+        """Pasa a servicio las solicitudes de la aproximación en verde."""
+        for solicitud in [s for s in self.solicitudes if s[1] == self.objetivo]:
+            self.solicitudes.remove(solicitud)
+            self.en_servicio.append((solicitud[0], solicitud[2]))
+            latencia = motor.reloj - solicitud[2]
+            motor.metricas.registrar_preempcion(latencia=latencia)
+            motor.registro.evento("preempcion_verde", vehiculo=solicitud[0], aproximacion=self.objetivo,
+                                  latencia=round(latencia, 3), reloj=round(motor.reloj, 3))
+
+    def _despejado(self, motor):
+        """True si los vehículos en servicio ya salieron de la caja del cruce."""
+        activos = {v.id_vehiculo: v for v in motor.emergencias}
+        return all(i not in activos or activos[i].has_cleared_intersection() for i, _ in self.en_servicio)
+
+    # === Intervalos ===
+
+    def _suspender(self, motor, cola):
+        """
+        Guarda las señales del plan. Si aún se recuperaba de otra preempción,
+        la recuperación se medirá desde la próxima vuelta al plan y hasta la
+        cola de antes de la primera.
+        """
+        self._plan = (
+            {d: (s.estado, dict(s.tokens), dict(s.flechas)) for d, s in motor.semaforos_vehiculares.items()},
+            {k: (s.estado, dict(s.tokens)) for k, s in motor.semaforos_peatonales.items()},
+            motor.mensaje_estado,
+        )
+        if self._recuperacion is None:
+            self._cola_previa = cola
+        self._recuperacion = None
+
+    def _siguiente(self, motor):
+        """Despeja hacia la siguiente solicitud o, si no hay, hacia el plan."""
+        self.objetivo = self.solicitudes[0][1] if self.solicitudes else None
+        otras = [s for d, s in motor.semaforos_vehiculares.items() if d != self.objetivo]
+        if self.objetivo is not None and all(self._en_rojo(s) for s in otras):
+            self._cambiar(motor, "verde")
+            self._servir(motor)
+        else:
+            self._cambiar(motor, "amarillo")
+
+    @staticmethod
+    def _en_rojo(semaforo):
+        return semaforo.estado == "rojo" and all(f == "rojo" for f in semaforo.flechas.values())
+
+    def _cambiar(self, motor, intervalo):
+        """
+        Señales del intervalo: en amarillo los verdes de las demás
+        aproximaciones pasan a amarillo; en rojo, todo a rojo salvo los
+        verdes de la pedida; en verde, solo la pedida con sus flechas.
+        """
+        senales = {}
+        for direccion, semaforo in motor.semaforos_vehiculares.items():
+            actuales = (semaforo.estado, semaforo.flechas["izquierda"], semaforo.flechas["derecha"])
+            if direccion == self.objetivo:
+                if intervalo == "verde":
+                    senales[direccion] = ("verde",) * 3
+                else:
+                    senales[direccion] = tuple(e if e == "verde" else "rojo" for e in actuales)
+            elif intervalo == "amarillo":
+                senales[direccion] = tuple("amarillo" if e == "verde" else e for e in actuales)
+            else:
+                senales[direccion] = ("rojo",) * 3
+        self.senales = senales
+        self.intervalo = intervalo
+        self.desde = motor.reloj
+
+        destino = self.objetivo or "plan"
+        motor.mensaje_estado = f"Preempción: {intervalo} hacia {destino}"
+        self._aplicar(motor)
+
+    def _aplicar(self, motor):
+        for direccion, (estado, izquierda, derecha) in self.senales.items():
+            semaforo = motor.semaforos_vehiculares[direccion]
+            cambiar_senal(semaforo, estado)
+            semaforo.flechas["izquierda"] = izquierda
+            semaforo.flechas["derecha"] = derecha
+        for semaforo in motor.semaforos_peatonales.values():
+            cambiar_senal(semaforo, "rojo")
+
+    def _reanudar(self, motor, cola):
+        """
+        Devuelve al plan las señales que tenía al suspenderse. Tras el rojo de
+        despeje ninguna señal vuelve a amarillo: el plan termina el amarillo
+        en que se suspendió y sigue con su temporizador de fase.
+        """
+        vehiculares, peatonales, mensaje = self._plan
+        for direccion, (estado, tokens, flechas) in vehiculares.items():
+            semaforo = motor.semaforos_vehiculares[direccion]
+            semaforo.cambiar_estado(estado)
+            semaforo.tokens = tokens
+            semaforo.flechas = flechas
+        for clave, (estado, tokens) in peatonales.items():
+            semaforo = motor.semaforos_peatonales[clave]
+            semaforo.cambiar_estado(estado)
+            semaforo.tokens = tokens
+        motor.mensaje_estado = mensaje
+
+        self._plan = None
+        self.intervalo = None
+        self.senales = {}
+        motor.terminar_amarillo()
+        self._recuperacion = (motor.reloj, self._cola_previa)
+        motor.registro.evento("preempcion_fin", cola=cola, cola_previa=self._cola_previa,
+                              reloj=round(motor.reloj, 3))
+        self._medir_recuperacion(motor, cola)
+
+    def _medir_recuperacion(self, motor, cola):
+        inicio, objetivo = self._recuperacion
+        if cola <= objetivo:
+            self._recuperacion = None
+            motor.metricas.registrar_preempcion(recuperacion=motor.reloj - inicio)
+
+
+def main():
+    """Vehículos de emergencia periódicos con el ciclo fijo y NEMA, con y sin preempción."""
+    from motor import MotorSimulacion
+
+    minutos = float(sys.argv[1]) if len(sys.argv) > 1 else 30
+    semilla = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    densidad = float(sys.argv[3]) if len(sys.argv) > 3 else 6
+    cada = float(sys.argv[4]) if len(sys.argv) > 4 else 120
+
+    for nombre, controlador in (("Ciclo fijo", None), ("NEMA doble anillo", ControladorNEMA)):
+        for preempcion in (False, True):
+            motor = MotorSimulacion(semilla)
+            motor.usar_controlador(controlador() if controlador else None)
+            if not preempcion:
+                motor.preempcion = None
+            motor.set_auto_traffic(densidad)
+            azar = motor.flujos.flujo("emergencias")
+
+            inicio = time.perf_counter()
+            while motor.reloj < minutos * 60 - 1e-9:
+                motor.correr(cada)
+                motor.add_vehicle(str(azar.choice(("Norte", "Sur", "Este", "Oeste"))), emergencia=True)
+            duracion = time.perf_counter() - inicio
+
+            r = motor.metricas.resumen()
+            p = r["preempcion"]
+            print(f"{nombre:18s} {'con' if preempcion else 'sin'} preempción: demora media "
+                  f"{r['total']['demora_media']:5.1f} s, emergencias {p['emergencias']:3d} con demora media "
+                  f"{p['demora_emergencia']:5.1f} s  ({duracion:.1f} s)")
+            if preempcion:
+                print(f"{'':18s} latencia media {p['latencia_media']:.2f} s, máxima {p['latencia_maxima']:.2f} s "
+                      f"(cota {motor.preempcion.amarillo + motor.preempcion.rojo_despeje:.1f} s); recuperación "
+                      f"media {p['recuperacion_media']:.1f} s, máxima {p['recuperacion_maxima']:.1f} s "
+                      f"({p['recuperaciones']} de {p['solicitudes']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Control de presión máxima (max-pressure) para redes de cruces.
+
+La priorización del ciclo de la red de Petri solo alarga una vez el verde
+de la aproximación más cargada. PresionMaxima decide en cada cruce, con
+información local, la fase cuyo servicio alivia más la red: la presión de
+un movimiento es su parte del reparto de giros por la diferencia entre la
+densidad de la cola (celdas del detector de su enlace de entrada) y la del
+enlace al que va (cero si sale de la red); la de una fase, la suma de las
+presiones de los movimientos que sirve ponderadas por su capacidad (el giro
+a la izquierda permisivo cuenta FACTOR_PERMISIVO). Sin tiempos de ciclo que
+ajustar, este control mantiene estable cualquier demanda que la red pueda
+servir; verde_minimo evita que el tiempo perdido en amarillo y despeje se
+coma la capacidad cuando las presiones se igualan.
+
+Cada cruce solo usa sus enlaces de entrada y de salida, pero todos se
+evalúan a la vez: las presiones de todos los movimientos de la red son una
+resta de arreglos y las de todas las fases, un producto de matrices
+(cruces, 12) x (12, fases). Miles de cruces se deciden en milisegundos en
+cada paso del controlador.
+
+    red = RedMacro(40, 40, semilla=1)
+    red.usar_control_red(PresionMaxima())
+    red.set_demanda(0.1)
+    red.correr(3600)
+
+    python presion.py [filas] [columnas] [horas] [tasa ...]   # comparación con el ciclo fijo
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from ctm import CELDAS_DETECTOR, FACTOR_PERMISIVO, RedMacro
+from llegadas import APROXIMACIONES
+from predictivo import FASES_PREDICTIVO
+
+# Intervalos de cada cruce
+VERDE, AMARILLO, DESPEJE = 0, 1, 2
+
+
+class PresionMaxima:
+    def __init__(self, fases=None, verde_minimo=8, amarillo=1, rojo_despeje=1):
+        """
+        fases: fase -> movimientos (aproximación, "recto" | "izquierda") en
+            verde, como FASES_PREDICTIVO; el recto incluye el giro a la derecha.
+        Verde mínimo, amarillo y despeje se cuentan en pasos del controlador
+        (PERIODO_FASE), como en ControladorNEMA.
+        """
+        self.fases = dict(fases or FASES_PREDICTIVO)
+        self.orden = tuple(self.fases)
+        self.verde_minimo = verde_minimo
+        self.amarillo = amarillo
+        self.rojo_despeje = rojo_despeje
+        self.evaluaciones = 0
+        self.tiempo = 0.0
+
+    def _servicio(self, red):
+        """Capacidad (0..1) de cada movimiento del cruce en cada fase: (fases, 4 * 3)."""
+        servicio = np.zeros((len(self.orden), len(APROXIMACIONES), 3))
+        for f, fase in enumerate(self.orden):
+            for aproximacion, tipo in self.fases[fase]:
+                a = APROXIMACIONES.index(aproximacion)
+                for m, giro in enumerate(red.giros[a]):
+                    if tipo == "izquierda" and giro == "izquierda":
+                        servicio[f, a, m] = 1.0
+                    elif tipo == "recto":
+                        servicio[f, a, m] = FACTOR_PERMISIVO if giro == "izquierda" else 1.0
+        return servicio.reshape(len(self.orden), -1)
+
+    def iniciar(self, red):
+        nodos = len(red)
+        self.servicio = self._servicio(red)
+        self.fase = np.zeros(nodos, dtype=np.intp)
+        self.proxima = np.zeros(nodos, dtype=np.intp)
+        self.intervalo = np.full(nodos, VERDE, dtype=np.int8)
+        self.ticks = np.zeros(nodos, dtype=np.int32)
+        self._aplicar(red)
+
+    def presiones(self, red):
+        """Presión de cada fase de cada cruce: arreglo (cruces, fases)."""
+        cola = red.n[:, -CELDAS_DETECTOR:].mean(axis=1)
+        densidad = red.n.mean(axis=1)
+        abajo = np.where(red.destino >= 0, densidad[red.destino], 0.0)
+        presion = (red.reparto * (cola[:, None] - abajo)).reshape(len(red), -1)
+        return presion @ self.servicio.T
+
+    def actualizar(self, red):
+        """Un paso del controlador en todos los cruces."""
+        inicio = time.perf_counter()
+        presiones = self.presiones(red)
+        self.ticks += 1
+
+        # Cambia la fase si otra tiene más presión que la actual
+        todos = np.arange(len(red))
+        elegida = presiones.argmax(axis=1)
+        mejor = presiones[todos, elegida] > presiones[todos, self.fase]
+        cambia = (self.intervalo == VERDE) & (self.ticks >= self.verde_minimo) & mejor
+        fin_amarillo = (self.intervalo == AMARILLO) & (self.ticks >= self.amarillo)
+        fin_despeje = (self.intervalo == DESPEJE) & (self.ticks >= self.rojo_despeje)
+
+        self.proxima[cambia] = elegida[cambia]
+        self.intervalo[cambia] = AMARILLO
+        self.intervalo[fin_amarillo] = DESPEJE
+        self.intervalo[fin_despeje] = VERDE
+        self.fase[fin_despeje] = self.proxima[fin_despeje]
+        self.ticks[cambia | fin_amarillo | fin_despeje] = 0
+        self._aplicar(red)
+
+        self.evaluaciones += 1
+        self.tiempo += time.perf_counter() - inicio
+
+    def _aplicar(self, red):
+        verde = self.servicio[self.fase] * (self.intervalo == VERDE)[:, None]
+        red.verde[:] = verde.reshape(red.verde.shape)
+
+    def estado(self, indice):
+        """Nombre de la fase e intervalo de un cruce, p. ej. 'Norte-Sur_verde'."""
+        intervalo = ("verde", "amarillo", "rojo")[self.intervalo[indice]]
+        fase = self.orden[self.fase[indice] if intervalo == "verde" else self.proxima[indice]]
+        return f"{fase}_{intervalo}"
+
+
+def comparar(filas, columnas, horas, tasa, semilla=1):
+    """
+    Corre la misma red con el ciclo fijo y con presión máxima. Devuelve por
+    controlador el resumen de la red, los vehículos salidos por hora y el
+    crecimiento de los vehículos en la red en la segunda mitad (veh/h; cerca
+    de cero si la red es estable).
+    """
+    resultados = {}
+    for nombre in ("ciclo fijo", "presión máxima"):
+        red = RedMacro(filas, columnas, semilla=semilla)
+        control = None
+        if nombre == "presión máxima":
+            control = PresionMaxima()
+            red.usar_control_red(control)
+        red.set_demanda(tasa)
+
+        inicio = time.perf_counter()
+        red.correr(horas * 1800)
+        mitad = red.vehiculos_en_red() + float(red.cola_entrada.sum())
+        red.correr(horas * 1800)
+        duracion = time.perf_counter() - inicio
+        final = red.vehiculos_en_red() + float(red.cola_entrada.sum())
+
+        resultados[nombre] = {
+            **red.resumen(),
+            "salidos_hora": red.total_salidos / horas,
+            "crecimiento": (final - mitad) / (horas / 2),
+            "segundos": duracion,
+            "control_ms": control.tiempo / control.evaluaciones * 1000 if control else None,
+        }
+    return resultados
+
+
+def main():
+    """Compara ciclo fijo y presión máxima en una rejilla con varias demandas."""
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    columnas = int(sys.argv[2]) if len(sys.argv) > 2 else filas
+    horas = float(sys.argv[3]) if len(sys.argv) > 3 else 1.0
+    tasas = [float(t) for t in sys.argv[4:]] or [0.05, 0.1, 0.15]
+
+    print(f"{filas * columnas} cruces, {horas:g} h por corrida")
+    print(f"{'tasa':>5s} {'controlador':15s} {'salidos/h':>10s} {'en red':>8s} {'en cola':>8s} "
+          f"{'crece veh/h':>11s} {'cálculo':>8s}")
+    for tasa in tasas:
+        for nombre, r in comparar(filas, columnas, horas, tasa).items():
+            control = f"  {r['control_ms']:.2f} ms por paso del controlador" if r["control_ms"] else ""
+            print(f"{tasa:5.2f} {nombre:15s} {r['salidos_hora']:10.0f} {r['en_red']:8.0f} {r['en_cola']:8.0f} "
+                  f"{r['crecimiento']:11.0f} {r['segundos']:7.1f}s{control}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Comprueba el presupuesto de tiempo de importación del motor sin interfaz.
+
+Ejecuta un intérprete nuevo con -X importtime, suma el tiempo acumulado de
+las importaciones de primer nivel y falla (código de salida 1) si se supera
+el presupuesto o si se llegó a importar PyQt6. Pensado para ejecutarse en CI
+o antes de lanzar lotes que crean miles de procesos.
+
+    python presupuesto_importacion.py [módulo] [presupuesto_ms]
+"""
+
+import os
+import subprocess
+import sys
+
+MODULO = "motor"
+PRESUPUESTO_MS = 500
+
+
+def medir_importacion(modulo=MODULO):
+    """
+    Devuelve (total_ms, módulos, importados) al importar modulo en un proceso
+    nuevo. módulos es una lista de (nombre, acumulado_ms) de primer nivel e
+    importados los nombres de todos los módulos cargados.
+    """
+    resultado = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True, check=True,
+    )
+
+    modulos, importados = [], []
+    for linea in resultado.stderr.splitlines():
+        # Formato: "import time:  propio | acumulado | [sangría]paquete"
+        if not linea.startswith("import time:") or "[us]" in linea:
+            continue
+        _, acumulado, nombre = linea[len("import time:"):].split("|")
+        importados.append(nombre.strip())
+        # Las importaciones anidadas llevan sangría; solo se suman las de primer nivel
+        if not nombre.startswith("  "):
+            modulos.append((nombre.strip(), int(acumulado) / 1000))
+
+    return sum(ms for _, ms in modulos), modulos, importados
+
+
+def main():
+    modulo = sys.argv[1] if len(sys.argv) > 1 else MODULO
+    presupuesto = float(sys.argv[2]) if len(sys.argv) > 2 else PRESUPUESTO_MS
+
+    total, modulos, importados = medir_importacion(modulo)
+    print(f"Importar {modulo}: {total:.1f} ms (presupuesto {presupuesto:.0f} ms)")
+    for nombre, ms in sorted(modulos, key=lambda m: -m[1])[:10]:
+        print(f"  {ms:8.1f} ms  {nombre}")
+
+    qt = [nombre for nombre in importados if nombre.startswith("PyQt6")]
+    if qt:
+        print(f"✗ {modulo} importa Qt: {', '.join(qt)}")
+        sys.exit(1)
+    if total > presupuesto:
+        print("✗ Se superó el presupuesto de importación")
+        sys.exit(1)
+    print("✓ Dentro del presupuesto")
+
+
+if __name__ == "__main__":
+    main()
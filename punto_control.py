@@ -0,0 +1,433 @@
+"""
+Puntos de control del motor y ramas "qué pasaría si".
+
+capturar() guarda en un PuntoControl todo lo que hace falta para seguir una
+corrida desde ese instante: la flota como arreglo estructurado de NumPy (una
+fila por vehículo), el estado de cada flujo aleatorio y, serializado con
+pickle, el resto del motor (reloj y temporizadores, semáforos, controlador,
+programa de llegadas, reservas de conflictos y métricas) comprimido con
+zlib. Las rutas y el perfil de demanda no se copian: se guardan como
+referencias a los del proceso, así que las reservas siguen comparando rutas
+por identidad y el punto de control ocupa unos pocos KiB.
+restaurar() deja cualquier MotorSimulacion exactamente en ese instante; con
+la misma semilla la continuación es idéntica bit a bit a la corrida original.
+
+ramificar() corre varias continuaciones desde el mismo instante, cada una en
+un proceso hijo creado con fork(): el hijo comparte la memoria del motor ya
+calentado (copia al escribir) y nadie vuelve a simular el calentamiento.
+
+    motor.correr(2 * 3600)   # calentamiento
+    punto = capturar(motor)
+    ...
+    restaurar(motor, punto)
+
+    def continuar(motor, controlador):
+        motor.usar_controlador(controlador)
+        motor.correr(900)
+        return motor.metricas.resumen()["total"]
+
+    resultados = ramificar(motor, [None, ControladorNEMA()], continuar)
+
+    python punto_control.py perfiles/dia_laboral.json 2 15 1   # perfil, horas de calentamiento, minutos, semilla
+"""
+
+import collections
+import io
+import os
+import pickle
+import select
+import signal
+import sys
+import time
+import traceback
+import zlib
+
+import numpy as np
+
+from demanda import PerfilDemanda
+from llegadas import APROXIMACIONES
+from motor import MotorSimulacion
+from registro import RegistroEventos
+from rutas import Ruta
+
+# Una fila por vehículo activo, en el orden de la flota. Las aproximaciones
+# son índices de APROXIMACIONES; ruta, de los objetos compartidos del punto
+# de control y fase, de sus nombres de fase (-1: sin reserva o sin fase)
+FLOTA = np.dtype([
+    ("origen", "u1"),
+    ("destino", "u1"),
+    ("direccion", "u1"),
+    ("ruta", "u2"),
+    ("tramo", "u2"),
+    ("carril", "u2"),
+    ("reserva", "i2"),
+    ("fase", "i2"),
+    ("detenido", "?"),
+    ("stopped", "?"),
+    ("in_intersection", "?"),
+    ("committed_to_crossing", "?"),
+    ("turn_started", "?"),
+    ("waiting_at_red", "?"),
+    ("emergencia", "?"),
+    ("paradas", "i4"),
+    ("id", "i8"),
+    ("distancia", "f8"),
+    ("limite_cola", "f8"),
+    ("speed", "f8"),
+    ("turn_point", "f8"),
+    ("t_aparicion", "f8"),
+    ("demora", "f8"),
+])
+
+# Atributos del motor que no forman parte del estado simulado: la flota va
+# en su propio arreglo (las emergencias se rehacen desde él) y el registro,
+# el monitor y las listas de salidas y de cambios de fase pertenecen a quien
+# usa el motor, no al instante que se guarda
+EXCLUIDOS = ("vehicles", "emergencias", "registro", "monitor", "salidas", "cambios_fase")
+
+# Lo que además se omite en un punto de control ligero (copias para
+# simulaciones de prueba): lo acumulado, que no cambia lo que pasa después
+LIGEROS = ("metricas", "state_history")
+
+_INDICE_APROXIMACION = {a: i for i, a in enumerate(APROXIMACIONES)}
+
+
+class PuntoControl:
+    def __init__(self, reloj, flota, compartidos, fases, generadores, estado, ligero=False):
+        self.reloj = reloj
+        self.ligero = ligero            # sin métricas ni historial de fases
+        self.flota = flota              # arreglo FLOTA
+        self.compartidos = compartidos  # rutas y perfiles referidos por la flota y el estado
+        self.fases = fases              # nombres de fase referidos por la flota
+        self.generadores = generadores  # clave del flujo -> estado de su PCG64
+        self.estado = estado            # resto del motor (pickle comprimido)
+
+    def __len__(self):
+        return len(self.flota)
+
+    @property
+    def tamano(self):
+        """Bytes que ocupan la flota y el estado serializado."""
+        return self.flota.nbytes + len(self.estado)
+
+
+# Objetos de configuración que no cambian durante la corrida: el punto de
+# control guarda referencias a ellos, no copias
+COMPARTIDOS = (Ruta, PerfilDemanda)
+
+
+class _Serializador(pickle.Pickler):
+    # Los objetos compartidos y el propio motor viajan como referencias
+    def __init__(self, archivo, motor, compartidos):
+        super().__init__(archivo, pickle.HIGHEST_PROTOCOL)
+        self.motor = motor
+        self.compartidos = compartidos
+
+    def persistent_id(self, objeto):
+        if objeto is self.motor:
+            return "motor"
+        if isinstance(objeto, COMPARTIDOS):
+            return self.compartidos.setdefault(objeto, len(self.compartidos))
+        return None
+
+
+class _Deserializador(pickle.Unpickler):
+    def __init__(self, archivo, motor, compartidos):
+        super().__init__(archivo)
+        self.motor = motor
+        self.compartidos = compartidos
+
+    def persistent_load(self, referencia):
+        if referencia == "motor":
+            return self.motor
+        return self.compartidos[referencia]
+
+
+def capturar(motor, ligero=False):
+    """
+    PuntoControl del instante actual del motor. ligero omite las métricas y
+    el historial de fases: basta para simular hacia delante y es más rápido.
+    """
+    compartidos = {}
+    fases = {}
+    vehiculos = list(motor.vehicles)
+    flota = np.zeros(len(vehiculos), dtype=FLOTA)
+    if vehiculos:
+        columnas = {
+            "origen": [_INDICE_APROXIMACION[v.lane] for v in vehiculos],
+            "destino": [_INDICE_APROXIMACION[v.destination] for v in vehiculos],
+            "direccion": [_INDICE_APROXIMACION[v.current_direction] for v in vehiculos],
+            "ruta": [compartidos.setdefault(v.ruta, len(compartidos)) for v in vehiculos],
+            "tramo": [v.tramo for v in vehiculos],
+            "carril": [v.indice_carril for v in vehiculos],
+            "reserva": [-1 if v.reserva is None else v.reserva for v in vehiculos],
+            "fase": [-1 if v.fase is None else fases.setdefault(v.fase, len(fases)) for v in vehiculos],
+            "detenido": [v.detenido for v in vehiculos],
+            "stopped": [v.stopped for v in vehiculos],
+            "in_intersection": [v.in_intersection for v in vehiculos],
+            "committed_to_crossing": [v.committed_to_crossing for v in vehiculos],
+            "turn_started": [v.turn_started for v in vehiculos],
+            "waiting_at_red": [v.waiting_at_red for v in vehiculos],
+            "emergencia": [v.emergencia for v in vehiculos],
+            "paradas": [v.paradas for v in vehiculos],
+            "id": [v.id_vehiculo for v in vehiculos],
+            "distancia": [v.distancia for v in vehiculos],
+            "limite_cola": [v.limite_cola for v in vehiculos],
+            "speed": [v.speed for v in vehiculos],
+            "turn_point": [v.turn_point for v in vehiculos],
+            "t_aparicion": [v.t_aparicion for v in vehiculos],
+            "demora": [v.demora for v in vehiculos],
+        }
+        for nombre, valores in columnas.items():
+            flota[nombre] = valores
+
+    # Estado exacto de cada generador ya usado; FlujosAleatorios solo guarda la semilla
+    generadores = {clave: generador.bit_generator.state
+                   for clave, generador in motor.flujos._generadores.items()}
+
+    excluidos = EXCLUIDOS + LIGEROS if ligero else EXCLUIDOS
+    estado = {k: v for k, v in motor.__dict__.items() if k not in excluidos}
+    archivo = io.BytesIO()
+    _Serializador(archivo, motor, compartidos).dump(estado)
+
+    # Los histogramas de las métricas son casi todo ceros: nivel 1 basta
+    return PuntoControl(motor.reloj, flota, list(compartidos), list(fases), generadores,
+                        zlib.compress(archivo.getvalue(), 1), ligero)
+
+
+def restaurar(motor, punto):
+    """
+    Deja el motor en el instante del punto de control. El motor puede ser el
+    mismo del que se capturó u otro MotorSimulacion del mismo proceso (o de
+    un hijo creado con fork()); conserva su registro, monitor y salidas. Un
+    punto ligero deja las métricas vacías y el historial en la fase actual.
+    """
+    estado = _Deserializador(io.BytesIO(zlib.decompress(punto.estado)), motor, punto.compartidos).load()
+    motor.__dict__.update(estado)
+    if punto.ligero:
+        motor.metricas.reiniciar()
+        motor.state_history = [motor.estado_actual]
+    for clave, estado_generador in punto.generadores.items():
+        motor.flujos.flujo(*clave).bit_generator.state = estado_generador
+
+    flota = motor.vehicles
+    flota.clear()
+    motor.emergencias = []
+    if not len(punto.flota):
+        return motor
+    columnas = [punto.flota[nombre].tolist() for nombre in FLOTA.names]
+    for (origen, destino, direccion, ruta, tramo, carril, reserva, fase, detenido, stopped,
+         in_intersection, committed, turn_started, waiting_at_red, emergencia, paradas, id_vehiculo,
+         distancia, limite_cola, speed, turn_point, t_aparicion, demora) in zip(*columnas):
+        vehicle = flota.crear(APROXIMACIONES[origen], 0, APROXIMACIONES[destino],
+                              ruta=punto.compartidos[ruta], carril=carril)
+        vehicle.current_direction = APROXIMACIONES[direccion]
+        vehicle.tramo = tramo
+        vehicle.reserva = None if reserva < 0 else reserva
+        vehicle.fase = None if fase < 0 else punto.fases[fase]
+        vehicle.detenido = detenido
+        vehicle.stopped = stopped
+        vehicle.in_intersection = in_intersection
+        vehicle.committed_to_crossing = committed
+        vehicle.turn_started = turn_started
+        vehicle.waiting_at_red = waiting_at_red
+        vehicle.emergencia = emergencia
+        if emergencia:
+            motor.emergencias.append(vehicle)
+        vehicle.paradas = paradas
+        vehicle.id_vehiculo = id_vehiculo
+        vehicle.distancia = distancia
+        vehicle.limite_cola = limite_cola
+        vehicle.speed = speed
+        vehicle.turn_point = turn_point
+        vehicle.t_aparicion = t_aparicion
+        vehicle.demora = demora
+    return motor
+
+
+def copiar(motor, destino=None):
+    """
+    Copia ligera del motor para simulaciones de prueba: mismo instante, flota
+    y flujos aleatorios, sin métricas acumuladas, registro ni monitor.
+    destino: MotorSimulacion que se reutiliza (None crea uno).
+    """
+    if destino is None:
+        destino = MotorSimulacion(motor.flujos.semilla)
+    return restaurar(destino, capturar(motor, ligero=True))
+
+
+def _correr_hijo(motor, continuar, variante, escritura):
+    # El hilo del registro no sobrevive a fork() y el monitor es del padre
+    motor.registro = RegistroEventos()
+    motor.monitor = None
+    try:
+        resultado = (True, continuar(motor, variante))
+    except BaseException:
+        resultado = (False, traceback.format_exc())
+    with os.fdopen(escritura, "wb") as tuberia:
+        try:
+            datos = pickle.dumps(resultado, pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            datos = pickle.dumps((False, traceback.format_exc()))
+        tuberia.write(datos)
+
+
+# Hijos que aún no se han esperado: con límite no se bloquea en waitpid (un
+# hijo detenido con SIGKILL puede tardar en terminar), se recogen sin esperar
+# en esta llamada o en las siguientes
+_pendientes = set()
+
+
+def _esperar(pid, fin):
+    """Espera a pid sin límite, o con límite lo recoge (y los pendientes) si ya terminó."""
+    if fin is None:
+        os.waitpid(pid, 0)
+        return
+    _pendientes.add(pid)
+    for hijo in list(_pendientes):
+        try:
+            terminado = os.waitpid(hijo, os.WNOHANG)[0]
+        except ChildProcessError:
+            terminado = True
+        if terminado:
+            _pendientes.discard(hijo)
+
+
+def _recoger(pid, lectura, fin=None):
+    """
+    Respuesta del hijo; (True, None) si no termina antes de fin. Pasado fin
+    aún se lee sin esperar lo que ya está en la tubería, así que un hijo que
+    terminó mientras se recogía a otro no se pierde.
+    """
+    datos = bytearray()
+    with os.fdopen(lectura, "rb", buffering=0) as tuberia:
+        while True:
+            if fin is not None:
+                restante = max(0.0, fin - time.perf_counter())
+                if not select.select([tuberia], [], [], restante)[0]:
+                    os.kill(pid, signal.SIGKILL)
+                    _esperar(pid, fin)
+                    return True, None
+            bloque = tuberia.read(65536)
+            if not bloque:
+                break
+            datos += bloque
+    _esperar(pid, fin)
+    if not datos:
+        return False, f"El proceso {pid} terminó sin devolver resultado"
+    return pickle.loads(datos)
+
+
+def ramificar(motor, variantes, continuar, procesos=None, limite=None):
+    """
+    Corre continuar(motor, variante) para cada variante desde el instante
+    actual del motor y devuelve sus resultados en el mismo orden. Cada
+    continuación corre en un proceso hijo creado con fork() (como mucho
+    procesos a la vez; None: uno por núcleo) y el motor del padre no cambia.
+    Los resultados deben poder serializarse con pickle. Sin fork() (Windows)
+    las variantes corren una tras otra restaurando un punto de control.
+    limite: segundos de reloj para todas las variantes; las que no terminan
+        a tiempo se detienen (sin esperar a que salgan) y su resultado es None.
+    """
+    variantes = list(variantes)
+    fin = None if limite is None else time.perf_counter() + limite
+    if not hasattr(os, "fork"):
+        punto = capturar(motor)
+        resultados = []
+        for variante in variantes:
+            if fin is not None and time.perf_counter() >= fin:
+                resultados.append(None)
+                continue
+            resultados.append(continuar(motor, variante))
+            restaurar(motor, punto)
+        return resultados
+
+    procesos = max(1, procesos or os.cpu_count() or 1)
+    # Lo pendiente en los búferes se escribiría una vez por hijo
+    sys.stdout.flush()
+    sys.stderr.flush()
+
+    # (índice de la variante, pid, tubería); las respuestas se guardan por
+    # índice porque las variantes que no llegan a lanzarse se anotan antes
+    # que las que siguen corriendo
+    activos = collections.deque()
+    respuestas = [(True, None)] * len(variantes)
+    for indice, variante in enumerate(variantes):
+        if len(activos) >= procesos:
+            anterior, *hijo = activos.popleft()
+            respuestas[anterior] = _recoger(*hijo, fin)
+        if fin is not None and time.perf_counter() >= fin:
+            continue
+        lectura, escritura = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(lectura)
+            try:
+                _correr_hijo(motor, continuar, variante, escritura)
+            finally:
+                os._exit(0)
+        os.close(escritura)
+        activos.append((indice, pid, lectura))
+    while activos:
+        anterior, *hijo = activos.popleft()
+        respuestas[anterior] = _recoger(*hijo, fin)
+
+    for correcto, valor in respuestas:
+        if not correcto:
+            raise RuntimeError(f"Una variante falló en su proceso:\n{valor}")
+    return [valor for _, valor in respuestas]
+
+
+def _continuar(motor, variante):
+    from nema import ControladorNEMA
+
+    nombre, minutos = variante
+    motor.usar_controlador(ControladorNEMA() if nombre == "nema" else None)
+    motor.correr(minutos * 60)
+    return motor.metricas.resumen()["total"], motor.total_salidos
+
+
+def main():
+    """Calienta un perfil, comprueba la restauración y ramifica controladores."""
+    if len(sys.argv) < 4:
+        print("Uso: python punto_control.py perfil.json horas_calentamiento minutos [semilla]")
+        return
+
+    horas = float(sys.argv[2])
+    minutos = float(sys.argv[3])
+    semilla = int(sys.argv[4]) if len(sys.argv) > 4 else 1
+
+    motor = MotorSimulacion(semilla)
+    motor.usar_perfil_demanda(PerfilDemanda.cargar(sys.argv[1]), 7)
+    inicio = time.perf_counter()
+    motor.correr(horas * 3600)
+    calentamiento = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    punto = capturar(motor)
+    captura = time.perf_counter() - inicio
+    print(f"Calentamiento: {horas:g} h en {calentamiento:.1f} s; punto de control con {len(punto)} "
+          f"vehículos, {punto.tamano / 1024:.0f} KiB en {captura * 1000:.1f} ms")
+
+    motor.correr(minutos * 60)
+    original = (motor.metricas.resumen(), motor.total_salidos, motor.state_history[-1])
+    inicio = time.perf_counter()
+    restaurar(motor, punto)
+    restauracion = time.perf_counter() - inicio
+    motor.correr(minutos * 60)
+    repetida = (motor.metricas.resumen(), motor.total_salidos, motor.state_history[-1])
+    print(f"Restauración en {restauracion * 1000:.1f} ms; continuación "
+          f"{'idéntica' if repetida == original else 'DISTINTA'} a la original")
+
+    restaurar(motor, punto)
+    variantes = [("ciclo", minutos), ("nema", minutos)]
+    inicio = time.perf_counter()
+    resultados = ramificar(motor, variantes, _continuar)
+    print(f"{len(variantes)} ramas de {minutos:g} min en {time.perf_counter() - inicio:.1f} s:")
+    for (nombre, _), (total, salidos) in zip(variantes, resultados):
+        print(f"  {nombre:6s} salidos {salidos:6d}  demora media {total['demora_media']:6.1f} s  "
+              f"p95 {total['demora_p95']:6.1f} s  LOS {total['los']}")
+
+
+if __name__ == "__main__":
+    main()
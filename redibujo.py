@@ -0,0 +1,62 @@
+"""
+Redibujado de escenas agrupado por cuadro de pantalla.
+
+Los temporizadores de vehículos y de fases, los botones de añadir vehículos
+y el tráfico automático piden redibujar la escena por su cuenta; si cada
+petición redibujara en el momento, una ráfaga de vehículos o un cambio de
+fase en el mismo paso repetirían el trabajo varias veces antes de que la
+pantalla mostrara nada. PlanificadorRedibujo solo anota qué hay que
+redibujar y lo hace una vez, al siguiente cuadro de la pantalla.
+
+    self.redibujo = PlanificadorRedibujo(self)
+    self.redibujo.pedir(self.dibujar_cruce)   # en lugar de self.dibujar_cruce()
+"""
+
+from PyQt6.QtCore import QObject, Qt, QTimer
+from PyQt6.QtGui import QGuiApplication
+
+# Frecuencia de refresco si no se puede consultar la pantalla
+FPS_POR_DEFECTO = 60
+
+
+class PlanificadorRedibujo(QObject):
+    def __init__(self, parent=None, fps=None):
+        """
+        fps: cuadros por segundo; None usa la frecuencia de refresco de la
+            pantalla principal.
+        """
+        super().__init__(parent)
+        if fps is None:
+            pantalla = QGuiApplication.primaryScreen()
+            fps = pantalla.refreshRate() if pantalla is not None else 0
+        self.periodo = max(1, round(1000 / (fps or FPS_POR_DEFECTO)))
+
+        # Funciones de dibujo pendientes, en orden de petición y sin repetir
+        self.pendientes = {}
+        self.redibujos = 0
+        self.evitados = 0
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.timeout.connect(self._dibujar)
+
+    def pedir(self, funcion):
+        """Marca funcion como pendiente para el próximo cuadro."""
+        if funcion in self.pendientes:
+            self.evitados += 1
+            return
+        self.pendientes[funcion] = None
+        if not self.timer.isActive():
+            self.timer.start(self.periodo)
+
+    def vaciar(self):
+        """Dibuja ya lo pendiente (p. ej. antes de capturar la escena)."""
+        self.timer.stop()
+        self._dibujar()
+
+    def _dibujar(self):
+        pendientes, self.pendientes = self.pendientes, {}
+        for funcion in pendientes:
+            funcion()
+            self.redibujos += 1
@@ -0,0 +1,159 @@
+"""
+Registro estructurado de eventos en formato JSON lines.
+
+Sustituye a los print() de la simulación. Cada evento tiene un tipo, un
+nivel y campos libres. El filtrado (nivel, muestreo por tipo y límite de
+eventos por segundo por tipo) se hace en el hilo que llama y solo cuesta unas
+comparaciones; la serialización y la escritura a disco las hace un hilo en
+segundo plano por lotes, así que registrar nunca bloquea el paso de la
+simulación.
+
+    registro = RegistroEventos("eventos.jsonl", nivel="info",
+                               muestreo={"vehiculo_generado": 0.1},
+                               limites={"semaforo_peatonal": 2})
+    registro.evento("cambio_fase", estado="Sur_amarillo")
+    registro.cerrar()
+
+Sin ruta el registro queda desactivado y evento() no hace nada.
+"""
+
+import json
+import queue
+import threading
+import time
+
+NIVELES = {"debug": 10, "info": 20, "aviso": 30, "error": 40}
+
+_FIN = object()
+
+
+class _LimiteTasa:
+    """Cubeta de fichas: como máximo tasa eventos/s con ráfagas de hasta rafaga."""
+
+    def __init__(self, tasa, rafaga=None):
+        self.tasa = tasa
+        self.capacidad = rafaga if rafaga is not None else max(1.0, tasa)
+        self.fichas = self.capacidad
+        self.ultimo = time.monotonic()
+
+    def permitir(self):
+        ahora = time.monotonic()
+        self.fichas = min(self.capacidad, self.fichas + (ahora - self.ultimo) * self.tasa)
+        self.ultimo = ahora
+        if self.fichas >= 1.0:
+            self.fichas -= 1.0
+            return True
+        return False
+
+
+class RegistroEventos:
+    def __init__(self, ruta=None, nivel="info", muestreo=None, limites=None,
+                 tam_lote=256, intervalo=0.5, max_cola=100_000):
+        """
+        ruta: archivo JSON lines (se añade al final); None desactiva el registro.
+        nivel: nivel mínimo que se registra.
+        muestreo: dict tipo -> fracción de eventos que se conservan (0-1). Es
+            determinista (uno de cada N) para no consumir números aleatorios.
+        limites: dict tipo -> máximo de eventos por segundo.
+        tam_lote: eventos por escritura; intervalo: segundos máximos de espera.
+        max_cola: eventos pendientes de escribir; con la cola llena (disco
+            lento) los nuevos se descartan en lugar de acumularse sin límite.
+        """
+        if nivel not in NIVELES:
+            raise ValueError(f"Nivel de registro desconocido: {nivel!r} (válidos: {', '.join(NIVELES)})")
+        self.ruta = ruta
+        self.nivel_minimo = NIVELES[nivel]
+        self.cada = {tipo: max(1, round(1 / fraccion)) if fraccion > 0 else 0
+                     for tipo, fraccion in (muestreo or {}).items()}
+        self.limites = {tipo: _LimiteTasa(tasa) for tipo, tasa in (limites or {}).items()}
+        self.tam_lote = tam_lote
+        self.intervalo = intervalo
+
+        self.vistos = {}
+        self.descartados = {}
+        self.escritos = 0
+        # Error del hilo escritor (p. ej. ruta no válida); desde entonces no se encola nada
+        self.error = None
+
+        self._cola = queue.Queue(max_cola)
+        self._hilo = None
+        if ruta:
+            self._hilo = threading.Thread(target=self._escribir, name="registro-eventos", daemon=True)
+            self._hilo.start()
+
+    @property
+    def activo(self):
+        return self._hilo is not None
+
+    def evento(self, tipo, nivel="info", **campos):
+        """
+        Registra un evento si pasa el nivel, el muestreo y el límite de su tipo.
+        Devuelve True si se encoló para escritura.
+        """
+        if self._hilo is None or self.error is not None or NIVELES[nivel] < self.nivel_minimo:
+            return False
+
+        n = self.vistos.get(tipo, 0)
+        self.vistos[tipo] = n + 1
+
+        cada = self.cada.get(tipo, 1)
+        limite = self.limites.get(tipo)
+        if cada == 0 or n % cada or (limite is not None and not limite.permitir()):
+            self.descartados[tipo] = self.descartados.get(tipo, 0) + 1
+            return False
+
+        try:
+            self._cola.put_nowait((time.time(), tipo, nivel, campos))
+        except queue.Full:
+            self.descartados[tipo] = self.descartados.get(tipo, 0) + 1
+            return False
+        return True
+
+    def _escribir(self):
+        """Hilo escritor: guarda el error si no puede abrir o escribir el archivo."""
+        try:
+            self._escribir_lotes()
+        except OSError as e:
+            self.error = e
+
+    def _escribir_lotes(self):
+        """Serializa y escribe los eventos por lotes hasta recibir _FIN."""
+        with open(self.ruta, "a", encoding="utf-8") as archivo:
+            terminar = False
+            while not terminar:
+                lote = []
+                try:
+                    lote.append(self._cola.get(timeout=self.intervalo))
+                    while len(lote) < self.tam_lote:
+                        lote.append(self._cola.get_nowait())
+                except queue.Empty:
+                    pass
+
+                if any(e is _FIN for e in lote):
+                    lote = [e for e in lote if e is not _FIN]
+                    terminar = True
+
+                lineas = []
+                for t, tipo, nivel, campos in lote:
+                    registro = {"t": round(t, 6), "tipo": tipo, "nivel": nivel}
+                    registro.update(campos)
+                    lineas.append(json.dumps(registro, ensure_ascii=False, default=str))
+                if lineas:
+                    archivo.write("\n".join(lineas) + "\n")
+                    archivo.flush()
+                    self.escritos += len(lineas)
+
+    def cerrar(self):
+        """
+        Escribe un resumen de los eventos descartados, vacía la cola y espera
+        al hilo escritor.
+        """
+        if self._hilo is None:
+            return
+        # Sin hilo escritor nadie vaciaría la cola: no se espera a meter nada
+        if self._hilo.is_alive():
+            if self.descartados:
+                self._cola.put((time.time(), "registro_descartes", "info", {"descartados": dict(self.descartados)}))
+            self._cola.put(_FIN)
+        self._hilo.join()
+        self._hilo = None
@@ -0,0 +1,160 @@
+"""
+Reproductor de trazas grabadas con traza.py.
+
+Cada cuadro se lee de la traza proyectada en memoria al mostrarlo, así que
+una corrida de varias horas se recorre con la memoria de un solo cuadro: el
+sistema operativo trae las páginas del intervalo que se ve y descarta las
+demás.
+
+    python reproductor.py corrida.traza
+"""
+
+import sys
+
+from PyQt6.QtCore import QPointF, QRectF, Qt, QTimer
+from PyQt6.QtGui import QBrush, QColor, QPainter, QPen, QPolygonF
+from PyQt6.QtWidgets import (
+    QApplication, QFileDialog, QGraphicsScene, QGraphicsView, QHBoxLayout,
+    QLabel, QMainWindow, QPushButton, QSlider, QVBoxLayout, QWidget
+)
+
+from llegadas import APROXIMACIONES
+from modelo import COLOR_EMERGENCIA, COLOR_GIRO_ESTE_OESTE, COLOR_GIRO_NORTE_SUR, COLOR_RECTO
+from traza import ESTADOS_SEMAFORO, Traza
+
+# Posición de las luces de cada aproximación en la escena de circulacion.py
+POSICION_SEMAFORO = {"Norte": (500, 200), "Sur": (400, 500), "Este": (600, 400), "Oeste": (300, 300)}
+COLORES_SEMAFORO = {"rojo": QColor(255, 0, 0), "amarillo": QColor(255, 255, 0), "verde": QColor(0, 255, 0)}
+
+# Periodo del temporizador de reproducción (ms)
+PERIODO = 50
+
+
+class ReproductorTraza(QMainWindow):
+    def __init__(self, traza):
+        super().__init__()
+        self.traza = traza
+        self.indice = 0
+        self.velocidad = 1.0
+        self.elementos = []
+
+        # Brochas por destino: recto, giro hacia Norte/Sur, giro hacia Este/Oeste;
+        # la última, para los vehículos de emergencia
+        self.brochas = [QBrush(QColor(*COLOR_RECTO)), QBrush(QColor(*COLOR_GIRO_NORTE_SUR)),
+                        QBrush(QColor(*COLOR_GIRO_ESTE_OESTE)), QBrush(QColor(*COLOR_EMERGENCIA))]
+        self.triangulo = QPolygonF([QPointF(0, -10), QPointF(20, 0), QPointF(0, 10)])
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.avanzar)
+
+        self.setup_ui()
+        self.mostrar(0)
+
+    def setup_ui(self):
+        self.setWindowTitle(f"Reproducción: {self.traza.ruta}")
+        self.setGeometry(100, 100, 1000, 800)
+
+        central_widget = QWidget()
+        self.setCentralWidget(central_widget)
+        layout = QVBoxLayout(central_widget)
+
+        self.scene = QGraphicsScene()
+        self.view = QGraphicsView(self.scene)
+        self.view.setRenderHint(QPainter.RenderHint.Antialiasing)
+        self.view.setSceneRect(QRectF(0, 0, 900, 700))
+        layout.addWidget(self.view)
+        self.dibujar_calles()
+
+        controles = QHBoxLayout()
+        self.play_button = QPushButton("Reproducir")
+        self.play_button.clicked.connect(self.alternar)
+        controles.addWidget(self.play_button)
+
+        self.slider = QSlider(Qt.Orientation.Horizontal)
+        self.slider.setRange(0, max(0, len(self.traza) - 1))
+        self.slider.valueChanged.connect(self.mostrar)
+        controles.addWidget(self.slider)
+
+        self.speed_slider = QSlider(Qt.Orientation.Horizontal)
+        self.speed_slider.setRange(1, 60)
+        self.speed_slider.setValue(1)
+        self.speed_slider.setMaximumWidth(120)
+        self.speed_slider.valueChanged.connect(self.cambiar_velocidad)
+        controles.addWidget(self.speed_slider)
+
+        self.tiempo_label = QLabel()
+        controles.addWidget(self.tiempo_label)
+        layout.addLayout(controles)
+
+    def dibujar_calles(self):
+        """Fondo fijo: se dibuja una vez y no se borra entre cuadros."""
+        self.scene.addRect(0, 315, 900, 70, QPen(Qt.GlobalColor.black), QBrush(Qt.GlobalColor.gray))
+        self.scene.addRect(415, 0, 70, 700, QPen(Qt.GlobalColor.black), QBrush(Qt.GlobalColor.gray))
+        pen = QPen(Qt.GlobalColor.white, 3, Qt.PenStyle.DashLine)
+        self.scene.addLine(0, 350, 900, 350, pen)
+        self.scene.addLine(450, 0, 450, 700, pen)
+        self.scene.addRect(415, 315, 70, 70, QPen(QColor(255, 0, 0), 2, Qt.PenStyle.DashLine))
+
+    def cambiar_velocidad(self, value):
+        self.velocidad = float(value)
+
+    def alternar(self):
+        if self.timer.isActive():
+            self.timer.stop()
+            self.play_button.setText("Reproducir")
+        else:
+            self.timer.start(PERIODO)
+            self.play_button.setText("Pausar")
+
+    def avanzar(self):
+        """Salta los cuadros que corresponden a PERIODO ms a la velocidad elegida."""
+        paso = max(1, round(PERIODO / 1000 * self.velocidad / self.traza.intervalo))
+        if self.indice + paso >= len(self.traza):
+            self.alternar()
+            return
+        self.slider.setValue(self.indice + paso)
+
+    def mostrar(self, indice):
+        """Dibuja los vehículos y semáforos del cuadro indice."""
+        if not len(self.traza):
+            return
+        self.indice = indice
+        t, fase, semaforos, registros = self.traza.cuadro(indice)
+
+        for elemento in self.elementos:
+            self.scene.removeItem(elemento)
+        self.elementos = []
+
+        negro = QPen(Qt.GlobalColor.black)
+        for aproximacion, estado in zip(APROXIMACIONES, semaforos.tolist()):
+            x, y = POSICION_SEMAFORO[aproximacion]
+            color = COLORES_SEMAFORO[ESTADOS_SEMAFORO[estado]]
+            self.elementos.append(self.scene.addEllipse(x, y, 25, 25, negro, QBrush(color)))
+
+        # Color como en modelo.Vehicle: emergencia, recto, o giro según el eje del destino
+        destinos_ns = [APROXIMACIONES.index("Norte"), APROXIMACIONES.index("Sur")]
+        for x, y, angulo, destino, giro, emergencia in zip(
+                registros["x"].tolist(), registros["y"].tolist(), registros["angulo"].tolist(),
+                registros["destino"].tolist(), registros["giro"].tolist(), registros["emergencia"].tolist()):
+            brocha = self.brochas[3 if emergencia else 0 if not giro else 1 if destino in destinos_ns else 2]
+            item = self.scene.addPolygon(self.triangulo, negro, brocha)
+            item.setPos(x, y)
+            item.setRotation(angulo)
+            self.elementos.append(item)
+
+        self.tiempo_label.setText(f"{t:8.1f} s  {fase}  {len(registros)} vehículos")
+
+
+def main():
+    app = QApplication(sys.argv)
+    ruta = sys.argv[1] if len(sys.argv) > 1 else QFileDialog.getOpenFileName(
+        None, "Abrir traza", "", "Trazas (*.traza);;Todos (*)")[0]
+    if not ruta:
+        return
+    ventana = ReproductorTraza(Traza(ruta))
+    ventana.show()
+    sys.exit(app.exec())
+
+
+if __name__ == "__main__":
+    main()
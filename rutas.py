@@ -0,0 +1,159 @@
+"""
+Cinemática de vehículos sobre rutas de puntos de paso.
+
+Una ruta es una polilínea cuyas longitudes de tramo, longitud acumulada,
+vectores unitarios y ángulos se calculan una sola vez al construirla. Los
+vehículos solo guardan la distancia recorrida sobre su ruta: avanzar es una
+suma y la posición en pantalla se obtiene interpolando en el tramo actual,
+sin raíces cuadradas ni objetos de Qt en cada paso.
+
+Las rutas de un cruce se construyen a partir de la geometría de sus
+carriles (segmentos de entrada y salida), así que sirven para cualquier
+disposición del cruce:
+
+    carriles = {"Norte": ((430, 0), (430, 700)), ...}
+    rutas = rutas_cruce(carriles)
+    x, y, angulo, tramo = rutas[("Norte", "Este")].posicion(distancia)
+"""
+
+import math
+from bisect import bisect_right
+
+import numpy as np
+
+from llegadas import MOVIMIENTOS
+
+# Carriles de circulacion.py (escena de 900 x 700): segmento de entrada de
+# cada aproximación, recorrido en el sentido de circulación
+CARRILES_CRUCE = {
+    "Norte": ((430, 0), (430, 700)),
+    "Sur": ((450, 700), (450, 0)),
+    "Este": ((0, 330), (900, 330)),
+    "Oeste": ((900, 350), (0, 350)),
+}
+
+# Carril por el que sale un vehículo que gira hacia cada destino (como en
+# get_display_position original: hacia "Este" se sale con x creciente y hacia
+# "Norte" con y decreciente)
+SALIDA_HACIA = {"Norte": "Sur", "Sur": "Norte", "Este": "Este", "Oeste": "Oeste"}
+
+
+class Ruta:
+    def __init__(self, puntos):
+        """
+        puntos: secuencia de (x, y). Los puntos repetidos (tramos de longitud
+        cero) se descartan.
+        """
+        puntos = np.asarray(puntos, dtype=float)
+        if puntos.ndim != 2 or puntos.shape[1] != 2 or len(puntos) < 2:
+            raise ValueError("Una ruta necesita al menos dos puntos (x, y)")
+
+        tramos = np.diff(puntos, axis=0)
+        longitudes = np.hypot(tramos[:, 0], tramos[:, 1])
+        validos = longitudes > 0
+        if not validos.any():
+            raise ValueError("La ruta no tiene longitud")
+
+        self.puntos = np.vstack((puntos[:1], puntos[1:][validos]))
+        self.longitudes = longitudes[validos]
+        self.acumulada = np.concatenate(([0.0], np.cumsum(self.longitudes)))
+        self.direcciones = tramos[validos] / self.longitudes[:, None]
+        self.angulos = np.degrees(np.arctan2(self.direcciones[:, 1], self.direcciones[:, 0])) % 360
+        self.longitud = float(self.acumulada[-1])
+
+        # Sentido del giro entre el primer y el último tramo (y crece hacia abajo)
+        (ax, ay), (bx, by) = self.direcciones[0], self.direcciones[-1]
+        cruz = float(ax * by - ay * bx)
+        self.giro = "recto" if abs(cruz) < 1e-9 else ("derecha" if cruz > 0 else "izquierda")
+
+        # Copias en listas de Python: para un solo vehículo son más rápidas que NumPy
+        self._inicios = self.acumulada[:-1].tolist()
+        self._x = self.puntos[:-1, 0].tolist()
+        self._y = self.puntos[:-1, 1].tolist()
+        self._dx = self.direcciones[:, 0].tolist()
+        self._dy = self.direcciones[:, 1].tolist()
+        self._angulos = self.angulos.tolist()
+
+    def __len__(self):
+        """Número de tramos"""
+        return len(self._inicios)
+
+    def tramo(self, distancia, tramo=0):
+        """
+        Índice del tramo que contiene la distancia. tramo es una pista (el
+        tramo del paso anterior): como los vehículos solo avanzan, casi
+        siempre basta con comprobar el mismo tramo o el siguiente.
+        """
+        inicios = self._inicios
+        ultimo = len(inicios) - 1
+        if tramo > ultimo or distancia < inicios[tramo]:
+            return max(0, bisect_right(inicios, distancia) - 1)
+        while tramo < ultimo and distancia >= inicios[tramo + 1]:
+            tramo += 1
+        return tramo
+
+    def posicion(self, distancia, tramo=0):
+        """
+        Devuelve (x, y, angulo, tramo) a la distancia indicada sobre la ruta.
+        Fuera de [0, longitud] se extrapola sobre el primer o el último tramo.
+        """
+        i = self.tramo(distancia, tramo)
+        d = distancia - self._inicios[i]
+        return self._x[i] + self._dx[i] * d, self._y[i] + self._dy[i] * d, self._angulos[i], i
+
+    def posiciones(self, distancias):
+        """Versión vectorizada de posicion(): (x, y, angulo) para un arreglo de distancias."""
+        distancias = np.asarray(distancias, dtype=float)
+        i = np.clip(np.searchsorted(self.acumulada, distancias, side="right") - 1, 0, len(self) - 1)
+        d = distancias - self.acumulada[i]
+        x = self.puntos[i, 0] + self.direcciones[i, 0] * d
+        y = self.puntos[i, 1] + self.direcciones[i, 1] * d
+        return x, y, self.angulos[i]
+
+
+def _corte(a0, a1, b0, b1):
+    """Punto de corte de las rectas a0-a1 y b0-b1, o None si son paralelas."""
+    ax, ay = a1[0] - a0[0], a1[1] - a0[1]
+    bx, by = b1[0] - b0[0], b1[1] - b0[1]
+    det = ax * by - ay * bx
+    if math.isclose(det, 0.0, abs_tol=1e-9):
+        return None
+    t = ((b0[0] - a0[0]) * by - (b0[1] - a0[1]) * bx) / det
+    return a0[0] + t * ax, a0[1] + t * ay
+
+
+def ruta_movimiento(entrada, salida):
+    """
+    Ruta que entra por el segmento entrada y sale por el segmento salida,
+    girando en el punto donde se cortan. Si son paralelos (movimiento recto
+    o cambio de carril) se unen los extremos directamente.
+    """
+    (a0, a1), (b0, b1) = entrada, salida
+    if entrada == salida:
+        return Ruta([a0, a1])
+    giro = _corte(a0, a1, b0, b1)
+    if giro is None:
+        return Ruta([a0, b1])
+    return Ruta([a0, giro, b1])
+
+
+def rutas_cruce(carriles=None, salida_hacia=None):
+    """
+    Construye las rutas de todos los movimientos de MOVIMIENTOS. El primer
+    destino de cada origen es el recto y sigue su propio carril.
+    carriles: dict aproximación -> (inicio, fin) del carril de entrada.
+    salida_hacia: dict destino -> aproximación cuyo carril se usa para salir
+        en los giros.
+    Devuelve un dict (origen, destino) -> Ruta.
+    """
+    carriles = carriles or CARRILES_CRUCE
+    salida_hacia = salida_hacia or SALIDA_HACIA
+    rutas = {}
+    for origen, (recto, *giros) in MOVIMIENTOS.items():
+        rutas[(origen, recto)] = ruta_movimiento(carriles[origen], carriles[origen])
+        for destino in giros:
+            rutas[(origen, destino)] = ruta_movimiento(carriles[origen], carriles[salida_hacia[destino]])
+    return rutas
+
+
+RUTAS_CRUCE = rutas_cruce()
@@ -0,0 +1,522 @@
+"""
+Semáforos de una intersección y su ciclo de fases, sin vehículos.
+
+CruceSenalizado guarda los semáforos vehiculares y peatonales, el ciclo de
+la red de Petri (una aproximación en verde cada vez, con priorización por
+carga) y el controlador de fases opcional (p. ej. nema.ControladorNEMA). No
+sabe cómo se mueve el tráfico: quien lo extiende rellena traffic_counts y
+demanda_movimientos() desde sus vehículos (motor.MotorSimulacion) o desde
+densidades de celdas (ctm.py), así ambos modelos usan los mismos
+controladores.
+"""
+
+from modelo import SemaforoPeatonal, SemaforoVehicular
+from registro import RegistroEventos
+
+
+class CruceSenalizado:
+    def __init__(self, registro=None):
+        # Registro de eventos (desactivado si no se indica uno)
+        self.registro = registro if registro is not None else RegistroEventos()
+
+        # Reloj de simulación (segundos), para fechar los cambios de fase
+        self.reloj = 0.0
+
+        # Inicializar semáforos vehiculares
+        self.semaforos_vehiculares = {
+            "Norte": SemaforoVehicular("Norte"),
+            "Sur": SemaforoVehicular("Sur"),
+            "Este": SemaforoVehicular("Este"),
+            "Oeste": SemaforoVehicular("Oeste")
+        }
+        self.semaforos_peatonales = self._crear_semaforos_peatonales()
+
+        # Controlador de fases: None usa el ciclo de la red de Petri (una
+        # aproximación en verde cada vez); p. ej. nema.ControladorNEMA
+        self.controlador = None
+
+        # Lista opcional donde se anotan los cambios de fase (reloj, estado)
+        # en el momento en que ocurren (exportar.py)
+        self.cambios_fase = None
+
+        # Preempción para vehículos de emergencia (preempcion.Preempcion); con
+        # None no hay preempción
+        self.preempcion = None
+
+        self.reiniciar()
+
+        # Configuración inicial de semáforos peatonales
+        self.semaforos_peatonales = self._crear_semaforos_peatonales()
+        peatonales_blancos = ["Sur_indirecto", "Oeste_directo", "Norte_directo", "Este_directo"]
+        for key in peatonales_blancos:
+            self.semaforos_peatonales[key].estado = "blanco"
+            self.semaforos_peatonales[key].tokens = {"blanco": 1, "rojo": 0}
+
+    def _crear_semaforos_peatonales(self):
+        semaforos_peatonales = {}
+        for carril in ["Norte", "Sur", "Este", "Oeste"]:
+            for tipo in ["directo", "indirecto"]:
+                key = f"{carril}_{tipo}"
+                semaforos_peatonales[key] = SemaforoPeatonal(carril, tipo)
+        return semaforos_peatonales
+
+    def reiniciar(self):
+        """
+        Vuelve los semáforos y los contadores de tráfico a su estado inicial
+        (Sur en verde con el ciclo de la red de Petri).
+        """
+        # Contadores de tráfico para cada carril
+        self.traffic_counts = {
+            "Norte": 0,
+            "Sur": 0,
+            "Este": 0,
+            "Oeste": 0
+        }
+
+        # Historial de flujo de tráfico para análisis
+        self.traffic_history = {
+            "Norte": [],
+            "Sur": [],
+            "Este": [],
+            "Oeste": []
+        }
+
+        # Variable para controlar priorización de dirección
+        self.prioritized_direction = None
+        self.priority_counter = 0
+        self.mensaje_prioridad = "Sin priorización de tráfico"
+
+        self._iniciar_semaforos()
+
+    def _iniciar_semaforos(self):
+        """Estado inicial de los semáforos según el controlador activo."""
+        for semaforo in self.semaforos_vehiculares.values():
+            semaforo.flechas = {"izquierda": "rojo", "derecha": "rojo"}
+        if self.controlador is not None:
+            self.controlador.iniciar(self)
+            return
+
+        # Todos los semáforos en rojo excepto el Sur, que comienza en verde
+        for direccion, semaforo in self.semaforos_vehiculares.items():
+            if direccion == "Sur":
+                semaforo.estado = "verde"
+                semaforo.tokens = {"verde": 1, "amarillo": 0, "rojo": 0}
+            else:
+                semaforo.estado = "rojo"
+                semaforo.tokens = {"verde": 0, "amarillo": 0, "rojo": 1}
+            semaforo.resetear_tiempo_verde()
+
+        # Reiniciar semáforos peatonales según la nueva lógica
+        carril_activo = "Sur"  # El semáforo Sur comienza en verde
+        rutas_vehiculos = self.calcular_rutas_vehiculos(carril_activo)
+        self.actualizar_semaforos_peatonales(carril_activo, rutas_vehiculos)
+
+        # Estado actual de la simulación e historial para la red de Petri
+        self.estado_actual = "Sur_verde"
+        self.contador = 0
+        self.mensaje_estado = "Estado: Sur en verde"
+        self.state_history = ["Sur_verde"]
+
+    def usar_controlador(self, controlador):
+        """
+        Cambia el controlador de fases (None vuelve al ciclo de la red de
+        Petri) y reinicia los semáforos. Los vehículos se conservan.
+        """
+        self.controlador = controlador
+        self._iniciar_semaforos()
+
+    def demanda_movimientos(self):
+        """
+        Vehículos detectados esperando cada movimiento, como dict
+        (aproximación, "recto" | "izquierda") -> cantidad. Sin detectores no
+        hay demanda y los controladores actuados sirven solo sus fases de recuerdo.
+        """
+        return {}
+
+    def analyze_traffic_load(self):
+        """
+        Analiza la carga de tráfico actual y ajusta el timing de los semáforos
+        """
+        # Encontrar dirección con mayor carga de tráfico
+        max_load = 0
+        busiest_direction = None
+
+        for direction, count in self.traffic_counts.items():
+            if count > max_load:
+                max_load = count
+                busiest_direction = direction
+
+        # Si hay una dirección con carga significativamente mayor
+        total_vehicles = sum(self.traffic_counts.values())
+        if total_vehicles > 0 and max_load >= 5 and max_load / total_vehicles >= 0.4:
+            self.prioritize_direction(busiest_direction)
+            return True
+
+        # Si no hay dirección con mucho tráfico, quitar priorización
+        if self.prioritized_direction:
+            self.prioritized_direction = None
+            self.priority_counter = 0
+            self.mensaje_prioridad = "Sin priorización de tráfico"
+            # Restablecer tiempos normales
+            for direction, semaforo in self.semaforos_vehiculares.items():
+                semaforo.resetear_tiempo_verde()
+
+        return False
+
+    def prioritize_direction(self, direction):
+        """
+        Ajusta la secuencia de luces para priorizar una dirección con alto tráfico
+        """
+        # Si es una nueva dirección a priorizar o ha pasado tiempo suficiente
+        if direction != self.prioritized_direction or self.priority_counter >= 5:
+            # Actualizar dirección priorizada
+            self.prioritized_direction = direction
+            self.priority_counter = 0
+
+            # Actualizar etiqueta
+            self.mensaje_prioridad = f"Priorización de tráfico: {direction} ({self.traffic_counts[direction]} vehículos)"
+
+            # Extender tiempo en verde para esta dirección
+            semaforo = self.semaforos_vehiculares.get(direction)
+            if semaforo:
+                extended = semaforo.extender_tiempo_verde()
+                if extended:
+                    self.registro.evento("extension_verde", direccion=direction,
+                                         vehiculos=self.traffic_counts[direction],
+                                         tiempo_verde=semaforo.tiempo_verde)
+        else:
+            # Incrementar contador para esta dirección
+            self.priority_counter += 1
+
+    def actualizar_simulacion(self):
+        """
+        Actualiza el estado de los semáforos vehiculares y peatonales según la lógica de la red de Petri
+        y considerando posibles rutas de vehículos para los estados peatonales.
+        Devuelve True si cambió el estado o el contador de la red de Petri.
+        """
+        # Guardar estado anterior para actualizar el historial
+        prev_state = self.estado_actual
+        prev_contador = self.contador
+
+        # Durante una preempción el plan queda suspendido
+        if self.preempcion is not None and self.preempcion.activa:
+            return False
+
+        # Controlador externo (p. ej. doble anillo NEMA)
+        if self.controlador is not None:
+            cambio = self.controlador.actualizar(self)
+            if prev_state != self.estado_actual:
+                self._anotar_cambio(prev_state)
+            return cambio or prev_contador != self.contador
+
+        # Analizar carga de tráfico para priorizar direcciones
+        self.analyze_traffic_load()
+
+        # Determinar el carril activo (con semáforo en verde)
+        carril_activo = None
+        for direccion, semaforo in self.semaforos_vehiculares.items():
+            if semaforo.estado == "verde":
+                carril_activo = direccion
+                break
+
+        # === ACTUALIZACIÓN DE ESTADOS DEL CICLO DE SEMÁFOROS ===
+        if self.estado_actual == "Sur_verde":
+            if self.contador == 0 and (self.prioritized_direction != "Sur" or
+                                    self.semaforos_vehiculares["Sur"].tiempo_verde <= 1):
+                self.mensaje_estado = "Estado: Sur en verde"
+                self.contador += 1
+            elif self.contador < self.semaforos_vehiculares["Sur"].tiempo_verde - 1:
+                self.mensaje_estado = f"Estado: Sur en verde (extendido {self.contador+1}/{self.semaforos_vehiculares['Sur'].tiempo_verde})"
+                self.contador += 1
+            else:
+                # Cambiar a amarillo
+                self.semaforos_vehiculares["Sur"].cambiar_estado("amarillo")
+                self.semaforos_vehiculares["Sur"].agregar_token("amarillo")
+                self.semaforos_vehiculares["Sur"].quitar_token("verde")
+                self.mensaje_estado = "Estado: Sur cambia a amarillo"
+                self.estado_actual = "Sur_amarillo"
+                self.contador = 0
+                # Resetear tiempo extendido
+                self.semaforos_vehiculares["Sur"].resetear_tiempo_verde()
+
+                # Añadir nuevo estado al historial
+                self.state_history.append("Sur_amarillo")
+
+        elif self.estado_actual == "Sur_amarillo":
+            # Cambiar a rojo
+            self.semaforos_vehiculares["Sur"].cambiar_estado("rojo")
+            self.semaforos_vehiculares["Sur"].agregar_token("rojo")
+            self.semaforos_vehiculares["Sur"].quitar_token("amarillo")
+
+            # Activar semáforo Oeste
+            self.semaforos_vehiculares["Oeste"].cambiar_estado("verde")
+            self.semaforos_vehiculares["Oeste"].agregar_token("verde")
+            self.semaforos_vehiculares["Oeste"].quitar_token("rojo")
+
+            self.mensaje_estado = "Estado: Sur cambia a rojo, Oeste cambia a verde"
+            self.estado_actual = "Oeste_verde"
+            self.contador = 0
+
+            # Añadir nuevo estado al historial
+            self.state_history.append("Oeste_verde")
+
+        elif self.estado_actual == "Oeste_verde":
+            if self.contador == 0 and (self.prioritized_direction != "Oeste" or
+                                    self.semaforos_vehiculares["Oeste"].tiempo_verde <= 1):
+                self.mensaje_estado = "Estado: Oeste en verde"
+                self.contador += 1
+            elif self.contador < self.semaforos_vehiculares["Oeste"].tiempo_verde - 1:
+                self.mensaje_estado = f"Estado: Oeste en verde (extendido {self.contador+1}/{self.semaforos_vehiculares['Oeste'].tiempo_verde})"
+                self.contador += 1
+            else:
+                # Cambiar a amarillo
+                self.semaforos_vehiculares["Oeste"].cambiar_estado("amarillo")
+                self.semaforos_vehiculares["Oeste"].agregar_token("amarillo")
+                self.semaforos_vehiculares["Oeste"].quitar_token("verde")
+                self.mensaje_estado = "Estado: Oeste cambia a amarillo"
+                self.estado_actual = "Oeste_amarillo"
+                self.contador = 0
+                # Resetear tiempo extendido
+                self.semaforos_vehiculares["Oeste"].resetear_tiempo_verde()
+
+                # Añadir nuevo estado al historial
+                self.state_history.append("Oeste_amarillo")
+
+        elif self.estado_actual == "Oeste_amarillo":
+            # Cambiar a rojo
+            self.semaforos_vehiculares["Oeste"].cambiar_estado("rojo")
+            self.semaforos_vehiculares["Oeste"].agregar_token("rojo")
+            self.semaforos_vehiculares["Oeste"].quitar_token("amarillo")
+
+            # Activar semáforo Norte
+            self.semaforos_vehiculares["Norte"].cambiar_estado("verde")
+            self.semaforos_vehiculares["Norte"].agregar_token("verde")
+            self.semaforos_vehiculares["Norte"].quitar_token("rojo")
+
+            self.mensaje_estado = "Estado: Oeste cambia a rojo, Norte cambia a verde"
+            self.estado_actual = "Norte_verde"
+            self.contador = 0
+
+            # Añadir nuevo estado al historial
+            self.state_history.append("Norte_verde")
+
+        elif self.estado_actual == "Norte_verde":
+            if self.contador == 0 and (self.prioritized_direction != "Norte" or
+                                    self.semaforos_vehiculares["Norte"].tiempo_verde <= 1):
+                self.mensaje_estado = "Estado: Norte en verde"
+                self.contador += 1
+            elif self.contador < self.semaforos_vehiculares["Norte"].tiempo_verde - 1:
+                self.mensaje_estado = f"Estado: Norte en verde (extendido {self.contador+1}/{self.semaforos_vehiculares['Norte'].tiempo_verde})"
+                self.contador += 1
+            else:
+                # Cambiar a amarillo
+                self.semaforos_vehiculares["Norte"].cambiar_estado("amarillo")
+                self.semaforos_vehiculares["Norte"].agregar_token("amarillo")
+                self.semaforos_vehiculares["Norte"].quitar_token("verde")
+                self.mensaje_estado = "Estado: Norte cambia a amarillo"
+                self.estado_actual = "Norte_amarillo"
+                self.contador = 0
+                # Resetear tiempo extendido
+                self.semaforos_vehiculares["Norte"].resetear_tiempo_verde()
+
+                # Añadir nuevo estado al historial
+                self.state_history.append("Norte_amarillo")
+
+        elif self.estado_actual == "Norte_amarillo":
+            # Cambiar a rojo
+            self.semaforos_vehiculares["Norte"].cambiar_estado("rojo")
+            self.semaforos_vehiculares["Norte"].agregar_token("rojo")
+            self.semaforos_vehiculares["Norte"].quitar_token("amarillo")
+
+            # Activar semáforo Este
+            self.semaforos_vehiculares["Este"].cambiar_estado("verde")
+            self.semaforos_vehiculares["Este"].agregar_token("verde")
+            self.semaforos_vehiculares["Este"].quitar_token("rojo")
+
+            self.mensaje_estado = "Estado: Norte cambia a rojo, Este cambia a verde"
+            self.estado_actual = "Este_verde"
+            self.contador = 0
+
+            # Añadir nuevo estado al historial
+            self.state_history.append("Este_verde")
+
+        elif self.estado_actual == "Este_verde":
+            if self.contador == 0 and (self.prioritized_direction != "Este" or
+                                    self.semaforos_vehiculares["Este"].tiempo_verde <= 1):
+                self.mensaje_estado = "Estado: Este en verde"
+                self.contador += 1
+            elif self.contador < self.semaforos_vehiculares["Este"].tiempo_verde - 1:
+                self.mensaje_estado = f"Estado: Este en verde (extendido {self.contador+1}/{self.semaforos_vehiculares['Este'].tiempo_verde})"
+                self.contador += 1
+            else:
+                # Cambiar a amarillo
+                self.semaforos_vehiculares["Este"].cambiar_estado("amarillo")
+                self.semaforos_vehiculares["Este"].agregar_token("amarillo")
+                self.semaforos_vehiculares["Este"].quitar_token("verde")
+                self.mensaje_estado = "Estado: Este cambia a amarillo"
+                self.estado_actual = "Este_amarillo"
+                self.contador = 0
+                # Resetear tiempo extendido
+                self.semaforos_vehiculares["Este"].resetear_tiempo_verde()
+
+                # Añadir nuevo estado al historial
+                self.state_history.append("Este_amarillo")
+
+        elif self.estado_actual == "Este_amarillo":
+            # Cambiar a rojo
+            self.semaforos_vehiculares["Este"].cambiar_estado("rojo")
+            self.semaforos_vehiculares["Este"].agregar_token("rojo")
+            self.semaforos_vehiculares["Este"].quitar_token("amarillo")
+
+            # Activar semáforo Sur para completar el ciclo
+            self.semaforos_vehiculares["Sur"].cambiar_estado("verde")
+            self.semaforos_vehiculares["Sur"].agregar_token("verde")
+            self.semaforos_vehiculares["Sur"].quitar_token("rojo")
+
+            self.mensaje_estado = "Estado: Este cambia a rojo, Sur cambia a verde"
+            self.estado_actual = "Sur_verde"
+            self.contador = 0
+
+            # Añadir nuevo estado al historial
+            self.state_history.append("Sur_verde")
+
+        # === ACTUALIZACIÓN DE LOS SEMÁFOROS PEATONALES USANDO LA NUEVA LÓGICA ===
+        if carril_activo:
+            # Calcular rutas de vehículos posibles para el carril activo
+            rutas_vehiculos = self.calcular_rutas_vehiculos(carril_activo)
+            
+            # Actualizar estados de semáforos peatonales
+            self.actualizar_semaforos_peatonales(carril_activo, rutas_vehiculos)
+
+        if prev_state != self.estado_actual:
+            self._anotar_cambio(prev_state)
+
+        return prev_state != self.estado_actual or prev_contador != self.contador
+
+    def terminar_amarillo(self):
+        """
+        Termina el amarillo en curso sin avanzar el resto del ciclo (al volver
+        de una preempción, cuyo despeje ya lo cubrió). Un controlador pasa a
+        rojo sus anillos en amarillo; la red de Petri, que no tiene rojo
+        general, dispara su transición de amarillo a la siguiente aproximación.
+        """
+        anterior = self.estado_actual
+        if self.controlador is not None:
+            self.controlador.terminar_amarillo(self)
+            estado = self.controlador.estado()
+            if estado != anterior:
+                self.mensaje_estado = f"Estado: {estado}"
+                self.estado_actual = estado
+                self.state_history.append(estado)
+                self._anotar_cambio(anterior)
+        elif anterior.endswith("_amarillo"):
+            self.actualizar_simulacion()
+
+    def _anotar_cambio(self, anterior):
+        """Registra el cambio de fase y lo añade a cambios_fase si se pidió."""
+        self.registro.evento("cambio_fase", anterior=anterior, estado=self.estado_actual,
+                             reloj=round(self.reloj, 3))
+        if self.cambios_fase is not None:
+            self.cambios_fase.append((self.reloj, self.estado_actual))
+
+    def calcular_rutas_vehiculos(self, carril_activo):
+        """
+        Calcula las posibles rutas de los vehículos en el carril activo.
+        """
+        movimientos_posibles = {
+            'Norte': ['Norte', 'Este', 'Oeste'],
+            'Sur': ['Sur', 'Este', 'Oeste'],
+            'Este': ['Este', 'Norte', 'Sur'],
+            'Oeste': ['Oeste', 'Norte', 'Sur']
+        }
+        
+        return movimientos_posibles.get(carril_activo, [])
+
+    def actualizar_semaforos_peatonales(self, carril_activo, rutas_vehiculos):
+        """
+        Actualiza los estados de los semáforos peatonales basado en el carril activo
+        y las posibles rutas de vehículos.
+        """
+        # Mapeo de nombres de semáforos peatonales en el código original a la nomenclatura actual
+        # Original: Norte_A, Norte_B, etc.
+        # Actual: Norte_directo, Norte_indirecto, etc.
+        mapeo_nombres = {
+            'Norte_A': 'Norte_directo',
+            'Norte_B': 'Norte_indirecto',
+            'Sur_A': 'Sur_directo',
+            'Sur_B': 'Sur_indirecto',
+            'Este_A': 'Este_directo',
+            'Este_B': 'Este_indirecto',
+            'Oeste_A': 'Oeste_directo',
+            'Oeste_B': 'Oeste_indirecto'
+        }
+        
+        # Mapeo inverso para facilitar la lógica
+        mapeo_inverso = {v: k for k, v in mapeo_nombres.items()}
+        
+        # Definir bloqueos para los pasos peatonales basados en rutas de vehículos
+        bloqueos_paso_b = {
+            'Norte': {
+                'Norte': ['Norte_B'],  # Recto bloquea su propio paso B
+                'Este': ['Este_B'],    # Giro a la derecha bloquea el paso B del Este
+                'Oeste': ['Oeste_B']   # Giro a la izquierda bloquea el paso B del Oeste
+            },
+            'Sur': {
+                'Sur': ['Sur_B'],      # Recto bloquea su propio paso B
+                'Este': ['Este_B'],    # Giro a la derecha bloquea el paso B del Este
+                'Oeste': ['Oeste_B']   # Giro a la izquierda bloquea el paso B del Oeste
+            },
+            'Este': {
+                'Este': ['Este_B'],    # Recto bloquea su propio paso B
+                'Norte': ['Norte_B'],  # Giro a la derecha bloquea el paso B del Norte
+                'Sur': ['Sur_B']       # Giro a la izquierda bloquea el paso B del Sur
+            },
+            'Oeste': {
+                'Oeste': ['Oeste_B'],  # Recto bloquea su propio paso B
+                'Norte': ['Norte_B'],  # Giro a la derecha bloquea el paso B del Norte
+                'Sur': ['Sur_B']       # Giro a la izquierda bloquea el paso B del Sur
+            }
+        }
+        
+        # Para cada semáforo peatonal, determinar si debe estar activo o inactivo
+        for nombre_actual, semaforo in self.semaforos_peatonales.items():
+            # Obtener el nombre equivalente en la nueva nomenclatura
+            nombre_original = mapeo_inverso.get(nombre_actual)
+            if nombre_original:
+                direccion, tipo = nombre_original.split('_')
+                
+                # Para los pasos tipo A (directos), solo están activos cuando su semáforo está en rojo
+                if tipo == 'A':
+                    if direccion == carril_activo:
+                        # Si el carril de este semáforo está en verde, el paso peatonal está inactivo
+                        semaforo.cambiar_estado("rojo")
+                        semaforo.agregar_token("rojo")
+                        semaforo.quitar_token("blanco")
+                    else:
+                        # Si el carril de este semáforo está en rojo, el paso peatonal está activo
+                        semaforo.cambiar_estado("blanco")
+                        semaforo.agregar_token("blanco")
+                        semaforo.quitar_token("rojo")
+                
+                # Para los pasos tipo B (indirectos), depende de las rutas de vehículos
+                else:  # tipo == 'B'
+                    # Verificar si este paso está bloqueado por alguna ruta activa
+                    bloqueado = False
+                    
+                    # Solo considerar bloqueos si el origen es el carril activo
+                    if carril_activo in bloqueos_paso_b:
+                        for destino in rutas_vehiculos:
+                            if destino in bloqueos_paso_b[carril_activo]:
+                                pasos_bloqueados = bloqueos_paso_b[carril_activo][destino]
+                                if nombre_original in pasos_bloqueados:
+                                    bloqueado = True
+                                    break
+                    
+                    if bloqueado:
+                        semaforo.cambiar_estado("rojo")
+                        semaforo.agregar_token("rojo")
+                        semaforo.quitar_token("blanco")
+                    else:
+                        semaforo.cambiar_estado("blanco")
+                        semaforo.agregar_token("blanco")
+                        semaforo.quitar_token("rojo")
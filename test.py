@@ -7,87 +7,53 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtCore import Qt, QTimer, QRectF, QPointF
 from PyQt6.QtGui import QBrush, QPen, QColor, QFont, QPainter, QPolygonF
 
+from rutas import Ruta
+
+# Puntos clave de la ruta según dirección y tipo de movimiento
+RUTAS = {
+    ("Norte", "frente"): Ruta([(350, 500), (350, 250), (350, 0)]),
+    ("Norte", "derecha"): Ruta([(350, 500), (350, 300), (450, 300), (700, 300)]),
+    ("Norte", "izquierda"): Ruta([(350, 500), (350, 300), (250, 300), (0, 300)]),
+    ("Sur", "frente"): Ruta([(325, 0), (325, 250), (325, 500)]),
+    ("Sur", "derecha"): Ruta([(325, 0), (325, 200), (225, 200), (0, 200)]),
+    ("Sur", "izquierda"): Ruta([(325, 0), (325, 200), (425, 200), (700, 200)]),
+    ("Este", "frente"): Ruta([(0, 250), (325, 250), (700, 250)]),
+    ("Este", "derecha"): Ruta([(0, 250), (300, 250), (300, 350), (300, 500)]),
+    ("Este", "izquierda"): Ruta([(0, 250), (300, 250), (300, 150), (300, 0)]),
+    ("Oeste", "frente"): Ruta([(700, 225), (350, 225), (0, 225)]),
+    ("Oeste", "derecha"): Ruta([(700, 225), (400, 225), (400, 325), (400, 500)]),
+    ("Oeste", "izquierda"): Ruta([(700, 225), (400, 225), (400, 125), (400, 0)]),
+}
+
 class Vehiculo:
     def __init__(self, direccion, tipo_movimiento):
         self.direccion = direccion  # Dirección de origen (Norte, Sur, Este, Oeste)
         self.tipo_movimiento = tipo_movimiento  # 'frente', 'derecha', 'izquierda'
-        self.posicion = self.get_posicion_inicial()
         self.velocidad = 10
         self.detenido = True
         self.fuera_de_pantalla = False
         self.color = QColor(random.randint(50, 255), random.randint(50, 255), random.randint(50, 255))
 
         # Definir ruta basada en dirección y tipo de movimiento
-        self.ruta = self.definir_ruta()
-        self.indice_ruta = 0
-
-    def get_posicion_inicial(self):
-        if self.direccion == "Norte":
-            return QPointF(350, 500)  # Aparece en el borde inferior
-        elif self.direccion == "Sur":
-            return QPointF(325, 0)     # Aparece en el borde superior
-        elif self.direccion == "Este":
-            return QPointF(0, 250)     # Aparece en el borde izquierdo
-        elif self.direccion == "Oeste":
-            return QPointF(700, 225)   # Aparece en el borde derecho
-
-    def definir_ruta(self):
-        # Definir puntos clave en la ruta según dirección y tipo de movimiento
-        if self.direccion == "Norte":
-            if self.tipo_movimiento == "frente":
-                return [QPointF(350, 500), QPointF(350, 250), QPointF(350, 0)]
-            elif self.tipo_movimiento == "derecha":
-                return [QPointF(350, 500), QPointF(350, 300), QPointF(450, 300), QPointF(700, 300)]
-            elif self.tipo_movimiento == "izquierda":
-                return [QPointF(350, 500), QPointF(350, 300), QPointF(250, 300), QPointF(0, 300)]
-
-        elif self.direccion == "Sur":
-            if self.tipo_movimiento == "frente":
-                return [QPointF(325, 0), QPointF(325, 250), QPointF(325, 500)]
-            elif self.tipo_movimiento == "derecha":
-                return [QPointF(325, 0), QPointF(325, 200), QPointF(225, 200), QPointF(0, 200)]
-            elif self.tipo_movimiento == "izquierda":
-                return [QPointF(325, 0), QPointF(325, 200), QPointF(425, 200), QPointF(700, 200)]
-
-        elif self.direccion == "Este":
-            if self.tipo_movimiento == "frente":
-                return [QPointF(0, 250), QPointF(325, 250), QPointF(700, 250)]
-            elif self.tipo_movimiento == "derecha":
-                return [QPointF(0, 250), QPointF(300, 250), QPointF(300, 350), QPointF(300, 500)]
-            elif self.tipo_movimiento == "izquierda":
-                return [QPointF(0, 250), QPointF(300, 250), QPointF(300, 150), QPointF(300, 0)]
-
-        elif self.direccion == "Oeste":
-            if self.tipo_movimiento == "frente":
-                return [QPointF(700, 225), QPointF(350, 225), QPointF(0, 225)]
-            elif self.tipo_movimiento == "derecha":
-                return [QPointF(700, 225), QPointF(400, 225), QPointF(400, 325), QPointF(400, 500)]
-            elif self.tipo_movimiento == "izquierda":
-                return [QPointF(700, 225), QPointF(400, 225), QPointF(400, 125), QPointF(400, 0)]
+        self.ruta = RUTAS[(self.direccion, self.tipo_movimiento)]
+        self.distancia = 0.0  # Distancia recorrida sobre la ruta
+        self.indice_ruta = 0  # Tramo actual de la ruta
+        self.posicion = QPointF(*self.ruta.puntos[0])
 
     def mover(self, semaforo_verde):
         # Verificar si el semáforo de su dirección está en verde
         if self.direccion == semaforo_verde or (self.indice_ruta > 1 and not self.detenido):
             self.detenido = False
 
-        if not self.detenido and self.indice_ruta < len(self.ruta) - 1:
-            # Mover hacia el siguiente punto en la ruta
-            objetivo = self.ruta[self.indice_ruta + 1]
-            dx = objetivo.x() - self.posicion.x()
-            dy = objetivo.y() - self.posicion.y()
-            distancia = (dx**2 + dy**2)**0.5
-
-            if distancia < self.velocidad:
-                self.posicion = objetivo
-                self.indice_ruta += 1
-            else:
-                self.posicion.setX(self.posicion.x() + (dx / distancia) * self.velocidad)
-                self.posicion.setY(self.posicion.y() + (dy / distancia) * self.velocidad)
-
-        # Verificar si ha salido de la pantalla
-        if (self.posicion.x() < 0 or self.posicion.x() > 700 or
-            self.posicion.y() < 0 or self.posicion.y() > 500):
-            self.fuera_de_pantalla = True
+        if not self.detenido and not self.fuera_de_pantalla:
+            # Avanzar sobre la ruta precalculada e interpolar la posición
+            self.distancia += self.velocidad
+            x, y, _, self.indice_ruta = self.ruta.posicion(self.distancia, self.indice_ruta)
+            self.posicion = QPointF(x, y)
+
+            # Al terminar la ruta ha salido de la pantalla
+            if self.distancia >= self.ruta.longitud:
+                self.fuera_de_pantalla = True
 
     def dibujar(self, scene):
         # Dibujar un triángulo orientado según la dirección
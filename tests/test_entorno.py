@@ -0,0 +1,27 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from entorno import EntornoCruce
+
+
+def test_cada_step_es_un_paso_del_controlador():
+    # Los temporizadores del motor acumulan error de redondeo; pasada media
+    # hora simulada un step() daba cero o dos pasos del controlador
+    entorno = EntornoCruce(semilla=1, densidad=4, duracion=10 ** 9)
+    entorno.reset()
+    motor = entorno.motor
+    pasos = []
+    original = motor.actualizar_simulacion
+
+    def contar():
+        pasos[-1] += 1
+        return original()
+
+    motor.actualizar_simulacion = contar
+    for i in range(2000):
+        pasos.append(0)
+        entorno.step(i // 8 % 4)
+
+    assert [i for i, n in enumerate(pasos) if n != 1] == []
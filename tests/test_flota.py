@@ -0,0 +1,60 @@
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flota import FlotaVehiculos
+from modelo import Vehicle
+
+
+def _comprobar_indices(flota):
+    for indice, vehicle in enumerate(flota):
+        assert vehicle.indice_flota == indice
+        assert vehicle in flota
+
+
+def test_crear_y_liberar_intercalados():
+    azar = random.Random(1)
+    flota = FlotaVehiculos(Vehicle, max_libres=5)
+    activos, retirados = [], []
+    for _ in range(500):
+        if activos and azar.random() < 0.45:
+            vehicle = activos.pop(azar.randrange(len(activos)))
+            assert flota.liberar(vehicle)
+            assert vehicle not in flota and vehicle.indice_flota == -1
+            assert not flota.liberar(vehicle)
+            retirados.append(vehicle)
+        else:
+            activos.append(flota.crear(azar.choice(("Norte", "Sur", "Este", "Oeste")), 0))
+        _comprobar_indices(flota)
+        assert len(flota) == len(activos)
+        assert set(map(id, flota)) == set(map(id, activos))
+        assert flota.libres() <= flota.max_libres
+    assert not any(v in flota for v in retirados if v not in activos)
+
+    flota.clear()
+    assert len(flota) == 0 and not flota
+    assert flota.libres() == flota.max_libres
+    assert all(v.indice_flota == -1 and v not in flota for v in activos)
+
+
+def test_registro_reutilizado_queda_como_nuevo():
+    flota = FlotaVehiculos(Vehicle)
+    vehicle = flota.crear("Norte", 0, "Este")
+    vehicle.emergencia = True
+    vehicle.reserva = 3
+    vehicle.fase = "φ2_verde"
+    vehicle.demora = 12.5
+    vehicle.paradas = 2
+    vehicle.detenido = True
+    vehicle.distancia = 80.0
+    vehicle.id_vehiculo = 41
+    flota.liberar(vehicle)
+
+    reutilizado = flota.crear("Sur", 0)
+    assert reutilizado is vehicle and flota.libres() == 0
+    nuevo = Vehicle("Sur", 0)
+    esperado = {k: v for k, v in vars(nuevo).items() if k != "indice_flota"}
+    assert {k: v for k, v in vars(reutilizado).items() if k != "indice_flota"} == esperado
+    assert reutilizado.indice_flota == 0
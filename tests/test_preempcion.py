@@ -0,0 +1,47 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from motor import PASO_VEHICULOS, MotorSimulacion
+from nema import ControladorNEMA
+
+
+def _senales(motor):
+    return {(d, g): s.estado if g == "recto" else s.flechas[g]
+            for d, s in motor.semaforos_vehiculares.items() for g in ("recto", "izquierda", "derecha")}
+
+
+def test_nema_con_preempcion_no_salta_el_amarillo():
+    # Con la semilla 1 la preempción se reanuda en t=729.2 con un anillo en
+    # amarillo; antes el plan avanzaba varios pasos en ese instante y el otro
+    # anillo pasaba por un amarillo de duración cero
+    motor = MotorSimulacion(1)
+    motor.usar_controlador(ControladorNEMA())
+    motor.set_auto_traffic(6)
+    motor.cambios_fase = [(0.0, motor.estado_actual)]
+    azar = motor.flujos.flujo("emergencias")
+
+    anterior = _senales(motor)
+    # Un vehículo de emergencia cada 30 s
+    for paso in range(1, int(900 / PASO_VEHICULOS) + 1):
+        motor.correr(PASO_VEHICULOS)
+        actual = _senales(motor)
+        for senal, estado in actual.items():
+            assert not (anterior[senal] == "verde" and estado == "rojo"), (senal, motor.reloj)
+        anterior = actual
+        if paso % 600 == 0:
+            motor.add_vehicle(str(azar.choice(("Norte", "Sur", "Este", "Oeste"))), emergencia=True)
+    assert motor.metricas.resumen()["preempcion"]["solicitudes"] >= 25
+
+    # Cada anillo sale del verde por un amarillo que dura al menos un paso
+    anillos = [None] * len(motor.controlador.anillos)
+    for t, estado in motor.cambios_fase:
+        for i, parte in enumerate(estado.split(" + ")):
+            fase, intervalo = parte.split("_")
+            if anillos[i] is None or anillos[i][1:] != (fase, intervalo):
+                if anillos[i] is not None:
+                    t0, fase0, intervalo0 = anillos[i]
+                    assert intervalo0 != "verde" or intervalo == "amarillo", (t, estado)
+                    assert intervalo0 != "amarillo" or t - t0 >= PASO_VEHICULOS - 1e-9, (t, estado)
+                anillos[i] = (t, fase, intervalo)
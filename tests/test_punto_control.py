@@ -0,0 +1,63 @@
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from carriles import configuracion_uniforme
+from motor import HORIZONTE_LLEGADAS, MotorSimulacion
+from nema import ControladorNEMA
+from punto_control import capturar, ramificar, restaurar
+
+
+def _continuar(motor):
+    motor.correr(120)
+    return (motor.metricas.resumen(), motor.total_salidos, motor.reloj,
+            [(v.id_vehiculo, v.distancia) for v in motor.vehicles])
+
+
+@pytest.fixture(scope="module", params=["ciclo", "nema", "carriles"])
+def corrida(request):
+    """Motor calentado, su punto de control y la continuación original."""
+    motor = MotorSimulacion(7)
+    if request.param == "nema":
+        motor.usar_controlador(ControladorNEMA())
+    elif request.param == "carriles":
+        motor.usar_carriles(configuracion_uniforme(2, bahia_izquierda=120))
+    motor.set_auto_traffic(4)
+    # La continuación cruza la hora en que se sortean más llegadas, así que
+    # también depende del estado guardado de los flujos aleatorios
+    motor.correr(HORIZONTE_LLEGADAS - 60)
+    punto = capturar(motor)
+    return motor, punto, _continuar(motor)
+
+
+def test_continuacion_identica_en_el_mismo_motor(corrida):
+    motor, punto, original = corrida
+    assert original[3]
+    assert _continuar(restaurar(motor, punto)) == original
+
+
+def test_continuacion_identica_en_un_motor_nuevo(corrida):
+    _, punto, original = corrida
+    assert _continuar(restaurar(MotorSimulacion(7), punto)) == original
+
+
+def _dormir(motor, segundos):
+    time.sleep(segundos)
+    return segundos
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="ramificar usa fork()")
+def test_ramificar_con_limite_conserva_el_orden():
+    # Con dos procesos la variante lenta agota el límite mientras la
+    # siguiente ya terminó, y la última ni siquiera llega a lanzarse
+    motor = MotorSimulacion(1)
+    inicio = time.perf_counter()
+    resultados = ramificar(motor, [0.01, 5.0, 0.02, 0.03], _dormir, procesos=2, limite=0.5)
+    assert time.perf_counter() - inicio < 1.0
+    assert resultados == [0.01, None, 0.02, None]
+
+    assert ramificar(motor, [5.0, 0.01, 0.02], _dormir, procesos=3, limite=0.5) == [None, 0.01, 0.02]
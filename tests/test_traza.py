@@ -0,0 +1,23 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from motor import MotorSimulacion
+from traza import GrabadorTraza, Traza
+
+
+def test_grabar_termina_con_un_cuadro_por_intervalo(tmp_path):
+    # Con intervalo 0.2 la suma de pasos de 0.05 s se queda por debajo del
+    # fin pedido; antes el bucle seguía llamando a correr sin avanzar
+    motor = MotorSimulacion(3)
+    motor.set_auto_traffic(5)
+    ruta = tmp_path / "corrida.traza"
+    grabador = GrabadorTraza(str(ruta), intervalo=0.2)
+    grabador.correr(motor, 120)
+    grabador.cerrar()
+
+    assert grabador.cuadros == 600
+    traza = Traza(str(ruta))
+    assert len(traza) == 600
+    assert abs(traza.tiempos[-1] - 120) < 1e-6
@@ -0,0 +1,291 @@
+"""
+Trazas binarias de corridas largas, leídas con mmap.
+
+Una traza es un único archivo con registros de tamaño fijo:
+
+- cabecera (TAMANO_CABECERA bytes): marca, tipos de registro y tablas de
+  nombres en JSON;
+- registros de vehículos (REGISTRO), uno por vehículo activo en cada cuadro,
+  escritos en orden de tiempo;
+- índice de cuadros (CUADRO): tiempo, primer registro, número de vehículos,
+  fase y estado de los cuatro semáforos de cada captura.
+
+Al abrirla con Traza los registros y el índice se proyectan en memoria con
+np.memmap: no se carga nada hasta que se toca. ventana(t0, t1) busca en el
+índice de tiempos y devuelve vistas sin copia, así el reproductor y los
+análisis solo traen a memoria las páginas del intervalo que usan. Como la
+proyección es de solo lectura, varios procesos que abren la misma traza
+comparten las páginas de la caché del sistema operativo; al pasar una Traza
+a otro proceso solo viaja la ruta.
+
+    grabador = GrabadorTraza("corrida.traza")
+    grabador.correr(motor, 4 * 3600)
+    grabador.cerrar()
+    traza = Traza("corrida.traza")
+    t, fases, semaforos, registros = traza.ventana(3600, 3660)
+
+    python traza.py grabar perfil.json horas corrida.traza [semilla]
+    python traza.py resumen corrida.traza [segundos por ventana]
+"""
+
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from llegadas import APROXIMACIONES, INDICE_APROXIMACION
+
+MARCA = b"SEMTRAZA"
+VERSION = 2
+TAMANO_CABECERA = 4096
+
+# Un vehículo en un cuadro (29 bytes)
+REGISTRO = np.dtype([
+    ("id", "<u4"),
+    ("x", "<f4"),
+    ("y", "<f4"),
+    ("angulo", "<f4"),
+    ("distancia", "<f4"),
+    ("demora", "<f4"),
+    ("origen", "u1"),
+    ("destino", "u1"),
+    ("detenido", "u1"),
+    ("giro", "u1"),
+    ("emergencia", "u1"),
+])
+
+# Una captura: sus vehículos son registros[primero:primero + n]
+CUADRO = np.dtype([
+    ("t", "<f8"),
+    ("primero", "<u8"),
+    ("n", "<u4"),
+    ("fase", "<u2"),
+    ("semaforos", "u1", (len(APROXIMACIONES),)),
+    ("_relleno", "V2"),
+])
+
+ESTADOS_SEMAFORO = ("rojo", "amarillo", "verde")
+_CODIGO_SEMAFORO = {estado: i for i, estado in enumerate(ESTADOS_SEMAFORO)}
+
+
+class GrabadorTraza:
+    def __init__(self, ruta, intervalo=0.2, filas_lote=1 << 16):
+        """
+        ruta: archivo de la traza (se sobrescribe).
+        intervalo: segundos simulados entre cuadros en correr().
+        """
+        self.ruta = ruta
+        self.intervalo = intervalo
+        self.archivo = open(ruta, "wb")
+        self.archivo.write(b"\0" * TAMANO_CABECERA)
+
+        # Registros pendientes de escribir y el índice de cuadros, que crece
+        # por duplicación (28 bytes por cuadro)
+        self._bufer = np.zeros(filas_lote, dtype=REGISTRO)
+        self._fila = 0
+        self.registros = 0
+        self._cuadros = np.zeros(1024, dtype=CUADRO)
+        self.cuadros = 0
+        self.fases = {}
+
+    def _vaciar(self):
+        if self._fila:
+            self.archivo.write(self._bufer[:self._fila].tobytes())
+            self.registros += self._fila
+            self._fila = 0
+
+    def capturar(self, motor):
+        """Añade un cuadro con los vehículos activos y el estado de los semáforos."""
+        if self.cuadros == len(self._cuadros):
+            self._cuadros = np.resize(self._cuadros, 2 * len(self._cuadros))
+        vehiculos = list(motor.vehicles)
+        k = len(vehiculos)
+
+        cuadro = self._cuadros[self.cuadros]
+        cuadro["t"] = motor.reloj
+        cuadro["primero"] = self.registros + self._fila
+        cuadro["n"] = k
+        cuadro["fase"] = self.fases.setdefault(motor.estado_actual, len(self.fases))
+        cuadro["semaforos"] = [_CODIGO_SEMAFORO[motor.semaforos_vehiculares[a].estado] for a in APROXIMACIONES]
+        self.cuadros += 1
+        if not k:
+            return
+
+        if self._fila + k > len(self._bufer):
+            self._vaciar()
+            if k > len(self._bufer):
+                self._bufer = np.zeros(k, dtype=REGISTRO)
+
+        r = self._bufer[self._fila:self._fila + k]
+        r["id"] = [v.id_vehiculo for v in vehiculos]
+        posiciones = np.array([v.get_display_position() for v in vehiculos])
+        r["x"] = posiciones[:, 0]
+        r["y"] = posiciones[:, 1]
+        r["angulo"] = posiciones[:, 2]
+        r["distancia"] = [v.distancia for v in vehiculos]
+        r["demora"] = [v.demora for v in vehiculos]
+        r["origen"] = [INDICE_APROXIMACION[v.lane] for v in vehiculos]
+        r["destino"] = [INDICE_APROXIMACION[v.destination] for v in vehiculos]
+        r["detenido"] = [v.detenido for v in vehiculos]
+        r["giro"] = [v.turning for v in vehiculos]
+        r["emergencia"] = [v.emergencia for v in vehiculos]
+        self._fila += k
+
+    def correr(self, motor, duracion):
+        """Avanza el motor duracion segundos capturando cada intervalo."""
+        for _ in motor.correr_por_intervalos(duracion, self.intervalo):
+            self.capturar(motor)
+
+    def cerrar(self):
+        """Escribe lo pendiente, el índice de cuadros y la cabecera."""
+        self._vaciar()
+        inicio_cuadros = self.archivo.tell()
+        self.archivo.write(self._cuadros[:self.cuadros].tobytes())
+
+        cabecera = json.dumps({
+            "version": VERSION,
+            "registro": _descripcion(REGISTRO),
+            "cuadro": _descripcion(CUADRO),
+            "registros": self.registros,
+            "cuadros": self.cuadros,
+            "inicio_cuadros": inicio_cuadros,
+            "intervalo": self.intervalo,
+            "fases": sorted(self.fases, key=self.fases.get),
+            "aproximaciones": list(APROXIMACIONES),
+            "estados_semaforo": list(ESTADOS_SEMAFORO),
+        }).encode("utf-8")
+        if len(MARCA) + len(cabecera) > TAMANO_CABECERA:
+            raise ValueError("La cabecera de la traza no cabe en su bloque")
+        self.archivo.seek(0)
+        self.archivo.write(MARCA + cabecera)
+        self.archivo.close()
+
+
+def _descripcion(tipo):
+    """dtype como lista JSON para la cabecera."""
+    return [list(campo) if len(campo) == 2 else [campo[0], campo[1], list(campo[2])]
+            for campo in tipo.descr]
+
+
+class Traza:
+    def __init__(self, ruta):
+        """Abre una traza de solo lectura; nada se lee hasta que se usa."""
+        self.ruta = ruta
+        with open(ruta, "rb") as archivo:
+            bloque = archivo.read(TAMANO_CABECERA)
+        if not bloque.startswith(MARCA):
+            raise ValueError(f"{ruta} no es una traza de semáforos")
+        self.cabecera = json.loads(bloque[len(MARCA):].rstrip(b"\0"))
+        if self.cabecera["version"] != VERSION:
+            raise ValueError(f"Versión de traza no soportada: {self.cabecera['version']}")
+
+        self.fases = self.cabecera["fases"]
+        self.intervalo = self.cabecera["intervalo"]
+        n = self.cabecera["registros"]
+        m = self.cabecera["cuadros"]
+        self.registros = (np.memmap(ruta, dtype=REGISTRO, mode="r", offset=TAMANO_CABECERA, shape=(n,))
+                          if n else np.zeros(0, dtype=REGISTRO))
+        self.cuadros = (np.memmap(ruta, dtype=CUADRO, mode="r", offset=self.cabecera["inicio_cuadros"], shape=(m,))
+                        if m else np.zeros(0, dtype=CUADRO))
+        # Tiempos de los cuadros, la única columna que se consulta entera
+        self.tiempos = self.cuadros["t"]
+
+    # Para multiprocessing: el otro proceso vuelve a proyectar el archivo
+    def __getstate__(self):
+        return {"ruta": self.ruta}
+
+    def __setstate__(self, estado):
+        self.__init__(estado["ruta"])
+
+    def __len__(self):
+        """Número de cuadros"""
+        return len(self.cuadros)
+
+    @property
+    def duracion(self):
+        return float(self.tiempos[-1] - self.tiempos[0]) if len(self) else 0.0
+
+    def cuadro_en(self, t):
+        """Índice del último cuadro con tiempo <= t."""
+        return max(0, int(np.searchsorted(self.tiempos, t, side="right")) - 1)
+
+    def cuadro(self, i):
+        """(t, fase, semaforos, registros) del cuadro i; registros es una vista."""
+        c = self.cuadros[i]
+        primero = int(c["primero"])
+        return float(c["t"]), self.fases[c["fase"]], c["semaforos"], self.registros[primero:primero + int(c["n"])]
+
+    def ventana(self, t0, t1):
+        """
+        Cuadros con t0 <= t < t1: (tiempos, fases, semaforos, registros). Son
+        vistas sobre el archivo; cuadro k ocupa registros[primero[k] -
+        primero[0]:][:n[k]] con primero y n de self.cuadros.
+        """
+        i0, i1 = np.searchsorted(self.tiempos, [t0, t1])
+        cuadros = self.cuadros[i0:i1]
+        if not len(cuadros):
+            return cuadros["t"], cuadros["fase"], cuadros["semaforos"], self.registros[:0]
+        primero = int(cuadros["primero"][0])
+        ultimo = int(cuadros["primero"][-1]) + int(cuadros["n"][-1])
+        return cuadros["t"], cuadros["fase"], cuadros["semaforos"], self.registros[primero:ultimo]
+
+    def ventanas(self, segundos):
+        """Recorre la traza en ventanas consecutivas de segundos de duración."""
+        if not len(self):
+            return
+        t = float(self.tiempos[0])
+        fin = float(self.tiempos[-1])
+        while t <= fin:
+            yield (t, *self.ventana(t, t + segundos))
+            t += segundos
+
+
+def resumen(traza, segundos=300):
+    """
+    Por ventana: (inicio, vehículos medios, fracción detenida, demora media
+    acumulada). Cada ventana se lee y se suelta, así que la memoria no crece
+    con la duración de la traza.
+    """
+    filas = []
+    for inicio, tiempos, _, _, registros in traza.ventanas(segundos):
+        if not len(tiempos):
+            continue
+        n = len(registros)
+        filas.append((
+            inicio,
+            n / len(tiempos),
+            float(registros["detenido"].mean()) if n else 0.0,
+            float(registros["demora"].mean()) if n else 0.0,
+        ))
+    return filas
+
+
+def main():
+    if len(sys.argv) >= 5 and sys.argv[1] == "grabar":
+        from demanda import PerfilDemanda
+        from motor import MotorSimulacion
+
+        motor = MotorSimulacion(int(sys.argv[5]) if len(sys.argv) > 5 else None)
+        motor.usar_perfil_demanda(PerfilDemanda.cargar(sys.argv[2]), 7)
+        grabador = GrabadorTraza(sys.argv[4])
+        inicio = time.perf_counter()
+        grabador.correr(motor, float(sys.argv[3]) * 3600)
+        grabador.cerrar()
+        megas = os.path.getsize(sys.argv[4]) / 1e6
+        print(f"{grabador.cuadros} cuadros, {grabador.registros} registros ({megas:.1f} MB) "
+              f"en {time.perf_counter() - inicio:.1f} s")
+    elif len(sys.argv) >= 3 and sys.argv[1] == "resumen":
+        traza = Traza(sys.argv[2])
+        segundos = float(sys.argv[3]) if len(sys.argv) > 3 else 300
+        print(f"{'inicio':>8s} {'veh':>6s} {'detenidos':>9s} {'demora':>7s}")
+        for inicio, vehiculos, detenidos, demora in resumen(traza, segundos):
+            print(f"{inicio:8.0f} {vehiculos:6.1f} {detenidos:9.1%} {demora:7.1f}")
+    else:
+        print("Uso: python traza.py grabar perfil.json horas archivo.traza [semilla]\n"
+              "     python traza.py resumen archivo.traza [segundos por ventana]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Exportación de cuadros PNG de una traza grabada, sin interfaz y en paralelo.
+
+Para revisar un incidente no hace falta grabar la pantalla en tiempo real:
+cualquier intervalo de una traza (traza.py) se pinta fuera de pantalla en
+QImage con las mismas funciones que lienzo.LienzoCruce. Los cuadros se
+reparten por lotes entre un grupo de procesos (plataforma "offscreen" de Qt,
+prioridad baja para no entorpecer una sesión interactiva); cada proceso
+proyecta la misma traza con mmap, así que nada se copia entre ellos. Los
+PNG se guardan en una carpeta y/o se envían en orden por una tubería a un
+codificador local.
+
+    exportar_cuadros("corrida.traza", "cuadros", t0=3600, t1=3660)
+
+    python video.py corrida.traza --carpeta cuadros --desde 3600 --hasta 3660
+    python video.py corrida.traza --codificador "ffmpeg -y -f image2pipe -framerate {fps} -i - incidente.mp4"
+"""
+
+import argparse
+import multiprocessing
+import os
+import shlex
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from traza import ESTADOS_SEMAFORO, Traza
+
+# Cuadros por tarea enviada a cada proceso
+LOTE = 32
+
+# Incremento de nice de los procesos que pintan
+PRIORIDAD = 10
+
+# Estado de cada proceso del grupo
+_app = None
+_traza = None
+
+
+def _iniciar_proceso(ruta, prioridad):
+    global _app, _traza
+    os.environ["QT_QPA_PLATFORM"] = "offscreen"
+    if prioridad and hasattr(os, "nice"):
+        os.nice(prioridad)
+    from PyQt6.QtGui import QGuiApplication
+    _app = QGuiApplication.instance() or QGuiApplication([])
+    _traza = Traza(ruta)
+
+
+def pintar_cuadro(traza, indice, escala=1.0):
+    """QImage del cuadro indice de la traza."""
+    from PyQt6.QtCore import QPointF
+    from PyQt6.QtGui import QColor, QFont, QImage, QPainter
+
+    import lienzo
+
+    t, fase, semaforos, registros = traza.cuadro(indice)
+    imagen = QImage(round(lienzo.ANCHO * escala), round(lienzo.ALTO * escala), QImage.Format.Format_RGB32)
+    painter = QPainter(imagen)
+    painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+    painter.scale(escala, escala)
+
+    lienzo.pintar_calles(painter)
+    aproximaciones = traza.cabecera["aproximaciones"]
+    lienzo.pintar_semaforos(painter, {a: ESTADOS_SEMAFORO[e] for a, e in zip(aproximaciones, semaforos.tolist())})
+
+    # Color como en Vehicle: emergencia, recto, o giro hacia Norte/Sur (códigos 0 y 1) o Este/Oeste
+    color = np.where(registros["giro"] == 0, 0, np.where(registros["destino"] < 2, 1, 2))
+    color[registros["emergencia"] != 0] = 3
+    lienzo.pintar_vehiculos(painter, registros["x"].astype(float), registros["y"].astype(float),
+                            registros["angulo"].astype(float), color)
+    lienzo.pintar_leyenda(painter)
+
+    painter.setPen(QColor(0, 0, 0))
+    painter.setFont(QFont("Arial", 12, QFont.Weight.Bold))
+    horas, resto = divmod(t, 3600)
+    painter.drawText(QPointF(10, 24), f"{int(horas):02d}:{int(resto // 60):02d}:{resto % 60:04.1f}  {fase}  "
+                                      f"{len(registros)} vehículos")
+    painter.end()
+    return imagen
+
+
+def _renderizar(tarea):
+    """Pinta un lote de cuadros y devuelve sus PNG como bytes."""
+    from PyQt6.QtCore import QBuffer, QIODevice
+
+    indices, escala = tarea
+    pngs = []
+    for indice in indices:
+        bufer = QBuffer()
+        bufer.open(QIODevice.OpenModeFlag.WriteOnly)
+        pintar_cuadro(_traza, indice, escala).save(bufer, "PNG")
+        pngs.append(bytes(bufer.data()))
+    return pngs
+
+
+def indices_cuadros(traza, t0=None, t1=None, fps=None, velocidad=1.0):
+    """
+    Cuadros de la traza que corresponden a un video de fps cuadros por
+    segundo entre t0 y t1, a velocidad segundos simulados por segundo de
+    video. Sin fps se usa cada cuadro grabado.
+    """
+    if not len(traza):
+        return np.zeros(0, dtype=np.intp)
+    t0 = float(traza.tiempos[0]) if t0 is None else t0
+    t1 = float(traza.tiempos[-1]) if t1 is None else t1
+    if fps is None:
+        return np.arange(np.searchsorted(traza.tiempos, t0), np.searchsorted(traza.tiempos, t1, side="right"))
+    tiempos = np.arange(t0, t1, velocidad / fps)
+    return np.maximum(np.searchsorted(traza.tiempos, tiempos, side="right") - 1, 0)
+
+
+def exportar_cuadros(ruta, carpeta=None, t0=None, t1=None, fps=None, velocidad=1.0,
+                     procesos=None, codificador=None, escala=1.0, prioridad=PRIORIDAD):
+    """
+    Pinta los cuadros de la traza ruta entre t0 y t1 (segundos simulados).
+    carpeta: destino de cuadro_000000.png, ...; None no guarda archivos.
+    codificador: orden que recibe los PNG en orden por su entrada estándar;
+        "{fps}" se sustituye por los cuadros por segundo del video.
+    procesos: tamaño del grupo (None: uno por núcleo).
+    Devuelve el número de cuadros exportados.
+    """
+    if carpeta is None and codificador is None:
+        raise ValueError("Indica una carpeta, un codificador o ambos")
+    traza = Traza(ruta)
+    indices = indices_cuadros(traza, t0, t1, fps, velocidad)
+    fps = fps or velocidad / traza.intervalo
+    if carpeta is not None:
+        os.makedirs(carpeta, exist_ok=True)
+
+    tuberia = None
+    if codificador is not None:
+        tuberia = subprocess.Popen(shlex.split(codificador.format(fps=f"{fps:g}")), stdin=subprocess.PIPE)
+
+    lotes = [(indices[i:i + LOTE].tolist(), escala) for i in range(0, len(indices), LOTE)]
+    n = 0
+    # spawn: los procesos no heredan el estado de Qt de una sesión interactiva
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(procesos, mp_context=contexto, initializer=_iniciar_proceso,
+                             initargs=(ruta, prioridad)) as grupo:
+        # map devuelve los lotes en orden aunque terminen desordenados
+        for pngs in grupo.map(_renderizar, lotes):
+            for png in pngs:
+                if carpeta is not None:
+                    with open(os.path.join(carpeta, f"cuadro_{n:06d}.png"), "wb") as archivo:
+                        archivo.write(png)
+                if tuberia is not None:
+                    tuberia.stdin.write(png)
+                n += 1
+
+    if tuberia is not None:
+        tuberia.stdin.close()
+        if tuberia.wait():
+            raise RuntimeError(f"El codificador terminó con código {tuberia.returncode}")
+    return n
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta cuadros PNG de una traza grabada")
+    parser.add_argument("traza")
+    parser.add_argument("--carpeta", help="carpeta para los PNG")
+    parser.add_argument("--desde", type=float, help="segundo simulado inicial")
+    parser.add_argument("--hasta", type=float, help="segundo simulado final")
+    parser.add_argument("--fps", type=float, help="cuadros por segundo del video (por defecto, cada cuadro grabado)")
+    parser.add_argument("--velocidad", type=float, default=1.0, help="segundos simulados por segundo de video")
+    parser.add_argument("--procesos", type=int)
+    parser.add_argument("--escala", type=float, default=1.0)
+    parser.add_argument("--codificador", help='p. ej. "ffmpeg -y -f image2pipe -framerate {fps} -i - salida.mp4"')
+    args = parser.parse_args()
+
+    if args.carpeta is None and args.codificador is None:
+        parser.error("indica --carpeta, --codificador o ambos")
+    inicio = time.perf_counter()
+    n = exportar_cuadros(args.traza, args.carpeta, args.desde, args.hasta, args.fps, args.velocidad,
+                         args.procesos, args.codificador, args.escala)
+    duracion = time.perf_counter() - inicio
+    print(f"{n} cuadros en {duracion:.1f} s ({n / duracion:.0f} cuadros/s)")
+
+
+if __name__ == "__main__":
+    main()